@@ -0,0 +1,157 @@
+"""画面の静的コンテンツ（CSS・説明表）
+
+Streamlit はセッションごと・操作ごとにスクリプト全体を再実行するため、
+変化しない CSS や表はここでモジュール定数として定義し、プロセス内で 1 回だけ
+構築したものを全セッションで共有する。
+"""
+
+# IN / OUT 見出し
+SECTION_HEADER_CSS = """
+<style>
+/* IN / OUT 見出し専用（ダークモード完全対応） */
+.section-header-in {
+    background-color: rgba(30, 60, 100, 0.85); /* Blue-ish */
+    color: #F0F8FF !important;
+    padding: 0.6em 0.8em;
+    border-radius: 0.6em;
+    font-weight: 700;
+    font-size: 1.05rem;
+    text-align: center;
+    border: 1px solid rgba(135, 206, 250, 0.25);
+}
+
+.section-header-out {
+    background-color: rgba(100, 30, 30, 0.85); /* Red-ish */
+    color: #FFF0F0 !important;
+    padding: 0.6em 0.8em;
+    border-radius: 0.6em;
+    font-weight: 700;
+    font-size: 1.05rem;
+    text-align: center;
+    border: 1px solid rgba(250, 128, 114, 0.25);
+}
+
+/* ライトモード補正 */
+@media (prefers-color-scheme: light) {
+    .section-header-in {
+        background-color: #E3F2FD;
+        color: #0d47a1 !important;
+        border: 1px solid #BBDEFB;
+    }
+    .section-header-out {
+        background-color: #FFEBEE;
+        color: #b71c1c !important;
+        border: 1px solid #FFCDD2;
+    }
+}
+</style>
+"""
+
+# 見出しボックス・ボタン・メトリクス
+BASE_CSS = """
+<style>
+.report-header-box {
+    background-color: #e9ecef;
+    padding: 10px 20px;
+    border-radius: 8px;
+    border-left: 6px solid #007bff;
+    margin: 20px 0;
+}
+.report-header-box h4 { margin: 0; }
+div.stButton > button {
+    border-radius: 10px;
+    font-weight: bold;
+    height: 3em;
+}
+[data-testid="stMetricValue"] { color: #007bff; }
+</style>
+"""
+
+# メイン計算ページ（ダークモード対応）
+MAIN_PAGE_CSS = """
+<style>
+/* 共通 */
+.report-header-box {
+    padding: 0.5em 1em;
+    border-left: 6px solid;
+    margin: 1.5em 0 0.5em 0;
+    border-radius: 4px;
+}
+
+/* ライトモード */
+@media (prefers-color-scheme: light) {
+    .report-header-box {
+        background-color: #f2f2f2;
+        border-color: #2c7be5;
+        color: #000000;
+    }
+}
+
+/* ダークモード */
+@media (prefers-color-scheme: dark) {
+    .report-header-box {
+        background-color: #2b2b2b;
+        border-color: #6ea8fe;
+        color: #ffffff;
+    }
+}
+</style>
+"""
+
+# 推算根拠ページ：ネットバランスの判定基準
+JUDGMENT_TABLE = [
+    {
+        "バランス結果": "+500 mL 超",
+        "判定": "体液過剰 (Overhydration)",
+        "臨床的リスク": "心不全増悪、浮腫、肺水腫のリスク"
+    },
+    {
+        "バランス結果": "-200 ～ +500 mL",
+        "判定": "維持範囲 (Maintenance)",
+        "臨床的リスク": "生理的許容範囲"
+    },
+    {
+        "バランス結果": "-200 mL 未満",
+        "判定": "脱水リスク (Dehydration)",
+        "臨床的リスク": "腎不全（乏尿）、循環不全、血圧低下のリスク"
+    }
+]
+
+# 使い方ページ：利用シーン別一覧
+USAGE_TABLE = [
+    {
+        "利用シーン": "医療（病棟・外来）",
+        "主な対象": "入院患者・発熱患者",
+        "入力のポイント": "輸液量・尿量・発熱の有無を正確に",
+        "判定の見方": "体液過剰／脱水リスクの傾向把握",
+        "活用例": "回診前サマリー、PDF記録"
+    },
+    {
+        "利用シーン": "看護",
+        "主な対象": "水分管理が必要な患者",
+        "入力のポイント": "概算入力でも可、傾向重視",
+        "判定の見方": "前日との差・IN/OUT対照",
+        "活用例": "申し送り、患者説明"
+    },
+    {
+        "利用シーン": "生活・家庭",
+        "主な対象": "高齢者・体調不良時",
+        "入力のポイント": "飲水量・排尿回数を簡易入力",
+        "判定の見方": "不足・過剰の気づき",
+        "活用例": "受診判断の参考"
+    },
+    {
+        "利用シーン": "学校（保健・授業）",
+        "主な対象": "児童・生徒",
+        "入力のポイント": "体重・室温・活動量",
+        "判定の見方": "熱中症リスクの可視化",
+        "活用例": "保健指導、教材"
+    },
+    {
+        "利用シーン": "運動・部活動",
+        "主な対象": "競技者・部活動生徒",
+        "入力のポイント": "運動前後の水分量",
+        "判定の見方": "補給不足の確認",
+        "活用例": "飲水計画の立案"
+    },
+]
@@ -0,0 +1,181 @@
+"""累積・移動窓の水分バランス集計（逐次更新）
+
+IN/OUT の記録を 1 件ずつ受け取り、累積バランスと移動窓（24h・3日・7日など）の
+合計を保持する。窓から外れた記録は先頭から取り除くだけなので、履歴全体を
+読み直すことはなく、1 件あたりの更新コストは窓の数に比例する定数。
+
+PatientBalance は画面で患者ごとに 1 つ持ち続ける集計で、保存済みの日次記録から
+1 回だけ作り、以降は保存や時刻付き記録の追加のたびに差分だけを add() する。
+"""
+import datetime
+from collections import deque
+
+from balance_engine import loss_rate
+from event_buffer import EVENT_KINDS
+
+HOUR = 3600.0
+DAY = 24 * HOUR
+
+DEFAULT_WINDOWS = {"24h": DAY, "3d": 3 * DAY, "7d": 7 * DAY}
+
+
+def _seconds(ts):
+    if isinstance(ts, datetime.datetime):
+        return ts.timestamp()
+    if isinstance(ts, datetime.date):
+        return datetime.datetime(ts.year, ts.month, ts.day).timestamp()
+    if isinstance(ts, str):
+        return _seconds(datetime.datetime.fromisoformat(ts))
+    return float(ts)
+
+
+class _Window:
+    # 1 つの移動窓：窓内の記録と IN/OUT の合計
+    __slots__ = ("span", "entries", "total_in", "total_out")
+
+    def __init__(self, span):
+        self.span = span
+        self.entries = deque()
+        self.total_in = 0.0
+        self.total_out = 0.0
+
+    def push(self, t, in_ml, out_ml):
+        self.entries.append((t, in_ml, out_ml))
+        self.total_in += in_ml
+        self.total_out += out_ml
+        # 窓は (t - span, t] の範囲
+        while self.entries and self.entries[0][0] <= t - self.span:
+            _, old_in, old_out = self.entries.popleft()
+            self.total_in -= old_in
+            self.total_out -= old_out
+
+
+class RunningBalance:
+    """1 患者分の累積・移動窓バランス。
+
+    tbw は推算体内全水分量（mL）で、累積損失率の分母に使う。
+    windows は {名前: 秒数}。記録は時刻順に add() すること。
+    """
+
+    def __init__(self, tbw, windows=None):
+        self.tbw = tbw
+        self.total_in = 0.0
+        self.total_out = 0.0
+        self.count = 0
+        self.last_time = None
+        self._windows = {name: _Window(span) for name, span in (windows or DEFAULT_WINDOWS).items()}
+
+    def add(self, ts, in_ml=0.0, out_ml=0.0):
+        t = _seconds(ts)
+        if self.last_time is not None and t < self.last_time:
+            raise ValueError("記録は時刻順に追加してください。")
+        self.last_time = t
+        self.count += 1
+        self.total_in += in_ml
+        self.total_out += out_ml
+        for w in self._windows.values():
+            w.push(t, in_ml, out_ml)
+        return self
+
+    @property
+    def net(self):
+        return self.total_in - self.total_out
+
+    @property
+    def loss_rate(self):
+        # 累積のマイナスバランスを TBW に対する割合（%）で返す
+        return loss_rate(self.net, self.tbw).item()
+
+    def rolling(self, name):
+        """窓 name の (IN 合計, OUT 合計, バランス) を返す。"""
+        w = self._windows[name]
+        return w.total_in, w.total_out, w.total_in - w.total_out
+
+    def rolling_net(self, name):
+        return self.rolling(name)[2]
+
+    def snapshot(self):
+        snap = {
+            "total_in": self.total_in,
+            "total_out": self.total_out,
+            "net": self.net,
+            "loss_rate": self.loss_rate,
+        }
+        for name in self._windows:
+            snap[f"net_{name}"] = self.rolling_net(name)
+        return snap
+
+    @classmethod
+    def from_records(cls, records, tbw, windows=None):
+        """balance_store の日次レコード（日付順）から作る。"""
+        agg = cls(tbw, windows)
+        for r in records:
+            agg.add(r["day"], r["total_in"], r["total_out"])
+        return agg
+
+
+_EVENT_SIGNS = {key: sign for key, _, sign in EVENT_KINDS}
+
+
+class PatientBalance:
+    """1 患者分の保存済み日次記録と、その後の保存・時刻付き記録を反映した RunningBalance。
+
+    日ごとに反映済みの IN/OUT を覚えておき、日次記録を保存（上書きを含む）したときは
+    反映済みとの差分だけを加える。保存前の日は時刻付き記録の実測分だけが入る。
+    add() は時刻順にしか受け付けないため、最後の記録より前の時刻の追加は最後の時刻に
+    加え、最後の記録より前の日を保存したときだけ日ごとの合計から作り直す。
+    """
+
+    def __init__(self, records, tbw, windows=None):
+        self.windows = windows
+        self.records = {r["day"]: r for r in records}
+        self._fed = {}  # 日付 → [反映済みの IN, OUT]
+        self.agg = RunningBalance(tbw, windows)
+        for r in records:
+            self._feed(r["day"], r["day"], r["total_in"], r["total_out"])
+
+    @property
+    def tbw(self):
+        return self.agg.tbw
+
+    @tbw.setter
+    def tbw(self, value):
+        self.agg.tbw = value
+
+    def history(self):
+        """保存済みの日次記録を日付順に返す。"""
+        return [self.records[day] for day in sorted(self.records)]
+
+    def add_event(self, day, ts, kind, volume):
+        """時間記録モードの記録を 1 件加える（kind は EVENT_KINDS のキー）。"""
+        volume = float(volume)
+        if _EVENT_SIGNS[kind] > 0:
+            self._feed(str(day), ts, volume, 0.0)
+        else:
+            self._feed(str(day), ts, 0.0, volume)
+
+    def save(self, row):
+        """balance_store に保存した日次記録（make_row() の行）を反映する。"""
+        day = row["day"]
+        self.records[day] = row
+        fed_in, fed_out = self._fed.get(day, (0.0, 0.0))
+        if day < max(self._fed, default=day):
+            self._fed[day] = [row["total_in"], row["total_out"]]
+            self._rebuild()
+        else:
+            self._feed(day, day, row["total_in"] - fed_in, row["total_out"] - fed_out)
+
+    def _feed(self, day, ts, in_ml, out_ml):
+        fed = self._fed.setdefault(day, [0.0, 0.0])
+        fed[0] += in_ml
+        fed[1] += out_ml
+        t = _seconds(ts)
+        if self.agg.last_time is not None and t < self.agg.last_time:
+            t = self.agg.last_time
+        self.agg.add(t, in_ml, out_ml)
+
+    def _rebuild(self):
+        fed, self._fed = self._fed, {}
+        self.agg = RunningBalance(self.agg.tbw, self.windows)
+        for day in sorted(fed):
+            self._feed(day, day, *fed[day])
@@ -0,0 +1,286 @@
+"""水分出納の計算・報告書 PDF の HTTP/JSON API（電子カルテ連携用）
+
+Streamlit の画面を介さずに、IN/OUT の値から計算結果（バランス・TBW・損失率・判定）と
+PDF 報告書を返す。計算式は balance_engine、PDF は generate_medical_report を共用する。
+少数件の計算はイベントループ内で行い（1 件はマイクロ秒、複数件は列単位の一括計算）、
+INLINE_BATCH 件を超える一括計算はスレッドに、PDF の描画はプロセスプールに回して
+イベントループを止めない。入力の誤りは描画・送信を始める前にすべて 400 で返す。
+
+使い方:
+    python balance_api.py --port 8080 --workers 4
+
+エンドポイント:
+    POST /v1/balance       1 件（JSON オブジェクト）または複数件（{"records": [...]} か配列）
+    POST /v1/report        1 件分の PDF（入力値のみ、または計算済みの report_data）
+    POST /v1/ward-report   病棟報告書（{"title": ..., "records": [...]}）。描画した分冊から順に ZIP で送る
+    GET  /healthz          死活確認
+    GET  /metrics          instrumentation の計測値（Prometheus テキスト形式）
+"""
+import argparse
+import asyncio
+import functools
+import json
+import os
+import sys
+import tempfile
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+from aiohttp import web
+
+from balance_engine import GENDERS, INPUT_COLUMNS, INPUT_DEFAULTS, OUTPUT_COLUMNS, REQUIRED_COLUMNS, compute_one
+from batch_report import missing_fields, prepare_report_data
+from batch_score import score_frame
+from instrumentation import REGISTRY, stage
+from medical_report import generate_medical_report, report_file_name, setup_pdf
+from ward_report import INDEX_NAME, iter_volumes, read_index, render_index, render_volume, volume_name
+
+MAX_BATCH = int(os.environ.get("WATER_BALANCE_API_MAX_BATCH", "10000"))
+# これを超える件数の一括計算はイベントループを止めないようスレッドで行う
+INLINE_BATCH = 1_000
+POOL_KEY = web.AppKey("pdf_pool", ProcessPoolExecutor)
+
+_dumps = functools.partial(json.dumps, ensure_ascii=False)
+
+_TEXT_INPUTS = ("gender", "stool_type")
+# 計算済みの report_data で報告書が数値として書式化する項目
+_REPORT_NUMBERS = ("metabolic", "urine", "stool", "insensible", "net", "tbw", "loss_rate")
+
+
+class BadRequest(ValueError):
+    # 入力値の誤り。details は応答の JSON にそのまま入れる（複数件のどれが誤りかなど）
+    def __init__(self, message, details=None):
+        super().__init__(message)
+        self.details = details
+
+
+# ================================
+# 1. 計算
+# ================================
+def record_errors(record):
+    """1 件分の入力の誤り（必須項目の欠落・型の不一致）を文字列のリストで返す。"""
+    errors = []
+    for c in INPUT_COLUMNS:
+        v = record.get(c)
+        if v is None or (isinstance(v, float) and v != v):
+            if c in REQUIRED_COLUMNS:
+                errors.append(f"{c} がありません")
+        elif c in _TEXT_INPUTS:
+            if not isinstance(v, str):
+                errors.append(f"{c} は文字列で指定してください")
+            elif c == "gender" and v not in GENDERS:
+                errors.append(f"gender は {'・'.join(GENDERS)} のいずれかで指定してください")
+        elif not _is_number(v):
+            errors.append(f"{c} は数値で指定してください")
+    return errors
+
+
+def report_record_errors(record):
+    """報告書 1 件分の誤りを返す。計算済み（net を含む）なら報告書が読む計算結果の項目も確かめる。"""
+    errors = record_errors(record)
+    if "net" in record:
+        errors += [f"{k} がありません" for k in missing_fields(record) if k not in INPUT_COLUMNS]
+        errors += [f"{k} は数値で指定してください" for k in _REPORT_NUMBERS
+                   if record.get(k) is not None and not _is_number(record[k])]
+    return errors
+
+
+def _is_number(v):
+    return isinstance(v, (int, float)) and not isinstance(v, bool)
+
+
+def validate_records(records, check=record_errors):
+    """各件を check（既定: record_errors）で確かめ、誤りがあれば件の番号付きで BadRequest を送出する。"""
+    invalid = [{"index": i, "errors": errors} for i, r in enumerate(records) if (errors := check(r))]
+    if invalid:
+        shown = ", ".join(str(x["index"]) for x in invalid[:20])
+        raise BadRequest(f"{len(invalid)} 件の入力に誤りがあります（index: {shown}{' ...' if len(invalid) > 20 else ''}）", invalid)
+
+
+def _with_defaults(record):
+    # null の任意項目は既定値で補う（NaN として計算しない）
+    return {**record, **{c: d for c, d in INPUT_DEFAULTS.items() if record.get(c) is None}}
+
+
+def compute_record(record):
+    """1 件分の入力 dict から OUTPUT_COLUMNS の dict を返す。"""
+    errors = record_errors(record)
+    if errors:
+        raise BadRequest(f"入力に誤りがあります: {', '.join(errors)}", errors)
+    record = _with_defaults(record)
+    return compute_one(**{c: record[c] for c in INPUT_COLUMNS})
+
+
+def compute_records(records):
+    """複数件を 1 回の一括計算にかけ、入力順に結果の dict を返す。"""
+    if len(records) > MAX_BATCH:
+        raise BadRequest(f"1 回に送れるのは {MAX_BATCH} 件までです: {len(records)} 件")
+    if not records:
+        return []
+    validate_records(records)
+    scored = score_frame(pd.DataFrame.from_records([_with_defaults(r) for r in records]))
+    out = scored[list(OUTPUT_COLUMNS)]
+    if "patient_id" in scored.columns:
+        # ID のないレコードは NaN ではなく null で返す
+        ids = scored["patient_id"].astype(object)
+        out.insert(0, "patient_id", ids.where(ids.notna(), None))
+    return out.to_dict(orient="records")
+
+
+def _render_pdf(data):
+    # プロセスプール内で実行する
+    return generate_medical_report(data).getvalue()
+
+
+# ================================
+# 2. ハンドラ
+# ================================
+async def _read_json(request):
+    try:
+        return await request.json()
+    except json.JSONDecodeError as e:
+        raise BadRequest(f"JSON を解釈できません: {e}") from None
+
+
+def _error(status, message, details=None):
+    body = {"error": message}
+    if details is not None:
+        body["details"] = details
+    return web.json_response(body, status=status, dumps=_dumps)
+
+
+@web.middleware
+async def error_middleware(request, handler):
+    try:
+        return await handler(request)
+    except BadRequest as e:
+        # 入力値の誤りだけを 400 にする（それ以外の例外はサーバー側の不具合として 500 のまま）
+        return _error(400, str(e), e.details)
+
+
+async def balance(request):
+    body = await _read_json(request)
+    with stage("api.balance"):
+        if isinstance(body, dict) and "records" not in body:
+            result = compute_record(body)
+            if "patient_id" in body:
+                result = {"patient_id": body["patient_id"], **result}
+            return web.json_response(result, dumps=_dumps)
+        records = body["records"] if isinstance(body, dict) else body
+        if not isinstance(records, list) or not all(isinstance(r, dict) for r in records):
+            raise BadRequest("records はオブジェクトの配列で指定してください")
+        if len(records) > INLINE_BATCH:
+            results = await asyncio.get_running_loop().run_in_executor(None, compute_records, records)
+        else:
+            results = compute_records(records)
+        return web.json_response({"results": results}, dumps=_dumps)
+
+
+async def report(request):
+    body = await _read_json(request)
+    if not isinstance(body, dict):
+        raise BadRequest("報告書は 1 件ずつ JSON オブジェクトで指定してください")
+    with stage("api.report"):
+        errors = report_record_errors(body)
+        if errors:
+            raise BadRequest(f"入力に誤りがあります: {', '.join(errors)}", errors)
+        data = prepare_report_data(_with_defaults(body))
+        loop = asyncio.get_running_loop()
+        pdf = await loop.run_in_executor(request.app[POOL_KEY], _render_pdf, data)
+    name = report_file_name(body.get("patient_id"))
+    return web.Response(body=pdf, content_type="application/pdf",
+                        headers={"Content-Disposition": f'attachment; filename="{name}"'})
+
+
+class _ZipSink:
+    # ZipFile の書き込み先。書かれたバイト列を溜めておき、drain() でまとめて取り出す
+    def __init__(self):
+        self._parts = []
+
+    def write(self, b):
+        self._parts.append(bytes(b))
+        return len(b)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+async def ward_report(request):
+    body = await _read_json(request)
+    records = body.get("records") if isinstance(body, dict) else None
+    if not isinstance(records, list) or not all(isinstance(r, dict) for r in records):
+        raise BadRequest("records はオブジェクトの配列で指定してください")
+    validate_records(records, report_record_errors)  # 送信を始める前に入力の誤りを 400 で返す
+    records = [_with_defaults(r) for r in records]
+    title = str(body.get("title") or "病棟水分出納報告書")
+
+    response = web.StreamResponse(headers={
+        "Content-Type": "application/zip",
+        "Content-Disposition": 'attachment; filename="FluidBalance_ward.zip"',
+    })
+    await response.prepare(request)
+    loop = asyncio.get_running_loop()
+    pool = request.app[POOL_KEY]
+    sink = _ZipSink()
+    with stage("api.ward_report"), tempfile.TemporaryFile("w+", encoding="utf-8") as spool, \
+            zipfile.ZipFile(sink, "w", zipfile.ZIP_STORED) as zf:
+        # 1 冊ずつワーカーで描画し、できた順に ZIP のエントリとして送る
+        for volume, first_no, chunk in iter_volumes(map(prepare_report_data, records), spool):
+            pdf = await loop.run_in_executor(pool, render_volume, title, volume, first_no, chunk)
+            zf.writestr(volume_name(volume), pdf)
+            await response.write(sink.drain())
+        pdf = await loop.run_in_executor(pool, render_index, title, list(read_index(spool)))
+        zf.writestr(INDEX_NAME, pdf)
+    await response.write(sink.drain())
+    await response.write_eof()
+    return response
+
+
+async def healthz(request):
+    return web.json_response({"status": "ok"})
+
+
+async def metrics(request):
+    return web.Response(text=REGISTRY.to_prometheus(), content_type="text/plain")
+
+
+# ================================
+# 3. アプリケーション
+# ================================
+def create_app(workers=None):
+    app = web.Application(middlewares=[error_middleware], client_max_size=16 * 1024 * 1024)
+    app.router.add_post("/v1/balance", balance)
+    app.router.add_post("/v1/report", report)
+    app.router.add_post("/v1/ward-report", ward_report)
+    app.router.add_get("/healthz", healthz)
+    app.router.add_get("/metrics", metrics)
+
+    async def pdf_pool(app):
+        # ワーカー起動時に ReportLab の読み込みとフォント登録を済ませておく
+        pool = ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1, initializer=setup_pdf)
+        app[POOL_KEY] = pool
+        yield
+        pool.shutdown(wait=True, cancel_futures=True)
+
+    app.cleanup_ctx.append(pdf_pool)
+    return app
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="水分出納の計算・報告書 PDF の HTTP/JSON API")
+    parser.add_argument("--host", default="0.0.0.0", help="待ち受けアドレス（既定: 0.0.0.0）")
+    parser.add_argument("--port", type=int, default=8080, help="待ち受けポート（既定: 8080）")
+    parser.add_argument("--workers", type=int, default=None, help="PDF 描画のワーカープロセス数（既定: CPU コア数）")
+    args = parser.parse_args(argv)
+    web.run_app(create_app(args.workers), host=args.host, port=args.port)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,184 @@
+"""水分出納の計算エンジン（Streamlit 非依存）
+
+メイン計算ページと同じ推算式を NumPy の列配列でまとめて計算する。
+スカラーを渡せば 1 患者分、配列を渡せば多数の患者日を 1 回で評価できる。
+推算係数も引数で差し替えられ、配列を渡せば係数の組み合わせもまとめて評価できる
+（sensitivity.py・uncertainty.py）。
+"""
+import numpy as np
+
+# ================================
+# 0. 推算係数
+# ================================
+META_COEF_DEFAULT = 0.13          # 代謝水産生係数（mL/kcal）
+
+INSENSIBLE_BASE = 15.0            # 不感蒸泄の基本量（mL/kg/day）
+FEVER_THRESHOLD = 37.0            # 発熱補正の開始体温（℃）
+FEVER_COEF = 0.15                 # 1℃上昇あたりの増加率
+ROOM_THRESHOLD = 30.0             # 室温補正の開始温度（℃）
+ROOM_COEF = 0.175                 # 1℃上昇あたりの増加率
+
+STOOL_TYPES = ("普通", "軟便", "下痢")
+STOOL_FACTORS = {"普通": 0.75, "軟便": 0.85, "下痢": 0.95}
+
+OVERLOAD_THRESHOLD = 500          # これを超えると体液過剰（mL/day）
+DEHYDRATION_THRESHOLD = -200      # これ未満で脱水リスク（mL/day）
+
+LOSS_CAUTION = 2.0                # 損失率 注意（%）
+LOSS_DANGER = 3.0                 # 損失率 危険（%）
+
+# 体重あたりの尿量の目安（mL/kg/day）
+URINE_OLIGURIA_RATE = 10          # これ未満で少尿
+URINE_NORMAL_RATE = 20            # 正常
+URINE_POLYURIA_RATE = 40          # これを超えると多尿
+
+JUDGMENT_MAINTAIN = "維持範囲"
+JUDGMENT_OVERLOAD = "体液過剰の傾向"
+JUDGMENT_DEHYDRATION = "脱水リスク"
+
+# loss_level の値
+LOSS_NONE, LOSS_MILD, LOSS_CAUTION_LEVEL, LOSS_DANGER_LEVEL = 0, 1, 2, 3
+
+INPUT_COLUMNS = (
+    "age", "gender", "weight", "temp", "room_temp",
+    "kcal", "meta_coef", "oral", "iv", "blood",
+    "urine_times", "urine_volume", "bleeding", "stool_weight", "stool_type",
+)
+
+REQUIRED_COLUMNS = ("age", "gender", "weight", "temp", "room_temp")
+GENDERS = ("男性", "女性")  # tbw_ratio は "男性" 以外を女性として扱う
+
+# 省略可能な入力列の既定値（compute_balance の既定値と同じ）
+INPUT_DEFAULTS = {
+    "kcal": 0, "meta_coef": META_COEF_DEFAULT, "oral": 0, "iv": 0, "blood": 0,
+    "urine_times": 0, "urine_volume": 0, "bleeding": 0,
+    "stool_weight": 0, "stool_type": "普通",
+}
+
+OUTPUT_COLUMNS = (
+    "metabolic", "insensible", "urine", "stool",
+    "total_in", "total_out", "net", "judgment",
+    "tbw_ratio", "tbw", "loss_rate", "loss_level",
+)
+
+
+def _f(x):
+    return np.asarray(x, dtype=np.float64)
+
+
+# ================================
+# 1. 個別の推算式
+# ================================
+def metabolic_water(kcal, meta_coef=META_COEF_DEFAULT):
+    # 摂取エネルギー × 係数
+    return _f(kcal) * _f(meta_coef)
+
+
+def insensible_loss(weight, temp, room_temp,
+                    base=INSENSIBLE_BASE, fever_coef=FEVER_COEF, room_coef=ROOM_COEF):
+    # 15 mL/kg を基本に、発熱と高室温で増加させる
+    temp = _f(temp)
+    room_temp = _f(room_temp)
+    fever = np.where(temp > FEVER_THRESHOLD, 1 + _f(fever_coef) * (temp - FEVER_THRESHOLD), 1.0)
+    room = np.where(room_temp > ROOM_THRESHOLD, 1 + _f(room_coef) * (room_temp - ROOM_THRESHOLD), 1.0)
+    return _f(base) * _f(weight) * fever * room
+
+
+def stool_factor(stool_type):
+    # 便性状による水分含有率（普通・軟便以外は下痢と同じ 0.95。メイン計算ページの元の式と同じ）
+    stool_type = np.asarray(stool_type)
+    return np.select(
+        [stool_type == "普通", stool_type == "軟便"],
+        [STOOL_FACTORS["普通"], STOOL_FACTORS["軟便"]],
+        STOOL_FACTORS["下痢"],
+    )
+
+
+def stool_water(stool_weight, stool_type, factor=None):
+    # factor を渡すと便性状からの水分含有率の代わりに使う
+    return _f(stool_weight) * (stool_factor(stool_type) if factor is None else _f(factor))
+
+
+def tbw_ratio(age, gender):
+    # 乳児 80% / 小児 70% / 高齢者 50% / 成人 男性 60%・女性 55%
+    age = _f(age)
+    male = np.asarray(gender) == "男性"
+    return np.select(
+        [age < 1, age < 14, age >= 65, male],
+        [0.8, 0.7, 0.5, 0.6],
+        0.55,
+    )
+
+
+def judgment(net):
+    net = _f(net)
+    return np.select(
+        [net > OVERLOAD_THRESHOLD, net < DEHYDRATION_THRESHOLD],
+        [JUDGMENT_OVERLOAD, JUDGMENT_DEHYDRATION],
+        JUDGMENT_MAINTAIN,
+    )
+
+
+def loss_rate(net, tbw):
+    # マイナスバランス分のみを TBW に対する割合（%）で返す
+    net = _f(net)
+    tbw = _f(tbw)
+    loss_ml = np.where(net < 0, -net, 0.0)
+    return np.divide(loss_ml * 100, tbw, out=np.zeros(np.broadcast(loss_ml, tbw).shape), where=tbw > 0)
+
+
+def loss_level(rate):
+    rate = _f(rate)
+    return np.select(
+        [rate >= LOSS_DANGER, rate >= LOSS_CAUTION, rate > 0],
+        [LOSS_DANGER_LEVEL, LOSS_CAUTION_LEVEL, LOSS_MILD],
+        LOSS_NONE,
+    )
+
+
+# ================================
+# 2. 一括計算
+# ================================
+def compute_balance(age, gender, weight, temp, room_temp,
+                    kcal=0, meta_coef=META_COEF_DEFAULT,
+                    oral=0, iv=0, blood=0,
+                    urine_times=0, urine_volume=0, bleeding=0,
+                    stool_weight=0, stool_type="普通",
+                    insensible_base=INSENSIBLE_BASE, fever_coef=FEVER_COEF, room_coef=ROOM_COEF,
+                    stool_coef=None):
+    """入力列から派生列をすべて計算し、OUTPUT_COLUMNS をキーとする dict を返す。
+
+    insensible_base 以降は推算係数の差し替え用（既定は画面と同じ値）。
+    """
+    metabolic = metabolic_water(kcal, meta_coef)
+    insensible = insensible_loss(weight, temp, room_temp, insensible_base, fever_coef, room_coef)
+    urine = _f(urine_times) * _f(urine_volume)
+    stool = stool_water(stool_weight, stool_type, stool_coef)
+
+    total_in = _f(oral) + _f(iv) + _f(blood) + metabolic
+    total_out = urine + _f(bleeding) + stool + insensible
+    net = total_in - total_out
+
+    ratio = tbw_ratio(age, gender)
+    tbw = _f(weight) * ratio * 1000  # mL換算
+    rate = loss_rate(net, tbw)
+
+    return {
+        "metabolic": metabolic,
+        "insensible": insensible,
+        "urine": urine,
+        "stool": stool,
+        "total_in": total_in,
+        "total_out": total_out,
+        "net": net,
+        "judgment": judgment(net),
+        "tbw_ratio": ratio,
+        "tbw": tbw,
+        "loss_rate": rate,
+        "loss_level": loss_level(rate),
+    }
+
+
+def compute_one(**inputs):
+    """1 患者分を計算し、Python のスカラー値で返す（画面表示・PDF 用）。"""
+    return {k: v.item() for k, v in compute_balance(**inputs).items()}
@@ -0,0 +1,115 @@
+"""計算済み記録の列指向エクスポート（Parquet / Arrow、日付・病棟で分割、差分追記）
+
+balance_store の全記録（入力値と代謝水・不感蒸泄・便中水分・合計・バランス・TBW・
+損失率などの計算結果）を Hive 形式のディレクトリ（day=YYYY-MM-DD/ward=.../）に
+書き出す。前回までに出力した rev を出力先の状態ファイルに残し、次回はそれ以降に
+保存・上書きされた記録だけを新しいファイルとして追記する。上書きされた記録は
+同じ (patient_id, day) で rev の大きい行が新しい。
+
+使い方:
+    python balance_export.py -o export/                  # 前回からの差分を追記
+    python balance_export.py -o export/ --format arrow   # Arrow IPC（Feather v2）で出力
+
+読み出し例（day・ward の条件はディレクトリ単位で絞り込まれる）:
+    pyarrow.dataset.dataset("export/", partitioning="hive").to_table(filter=ds.field("ward") == "3E")
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from balance_engine import INPUT_COLUMNS, OUTPUT_COLUMNS
+from balance_store import DEFAULT_DB_PATH, BalanceStore
+
+FORMATS = {"parquet": "parquet", "arrow": "ipc"}
+STATE_FILE = "_export_state.json"
+DEFAULT_BATCH_SIZE = 50_000
+
+PARTITION_SCHEMA = pa.schema([("day", pa.string()), ("ward", pa.string())])
+
+_STRING_COLUMNS = {"gender", "stool_type", "judgment"}
+SCHEMA = pa.schema(
+    [("patient_id", pa.string()), ("day", pa.string()), ("ward", pa.string()),
+     ("recorded_at", pa.timestamp("s")), ("recorder", pa.string())]
+    + [(c, pa.string() if c in _STRING_COLUMNS else pa.float64()) for c in INPUT_COLUMNS + OUTPUT_COLUMNS
+       if c != "loss_level"]
+    + [("loss_level", pa.int8()), ("rev", pa.int64())]
+)
+
+
+def read_state(out_dir):
+    path = Path(out_dir) / STATE_FILE
+    if path.exists():
+        return json.loads(path.read_text(encoding="utf-8"))
+    return {"rev": 0, "rows": 0}
+
+
+def _write_state(out_dir, state):
+    # 書き込み途中で止まっても前回の状態が残るよう、一時ファイルから置き換える
+    path = Path(out_dir) / STATE_FILE
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(state, ensure_ascii=False, indent=2), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def rows_to_table(rows):
+    cols = {name: [r.get(name) for r in rows] for name in SCHEMA.names}
+    # 病棟未設定は空文字のディレクトリ名にならないよう null（__HIVE_DEFAULT_PARTITION__）にする
+    cols["ward"] = [w or None for w in cols["ward"]]
+    cols["recorded_at"] = pa.array(cols["recorded_at"], pa.string()).cast(pa.timestamp("s"))
+    return pa.table(cols, schema=SCHEMA)
+
+
+def export_changes(store, out_dir, fmt="parquet", batch_size=DEFAULT_BATCH_SIZE, full=False):
+    """前回の出力以降に変わった記録を out_dir に追記し、(追記行数, 新しい rev) を返す。"""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    state = {"rev": 0, "rows": 0} if full else read_state(out_dir)
+    partitioning = ds.partitioning(PARTITION_SCHEMA, flavor="hive")
+    ext = "parquet" if fmt == "parquet" else "arrow"
+
+    written = 0
+    for rows in store.iter_changes(state["rev"], batch_size):
+        # ファイル名は先頭の rev で決まるため、途中で止まって再実行しても同じ名前で上書きされる
+        ds.write_dataset(
+            rows_to_table(rows), out_dir, format=FORMATS[fmt], partitioning=partitioning,
+            basename_template=f"part-{rows[0]['rev']:012d}-{{i}}.{ext}",
+            existing_data_behavior="overwrite_or_ignore",
+        )
+        written += len(rows)
+        state = {"rev": rows[-1]["rev"], "rows": state["rows"] + len(rows), "format": fmt}
+        _write_state(out_dir, state)
+    return written, state["rev"]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="水分出納記録を日付・病棟で分割した Parquet / Arrow に書き出します。")
+    parser.add_argument("-o", "--output-dir", required=True, help="出力先ディレクトリ")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help=f"記録のデータベース（既定: {DEFAULT_DB_PATH}）")
+    parser.add_argument("--format", choices=FORMATS, default="parquet", help="出力形式（既定: parquet）")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f"1 回に読み出して書き込む件数（既定: {DEFAULT_BATCH_SIZE}）")
+    parser.add_argument("--full", action="store_true", help="状態ファイルを無視して全件を書き出す（空の出力先で使う）")
+    args = parser.parse_args(argv)
+
+    state = read_state(args.output_dir)
+    if not args.full and state.get("format", args.format) != args.format:
+        parser.error(f"出力先は {state['format']} 形式で書き出されています")
+
+    store = BalanceStore(args.db)
+    start = time.perf_counter()
+    try:
+        written, rev = export_changes(store, args.output_dir, args.format, args.batch_size, args.full)
+    finally:
+        store.close()
+    print(f"{written} 件を追記しました（rev {rev} まで, {time.perf_counter() - start:.2f} 秒）", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,183 @@
+"""警告ルール（データで宣言し、全患者の列配列にまとめて適用する）
+
+ルールは dict のリスト（JSON ファイルからも読める）で宣言する:
+
+    {"name": "overload", "label": "🟣 体液過剰", "level": 2,
+     "all": [["net", ">", 500]]}
+    {"name": "overload", "label": "🟣 体液過剰", "level": 2,
+     "scope": {"ward": ["ICU", "HCU"]}, "all": [["net", ">", 1000]]}
+    {"name": "loss_caution", "label": "🟠 注意", "level": 3,
+     "scope": {"age": {"min": 65}}, "any": [["loss_rate", ">=", 1.5], ["net", "<", -500]]}
+
+- all / any: [列名, 演算子, 値] の条件。all はすべて、any はいずれかを満たすと発火する
+  （両方あれば両方を満たすとき）。演算子は OPS のいずれか。
+- scope: 適用する患者の範囲。値が文字列・数値なら一致、リストならいずれかに一致、
+  {"min", "max"} なら min 以上 max 未満。
+- 同じ name のルールが複数あるときは、scope の列数が多い（より限定的な）ルールが
+  その範囲の患者について優先され、残りの患者に次のルールが適用される。
+- level は発火したときの重み（ward_board の RISK_* と同じ尺度）。患者ごとに
+  発火したルールのうち level が最大のものを代表とする。
+
+compile_rules() で各条件を NumPy の比較関数に変換しておき、evaluate() では
+ルールごとに列配列を 1 回比較するだけで全患者を評価する（患者ごとのループはない）。
+"""
+import json
+
+import numpy as np
+
+OPS = {
+    ">": np.greater,
+    ">=": np.greater_equal,
+    "<": np.less,
+    "<=": np.less_equal,
+    "==": np.equal,
+    "!=": np.not_equal,
+    "in": lambda a, b: np.isin(a, list(b)),
+    "not in": lambda a, b: ~np.isin(a, list(b)),
+}
+
+
+def _condition(cond):
+    try:
+        field, op, value = cond
+    except (TypeError, ValueError):
+        raise ValueError(f"条件は [列名, 演算子, 値] で指定してください: {cond!r}") from None
+    if op not in OPS:
+        raise ValueError(f"未対応の演算子です: {op!r}（{', '.join(OPS)}）")
+    fn = OPS[op]
+    return field, lambda cols: fn(cols[field], value)
+
+
+def _scope(field, value):
+    if isinstance(value, dict):
+        unknown = set(value) - {"min", "max"}
+        if unknown:
+            raise ValueError(f"scope の範囲は min / max で指定してください: {field}")
+        low, high = value.get("min"), value.get("max")
+
+        def in_range(cols):
+            mask = np.ones(len(cols[field]), dtype=bool)
+            if low is not None:
+                mask &= cols[field] >= low
+            if high is not None:
+                mask &= cols[field] < high
+            return mask
+        return in_range
+    if isinstance(value, (list, tuple)):
+        return lambda cols: np.isin(cols[field], list(value))
+    return lambda cols: cols[field] == value
+
+
+class Rule:
+    """compile_rules() が作るコンパイル済みのルール。"""
+
+    __slots__ = ("name", "label", "level", "fields", "specificity", "_scope", "_all", "_any")
+
+    def __init__(self, spec):
+        try:
+            self.name = spec["name"]
+            self.level = int(spec["level"])
+        except KeyError as e:
+            raise ValueError(f"ルールに {e.args[0]} がありません: {spec!r}") from None
+        self.label = spec.get("label", self.name)
+        if not spec.get("all") and not spec.get("any"):
+            raise ValueError(f"ルール {self.name} に条件（all / any）がありません。")
+        scope = spec.get("scope") or {}
+        all_ = [_condition(c) for c in spec.get("all", ())]
+        any_ = [_condition(c) for c in spec.get("any", ())]
+        self.fields = set(scope) | {f for f, _ in all_ + any_}
+        self.specificity = len(scope)
+        self._scope = [_scope(f, v) for f, v in scope.items()]
+        self._all = [fn for _, fn in all_]
+        self._any = [fn for _, fn in any_]
+
+    def scope(self, cols, n):
+        mask = np.ones(n, dtype=bool)
+        for fn in self._scope:
+            mask &= fn(cols)
+        return mask
+
+    def predicate(self, cols, n):
+        mask = np.ones(n, dtype=bool)
+        for fn in self._all:
+            mask &= fn(cols)
+        if self._any:
+            mask &= np.logical_or.reduce([fn(cols) for fn in self._any])
+        return mask
+
+
+class RuleSet:
+    """コンパイル済みのルール一式。evaluate() で列配列をまとめて評価する。"""
+
+    def __init__(self, rules):
+        self.rules = rules
+        # name ごとに、限定的な scope のルールから順に並べる（同じ限定度は宣言順）
+        self.groups = {}
+        for rule in rules:
+            self.groups.setdefault(rule.name, []).append(rule)
+        for group in self.groups.values():
+            group.sort(key=lambda r: -r.specificity)
+        self.fields = set().union(*(r.fields for r in rules)) if rules else set()
+        # 代表ルールの添字から name・label を引く表（末尾は発火なしの ""）
+        self._index = {id(r): i for i, r in enumerate(rules)}
+        self._names = np.array([r.name for r in rules] + [""], dtype=object)
+        self._labels = np.array([r.label for r in rules] + [""], dtype=object)
+
+    def __len__(self):
+        return len(self.rules)
+
+    @property
+    def names(self):
+        return list(self.groups)
+
+    def _columns(self, records):
+        if hasattr(records, "columns"):  # DataFrame（index の列名も使える）
+            available = set(records.columns) | {records.index.name}
+        else:
+            available = set(records)
+        missing = self.fields - available
+        if missing:
+            raise ValueError(f"ルールに必要な列がありません: {', '.join(sorted(missing))}")
+        if hasattr(records, "columns"):
+            return {f: (records[f] if f in records.columns else records.index).to_numpy() for f in self.fields}
+        return {f: np.asarray(records[f]) for f in self.fields}
+
+    def evaluate(self, records):
+        """records（列名 → 配列の dict か DataFrame）の全行を評価する。
+
+        返り値は {"fired": {name: 発火した行の bool 配列}, "level": 行ごとの最大 level,
+        "label": 行ごとの代表ルールの label（発火なしは ""）, "name": 同じく name}。
+        """
+        cols = self._columns(records)
+        # 行数は records 自体から取る（ルールが空でも全行に「発火なし」を返す）
+        if hasattr(records, "columns"):
+            n = len(records)
+        else:
+            n = len(next(iter(records.values()))) if records else 0
+
+        fired = {}
+        level = np.zeros(n, dtype=np.int64)
+        top = np.full(n, -1, dtype=np.int64)
+        for name, group in self.groups.items():
+            hit = np.zeros(n, dtype=bool)
+            claimed = np.zeros(n, dtype=bool)
+            for rule in group:
+                scope = rule.scope(cols, n) & ~claimed
+                claimed |= scope
+                fire = scope & rule.predicate(cols, n)
+                hit |= fire
+                better = fire & (rule.level > level)
+                level[better] = rule.level
+                top[better] = self._index[id(rule)]
+            fired[name] = hit
+        return {"fired": fired, "level": level, "name": self._names[top], "label": self._labels[top]}
+
+
+def compile_rules(specs):
+    """ルールの宣言（dict のリスト）から RuleSet を作る。不正な宣言は ValueError。"""
+    return RuleSet([Rule(spec) for spec in specs])
+
+
+def load_rules(path):
+    with open(path, encoding="utf-8") as f:
+        return compile_rules(json.load(f))
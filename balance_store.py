@@ -0,0 +1,304 @@
+"""水分出納記録の永続化（SQLite）
+
+計算済みの患者日レコードを 1 患者 1 日 1 行で保存する。(patient_id, day) と
+(ward, day) に索引を張っているため、記録が何年分たまっても
+「患者の直近 30 日」「病棟の当日分」の読み出しは索引範囲の走査で済む。
+保存（上書きを含む）のたびに rev（単調増加の更新番号）を振り直すため、
+前回以降に変わった記録だけを rev 順に読み出せる（balance_export.py の差分出力）。
+
+時間記録モードの時刻付き記録（時間尿・輸液など）は balance_events に 1 件 1 行で
+保存し、(patient_id, ts) の索引で患者の期間分を読み出す。時間記録モードで保存した
+患者日は urine_measured = 1（尿量が実測の合計）になる。
+
+多数のセッションから小さな保存が続く場合は GroupCommitWriter を通すと、
+同時に届いた保存（患者日レコードと時刻付き記録）を 1 トランザクションに
+まとめてコミットする（グループコミット）。
+"""
+import datetime
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+
+from balance_engine import INPUT_COLUMNS, OUTPUT_COLUMNS
+from event_buffer import JST, now_jst, today_jst
+from instrumentation import stage
+
+DEFAULT_DB_PATH = os.environ.get("WATER_BALANCE_DB", "water_balance.db")
+
+# グループコミット：最初の 1 件が届いてからコミットするまでの最大待ち時間と、1 回の最大件数。
+# 既定の 0 は待たずに書き込み、前のコミット中に届いた分だけをまとめる（fsync が速いディスクではこれが最速。
+# 遅いディスクでは数 ms 待つとまとまりが大きくなる。benchmarks/group_commit.py で比べられる）
+DEFAULT_FLUSH_DELAY = float(os.environ.get("WATER_BALANCE_FLUSH_MS", "0")) / 1000
+DEFAULT_MAX_BATCH = 500
+
+KEY_COLUMNS = ("patient_id", "ward", "day", "recorded_at", "recorder")
+# 入力の方法（1: 時間記録モードで尿量を実測、0: 回数 × 平均量の推算）
+MODE_COLUMNS = ("urine_measured",)
+RECORD_COLUMNS = KEY_COLUMNS + INPUT_COLUMNS + OUTPUT_COLUMNS + MODE_COLUMNS
+
+_TEXT_COLUMNS = {"patient_id", "ward", "day", "recorded_at", "recorder", "gender", "stool_type", "judgment"}
+
+# 時刻付き記録（ts は UNIX 時刻の秒、kind は event_buffer.EVENT_KINDS のキー）
+EVENT_COLUMNS = ("patient_id", "ward", "ts", "kind", "volume", "recorded_at", "recorder")
+_EVENT_TYPES = {"ts": "INTEGER", "volume": "REAL"}
+
+
+
+def _record_type(column):
+    if column in _TEXT_COLUMNS:
+        return "TEXT"
+    return "INTEGER" if column in MODE_COLUMNS else "REAL"
+
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS balance_records (
+    id INTEGER PRIMARY KEY,
+    {", ".join(f"{c} {_record_type(c)}" for c in RECORD_COLUMNS)},
+    rev INTEGER
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_patient_day ON balance_records (patient_id, day);
+CREATE INDEX IF NOT EXISTS idx_ward_day ON balance_records (ward, day);
+CREATE TABLE IF NOT EXISTS balance_events (
+    id INTEGER PRIMARY KEY,
+    {", ".join(f"{c} {_EVENT_TYPES.get(c, 'TEXT')}" for c in EVENT_COLUMNS)}
+);
+CREATE INDEX IF NOT EXISTS idx_event_patient_ts ON balance_events (patient_id, ts);
+"""
+
+_UPSERT_RECORD = (
+    f"INSERT INTO balance_records ({', '.join(RECORD_COLUMNS)}, rev) "
+    f"VALUES ({', '.join('?' for _ in RECORD_COLUMNS)}, "
+    f"(SELECT COALESCE(MAX(rev), 0) + 1 FROM balance_records)) "
+    f"ON CONFLICT(patient_id, day) DO UPDATE SET "
+    + ", ".join(f"{c}=excluded.{c}" for c in (*RECORD_COLUMNS, "rev") if c not in ("patient_id", "day"))
+)
+_INSERT_EVENT = (
+    f"INSERT INTO balance_events ({', '.join(EVENT_COLUMNS)}) VALUES ({', '.join('?' for _ in EVENT_COLUMNS)})"
+)
+
+# rev 列がない（以前の版で作った）データベースへの追加
+_MIGRATE_REV = """
+ALTER TABLE balance_records ADD COLUMN rev INTEGER;
+UPDATE balance_records SET rev = id;
+"""
+# urine_measured 列がないデータベースへの追加（以前の記録は推算として扱う）
+_MIGRATE_MODE = "ALTER TABLE balance_records ADD COLUMN urine_measured INTEGER DEFAULT 0"
+
+
+def _day(value):
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.strftime("%Y-%m-%d")
+    return str(value)
+
+
+def _stamp(recorded_at):
+    # 記録時刻は日本時間の壁時計で保存する（オフセットは付けない。既存の行・差分出力と同じ形式）
+    recorded_at = recorded_at or now_jst()
+    if recorded_at.tzinfo is not None:
+        recorded_at = recorded_at.astimezone(JST).replace(tzinfo=None)
+    return recorded_at.isoformat(timespec="seconds")
+
+
+class BalanceStore:
+    # 1 接続をスレッド間で共有する（Streamlit の各セッションは別スレッドで動く）
+    def __init__(self, path=DEFAULT_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # コミットが返った時点で WAL をディスクに同期する（電源断でも確定済みの記録は失われない）
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.executescript(_SCHEMA)
+        columns = {r["name"] for r in self._conn.execute("PRAGMA table_info(balance_records)")}
+        if "rev" not in columns:
+            self._conn.executescript(_MIGRATE_REV)
+        if "urine_measured" not in columns:
+            self._conn.execute(_MIGRATE_MODE)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_rev ON balance_records (rev)")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # ================================
+    # 書き込み
+    # ================================
+    def save(self, patient_id, day, inputs, result, ward="", recorder="", recorded_at=None, urine_measured=False):
+        """1 患者日を保存する。同じ (patient_id, day) があれば上書きする。"""
+        self.save_many([self.make_row(patient_id, day, inputs, result, ward, recorder, recorded_at, urine_measured)])
+
+    def save_many(self, rows):
+        self.write_batch(rows, ())
+
+    def save_events(self, rows):
+        """時刻付き記録（make_event_row() の行）をまとめて追加する。"""
+        self.write_batch((), rows)
+
+    def write_batch(self, records, events):
+        """患者日レコードと時刻付き記録を 1 トランザクションで書き込む。"""
+        with self._lock, self._conn:
+            if records:
+                self._conn.executemany(_UPSERT_RECORD, ([row.get(c) for c in RECORD_COLUMNS] for row in records))
+            if events:
+                self._conn.executemany(_INSERT_EVENT, ([row.get(c) for c in EVENT_COLUMNS] for row in events))
+
+    @staticmethod
+    def make_row(patient_id, day, inputs, result, ward="", recorder="", recorded_at=None, urine_measured=False):
+        row = {k: inputs.get(k) for k in INPUT_COLUMNS}
+        row.update({k: result[k] for k in OUTPUT_COLUMNS})
+        row.update(
+            patient_id=str(patient_id), ward=ward, day=_day(day), recorder=recorder,
+            recorded_at=_stamp(recorded_at), urine_measured=int(bool(urine_measured)),
+        )
+        return row
+
+    @staticmethod
+    def make_event_row(patient_id, ts, kind, volume, ward="", recorder="", recorded_at=None):
+        return dict(
+            patient_id=str(patient_id), ward=ward, ts=int(ts.timestamp() if isinstance(ts, datetime.datetime) else ts),
+            kind=kind, volume=float(volume), recorder=recorder,
+            recorded_at=_stamp(recorded_at),
+        )
+
+    # ================================
+    # 読み出し
+    # ================================
+    def _query(self, sql, params):
+        with self._lock:
+            return [dict(r) for r in self._conn.execute(sql, params)]
+
+    def patient_history(self, patient_id, days=30, until=None):
+        """until（既定: 今日）までの直近 days 日分を日付順に返す。"""
+        until = until or today_jst()
+        if isinstance(until, str):
+            until = datetime.date.fromisoformat(until)
+        since = until - datetime.timedelta(days=days - 1)
+        return self._query(
+            "SELECT * FROM balance_records WHERE patient_id = ? AND day BETWEEN ? AND ? ORDER BY day",
+            (str(patient_id), _day(since), _day(until)),
+        )
+
+    def patient_events(self, patient_id, start, end):
+        """[start, end) の時刻付き記録を時刻順に返す（start・end は datetime か UNIX 秒）。"""
+        start, end = (int(t.timestamp()) if isinstance(t, datetime.datetime) else int(t) for t in (start, end))
+        return self._query(
+            "SELECT ts, kind, volume FROM balance_events WHERE patient_id = ? AND ts >= ? AND ts < ? ORDER BY ts, id",
+            (str(patient_id), start, end),
+        )
+
+    def iter_changes(self, after_rev=0, batch_size=10_000):
+        """rev が after_rev より大きい記録を rev 順に batch_size 件ずつのリストで返す。"""
+        while True:
+            rows = self._query(
+                "SELECT * FROM balance_records WHERE rev > ? ORDER BY rev LIMIT ?", (after_rev, batch_size),
+            )
+            if not rows:
+                return
+            yield rows
+            after_rev = rows[-1]["rev"]
+
+    def ward_day(self, ward, day=None):
+        """病棟の 1 日分（既定: 今日）を患者 ID 順に返す。"""
+        return self._query(
+            "SELECT * FROM balance_records WHERE ward = ? AND day = ? ORDER BY patient_id",
+            (ward, _day(day or today_jst())),
+        )
+
+
+class GroupCommitWriter:
+    """複数のセッション（スレッド）からの保存をまとめてコミットする。
+
+    submit()（患者日レコード）・submit_event()（時刻付き記録）は行を待ち行列に積んで
+    Future を返し、専用のスレッドが最初の 1 件から最大 flush_delay 秒（または
+    max_batch 件）分をまとめて store.write_batch() で 1 トランザクションとして書き込む。Future はコミットが終わってから完了するため、
+    save() が返った記録はディスクに確定している（コミット前に落ちた分は呼び出し元に
+    完了が返っていない）。コミット中に届いた分は次のまとまりになる。
+    """
+
+    def __init__(self, store, flush_delay=DEFAULT_FLUSH_DELAY, max_batch=DEFAULT_MAX_BATCH):
+        self.store = store
+        self.flush_delay = flush_delay
+        self.max_batch = max_batch
+        self.commits = 0
+        self.rows = 0
+        self._cond = threading.Condition()
+        self._pending = []  # (届いた時刻, 種類 "record" / "event", 行, Future)
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="balance-group-commit", daemon=True)
+        self._thread.start()
+
+    def submit(self, row):
+        return self._submit("record", row)
+
+    def submit_event(self, row):
+        return self._submit("event", row)
+
+    def _submit(self, kind, row):
+        future = Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("GroupCommitWriter は閉じられています。")
+            self._pending.append((time.monotonic(), kind, row, future))
+            if len(self._pending) == 1 or len(self._pending) >= self.max_batch:
+                self._cond.notify()
+        return future
+
+    def save(self, patient_id, day, inputs, result, ward="", recorder="", recorded_at=None, timeout=None):
+        """BalanceStore.save() と同じ引数で保存し、コミットされるまで待つ。"""
+        row = self.store.make_row(patient_id, day, inputs, result, ward, recorder, recorded_at)
+        self.submit(row).result(timeout)
+
+    def add_event(self, patient_id, ts, kind, volume, ward="", recorder="", recorded_at=None, timeout=None):
+        """時刻付き記録を 1 件保存し、コミットされるまで待つ。"""
+        row = self.store.make_event_row(patient_id, ts, kind, volume, ward, recorder, recorded_at)
+        self.submit_event(row).result(timeout)
+
+    def close(self):
+        """待ち行列に残った分をコミットしてからスレッドを止める。"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+
+    def _next_batch(self):
+        with self._cond:
+            while not self._pending:
+                if self._closed:
+                    return None
+                self._cond.wait()
+            # 最初の 1 件が届いてから flush_delay が過ぎるか、max_batch 件たまるまで待つ
+            deadline = self._pending[0][0] + self.flush_delay
+            while len(self._pending) < self.max_batch and not self._closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+            return batch
+
+    def _commit(self, batch):
+        try:
+            with stage("store.group_commit"):
+                self.store.write_batch(
+                    [row for _, kind, row, _ in batch if kind == "record"],
+                    [row for _, kind, row, _ in batch if kind == "event"],
+                )
+        except Exception as e:
+            # まとめた分はトランザクションごと取り消されている。不正な行だけを失敗にするため 1 件ずつやり直す
+            if len(batch) > 1:
+                for item in batch:
+                    self._commit([item])
+            else:
+                batch[0][3].set_exception(e)
+            return
+        self.commits += 1
+        self.rows += len(batch)
+        for *_, future in batch:
+            future.set_result(None)
+
+    def _run(self):
+        while (batch := self._next_batch()) is not None:
+            self._commit(batch)
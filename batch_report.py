@@ -0,0 +1,164 @@
+"""複数患者の PDF 報告書の一括生成
+
+report_data（generate_medical_report に渡す dict）の列をプロセスプールで並列に描画する。
+出力は「患者ごとに 1 ファイル」「全患者を 1 冊にまとめた PDF」、またはその両方。
+ward を指定すると、1 ページに複数患者を載せた病棟報告書（目次付き・分冊）を
+逐次書き出す（ward_report.py。患者数が多くてもメモリ使用量は一定）。
+
+使い方:
+    python batch_report.py ward.jsonl -o reports/ --mode both --workers 4
+    python batch_report.py ward.jsonl -o reports/ --mode ward --title "3 階東病棟 2026/01/09"
+
+入力は 1 行 1 レコードの JSON Lines。net などの計算結果を含まないレコードは
+balance_engine の入力列（batch_score.py と同じ）として計算してから描画する。
+必須項目の値が欠けたレコードは描画せずに飛ばし、件の番号と欠けた項目を報告する。
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from balance_engine import INPUT_DEFAULTS, REQUIRED_COLUMNS, compute_one
+from batch_score import MISSING_VALUE_ERROR
+from event_buffer import now_jst
+from medical_report import (
+    REPORT_REQUIRED_KEYS, build_report_data, generate_medical_report, generate_report_document, report_file_name,
+    unique_file_names,
+)
+from ward_report import write_ward_report
+
+MODES = ("files", "binder", "both", "ward")
+BINDER_NAME = "FluidBalance_binder.pdf"
+
+
+# ================================
+# 1. レコードの準備
+# ================================
+def missing_fields(record):
+    """描画に必要な項目のうち、値が欠けている（キーなし・None・NaN）ものの名前のリストを返す。
+
+    計算済み（net を含む）のレコードは報告書が読む項目を、未計算なら計算エンジンの必須列を確かめる。
+    """
+    keys = REPORT_REQUIRED_KEYS if "net" in record else REQUIRED_COLUMNS
+    return [k for k in keys if (v := record.get(k)) is None or (isinstance(v, float) and v != v)]
+
+
+def valid_report_data(records, skipped):
+    """描画できるレコードだけを prepare_report_data() して返す。
+
+    必須項目が欠けたレコードは飛ばし、(番号, patient_id, 理由) を skipped に追加する。
+    """
+    for i, record in enumerate(records):
+        missing = missing_fields(record)
+        if missing:
+            skipped.append((i, record.get("patient_id"), f"{MISSING_VALUE_ERROR}: {', '.join(missing)}"))
+            continue
+        yield prepare_report_data(record)
+
+
+def prepare_report_data(record):
+    # 計算済み（net を含む）ならそのまま、未計算なら計算エンジンで補完する
+    if "net" in record:
+        return record
+    inputs = {**INPUT_DEFAULTS, **record}
+    engine_inputs = {k: inputs[k] for k in (*REQUIRED_COLUMNS, *INPUT_DEFAULTS)}
+    result = compute_one(**engine_inputs)
+    extra = {k: v for k, v in record.items() if k not in engine_inputs and k != "recorder"}
+    return build_report_data(inputs, result, record.get("recorder", "未記入"), **extra)
+
+
+# ================================
+# 2. ワーカー（プロセスプール内で実行）
+# ================================
+def _render_file(args):
+    data, path = args
+    Path(path).write_bytes(generate_medical_report(data).getvalue())
+    return 1
+
+
+def _render_binder(records, path):
+    return generate_report_document(records, str(path))
+
+
+# ================================
+# 3. 一括生成
+# ================================
+def render_reports(records, out_dir, mode="files", workers=None, title="病棟水分出納報告書", skipped=None):
+    """records を out_dir に描画し、(ページ数, 経過秒) を返す。
+
+    必須項目が欠けたレコードは描画せず、skipped（リスト）を渡せば (番号, patient_id, 理由) を追加する。
+    ReportLab の canvas はプロセス間で共有できないため、1 冊版は 1 ワーカーで
+    描画し、患者別ファイルの描画と並行して進める。
+    """
+    if mode not in MODES:
+        raise ValueError(f"mode は {MODES} のいずれかを指定してください: {mode}")
+    skipped = [] if skipped is None else skipped
+    if mode == "ward":
+        start = time.perf_counter()
+        pages = write_ward_report(valid_report_data(records, skipped), out_dir, title)
+        return pages, time.perf_counter() - start
+    records = list(valid_report_data(records, skipped))
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    workers = workers or os.cpu_count() or 1
+    start = time.perf_counter()
+    pages = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        binder = None
+        if mode in ("binder", "both"):
+            binder = pool.submit(_render_binder, records, out_dir / BINDER_NAME)
+        if mode in ("files", "both"):
+            # 同じ患者の記録が複数あっても作成日時は同じなので、重なった名前には番号を付ける
+            now = now_jst()
+            names = unique_file_names(
+                report_file_name(data.get("patient_id") or f"{i:05d}", now) for i, data in enumerate(records)
+            )
+            jobs = [(data, out_dir / name) for data, name in zip(records, names)]
+            chunksize = max(1, len(jobs) // (4 * workers))
+            pages += sum(pool.map(_render_file, jobs, chunksize=chunksize))
+        if binder is not None:
+            pages += binder.result()
+    return pages, time.perf_counter() - start
+
+
+def read_records(path):
+    # 1 行ずつ読み込む（病棟報告書はファイル全体を読み込まずに描画できる）
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+# ================================
+# 4. エントリポイント
+# ================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="複数患者の水分出納報告書 PDF を一括生成します。")
+    parser.add_argument("input", help="report_data の JSON Lines ファイル")
+    parser.add_argument("-o", "--output-dir", required=True, help="PDF の出力先ディレクトリ")
+    parser.add_argument("--mode", choices=MODES, default="files",
+                        help="files: 患者ごと / binder: 1 冊にまとめる / both: 両方 / "
+                             "ward: 1 ページ複数患者の病棟報告書（既定: files）")
+    parser.add_argument("--title", default="病棟水分出納報告書", help="病棟報告書の表題（--mode ward）")
+    parser.add_argument("--workers", type=int, default=None, help="ワーカープロセス数（既定: CPU コア数）")
+    args = parser.parse_args(argv)
+
+    skipped = []
+    pages, elapsed = render_reports(
+        read_records(args.input), args.output_dir, args.mode, args.workers, args.title, skipped,
+    )
+    rate = pages / elapsed if elapsed > 0 else 0
+    print(f"{pages} ページを生成しました（{elapsed:.2f} 秒, {rate:.1f} ページ/秒）", file=sys.stderr)
+    if skipped:
+        print(f"警告: {len(skipped)} 件は必須項目の値が欠けているため描画していません", file=sys.stderr)
+        for i, patient_id, reason in skipped:
+            print(f"  {i + 1} 件目（患者ID: {patient_id or '-'}）: {reason}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,206 @@
+"""患者日レコードの一括スコアリング（コマンドライン）
+
+CSV / Parquet の患者日レコードをチャンク単位で読み込み、メイン計算ページと
+同じ項目（代謝水・不感蒸泄・合計・バランス・判定・TBW・損失率）を付与して
+チャンク単位で書き出す。入力の大きさに関係なくメモリ使用量は一定。
+必須列（年齢・性別・体重・体温・室温）の値が欠けた行は計算結果と判定を空にし、
+error 列に欠けている列名を入れる（既定値で補って判定を出すことはしない）。
+
+使い方:
+    python batch_score.py records.csv -o scored.parquet --chunk-size 100000
+    python batch_score.py records.csv -o scored.csv --rules rules.json   # 警告ルールも適用
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from balance_engine import INPUT_COLUMNS, INPUT_DEFAULTS, OUTPUT_COLUMNS, REQUIRED_COLUMNS, compute_balance
+from balance_rules import load_rules
+
+DEFAULT_CHUNK_SIZE = 100_000
+
+MISSING_VALUE_ERROR = "必須項目の値がありません"
+
+# Parquet 出力の列の型（入力ファイルにだけある列は最初のチャンクから推定する）
+_STRING_COLUMNS = {"gender", "stool_type", "judgment", "alert", "error"}
+_INT_COLUMNS = {"loss_level", "risk"}
+
+
+# ================================
+# 1. チャンク単位の計算
+# ================================
+def missing_required(df):
+    """行ごとに、値が欠けている必須列の名前（", " 区切り。欠けがなければ ""）を返す。"""
+    names = np.full(len(df), "", dtype=object)
+    for c in REQUIRED_COLUMNS:
+        names = names + np.where(df[c].isna().to_numpy(), f"{c}, ", "")
+    return np.array([n[:-2] for n in names], dtype=object)
+
+
+def _blank(values, invalid):
+    # 必須項目が欠けた行の計算結果を空（NaN / NA / None）にする
+    if not invalid.any():
+        return values
+    if values.dtype.kind == "f":
+        return np.where(invalid, np.nan, values)
+    if values.dtype.kind in "iu":
+        return pd.array(np.where(invalid, None, values), dtype="Int64")
+    return np.where(invalid, None, values)
+
+
+def score_frame(df, rules=None):
+    # 入力列はそのまま残し、派生列を右側に追加する。rules（balance_rules.RuleSet）があれば警告も付ける
+    missing = [c for c in REQUIRED_COLUMNS if c not in df.columns]
+    if missing:
+        raise ValueError(f"必須列がありません: {', '.join(missing)}")
+
+    missing_values = missing_required(df)
+    invalid = missing_values != ""
+    inputs = {c: df[c].to_numpy() for c in REQUIRED_COLUMNS}
+    for col, default in INPUT_DEFAULTS.items():
+        inputs[col] = df[col].fillna(default).to_numpy() if col in df.columns else default
+
+    result = compute_balance(**inputs)
+    out = df.copy()
+    for col in OUTPUT_COLUMNS:
+        out[col] = _blank(result[col], invalid)
+    if rules is not None:
+        alerts = rules.evaluate(out)
+        out["risk"] = _blank(alerts["level"], invalid)
+        out["alert"] = _blank(alerts["label"], invalid)
+    errors = np.where(invalid, MISSING_VALUE_ERROR + ": " + missing_values, None)
+    out["error"] = pd.Series(errors, index=out.index, dtype="str")
+    return out
+
+
+# ================================
+# 2. 入出力（チャンク単位）
+# ================================
+def _is_parquet(path):
+    return Path(path).suffix.lower() in (".parquet", ".pq")
+
+
+def iter_chunks(path, chunk_size=DEFAULT_CHUNK_SIZE):
+    if _is_parquet(path):
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size)
+
+
+def arrow_schema(df):
+    """score_frame() の出力 df の Arrow スキーマを返す。
+
+    入力列・派生列は値によらず型を決める（最初のチャンクで全行が欠けていても null 型にしない）。
+    それ以外の列は df から推定し、全行が欠けた列（CSV では float の NaN になる）は文字列にする。
+    """
+    import pyarrow as pa
+
+    fields = []
+    for field in pa.Schema.from_pandas(df, preserve_index=False):
+        name = field.name
+        if name in _STRING_COLUMNS:
+            type_ = pa.string()
+        elif name in _INT_COLUMNS:
+            type_ = pa.int64()
+        elif name in INPUT_COLUMNS or name in OUTPUT_COLUMNS:
+            type_ = pa.float64()
+        elif pa.types.is_null(field.type) or df[name].isna().all():
+            type_ = pa.string()
+        else:
+            type_ = field.type
+        fields.append(pa.field(name, type_))
+    return pa.schema(fields)
+
+
+def _to_table(df, schema):
+    import pyarrow as pa
+
+    # 文字列と決めた列に後のチャンクで数値などが来たら、欠けた値を残して文字列にする
+    for field in schema:
+        col = df[field.name]
+        if pa.types.is_string(field.type) and not pd.api.types.is_string_dtype(col):
+            df = df.assign(**{field.name: col.astype(object).where(col.isna(), col.astype(str))})
+    return pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+
+
+class ChunkWriter:
+    # 出力形式は拡張子で判定（.parquet / .pq 以外は CSV）
+    def __init__(self, path):
+        self.path = path
+        self._writer = None
+        self._first = True
+
+    def write(self, df):
+        if _is_parquet(self.path):
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.path, arrow_schema(df))
+            self._writer.write_table(_to_table(df, self._writer.schema))
+        else:
+            df.to_csv(self.path, mode="w" if self._first else "a", header=self._first, index=False)
+        self._first = False
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def score_file(src, dst, chunk_size=DEFAULT_CHUNK_SIZE, rules=None):
+    """src を読み、派生列（rules があれば警告も）を付けて dst に書き出す。
+
+    (処理行数, 必須項目が欠けて計算しなかった行数) を返す。
+    """
+    rows = invalid = 0
+    with ChunkWriter(dst) as writer:
+        for chunk in iter_chunks(src, chunk_size):
+            scored = score_frame(chunk, rules)
+            writer.write(scored)
+            rows += len(chunk)
+            invalid += int(scored["error"].notna().sum())
+    return rows, invalid
+
+
+# ================================
+# 3. エントリポイント
+# ================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="患者日レコードの水分出納を一括計算します。")
+    parser.add_argument("input", help="入力ファイル（.csv / .parquet）")
+    parser.add_argument("-o", "--output", required=True, help="出力ファイル（.csv / .parquet）")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                        help=f"1 回に処理する行数（既定: {DEFAULT_CHUNK_SIZE}）")
+    parser.add_argument("--rules", help="警告ルールの JSON ファイル（指定すると risk・alert 列を追加）")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    try:
+        rules = load_rules(args.rules) if args.rules else None
+        rows, invalid = score_file(args.input, args.output, args.chunk_size, rules)
+    except ValueError as e:
+        parser.exit(2, f"エラー: {e}\n")
+    elapsed = time.perf_counter() - start
+    rate = rows / elapsed if elapsed > 0 else 0
+    print(f"{rows} 行を処理しました（{elapsed:.2f} 秒, {rate:,.0f} 行/秒）", file=sys.stderr)
+    if invalid:
+        print(f"警告: {invalid} 行は必須項目の値が欠けているため計算していません（error 列を参照）", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,278 @@
+"""計算式と PDF 描画のマイクロベンチマーク
+
+代謝水・不感蒸泄（発熱・室温補正）・便中水分・TBW 係数・損失率警告・判定を
+1 行ずつのスカラー実行と列配列の一括実行で 1 / 1k / 1M 行について計測し、
+generate_medical_report の単票・一括描画も計測する。結果は行/秒（PDF はページ/秒）。
+
+スカラー版はベクトル化する前のメイン計算ページと同じ 1 値ずつの Python の式
+（if 文による補正・係数の選択）で、計測の前に一括版と同じ値になることを確かめる。
+1 行ずつ compute_one() を呼ぶ場合（画面・API の 1 件の計算）も compute_one/scalar として計る。
+1M 行のスカラー実行は SCALAR_SAMPLE_ROWS 行を計って行/秒を外挿し、baseline.json の
+extrapolated に項目名を記録する（表示では「外挿」と付ける）。
+
+使い方:
+    python benchmarks/bench_formulas.py                    # 計測して baseline.json と比較
+    python benchmarks/bench_formulas.py --save-baseline    # baseline.json を更新
+    python benchmarks/bench_formulas.py --quick            # 1M 行・一括 PDF を省略
+
+基準値より tolerance（既定 50%）以上遅い項目があれば終了コード 1 を返す。
+"""
+import argparse
+import json
+import platform
+import sys
+import tempfile
+import timeit
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import balance_engine as be  # noqa: E402
+
+BASELINE = Path(__file__).with_name("baseline.json")
+SIZES = (1, 1_000, 1_000_000)
+SCALAR_SAMPLE_ROWS = 10_000  # これより大きい行数のスカラー実行は先頭のこの行数を計って外挿する
+PDF_BULK_PAGES = 50
+
+
+# ================================
+# 1. 入力データ
+# ================================
+def make_columns(n, seed=0):
+    rnd = np.random.default_rng(seed)
+    return {
+        "age": rnd.integers(0, 100, n),
+        "gender": rnd.choice(["男性", "女性"], n),
+        "weight": rnd.uniform(3, 100, n),
+        "temp": rnd.uniform(35, 41, n),
+        "room_temp": rnd.uniform(15, 36, n),
+        "kcal": rnd.integers(0, 3000, n),
+        "meta_coef": np.full(n, be.META_COEF_DEFAULT),
+        "oral": rnd.integers(0, 3000, n),
+        "iv": rnd.integers(0, 2000, n),
+        "blood": np.zeros(n),
+        "urine_times": rnd.integers(0, 12, n),
+        "urine_volume": rnd.integers(50, 400, n),
+        "bleeding": rnd.integers(0, 300, n),
+        "stool_weight": rnd.integers(0, 300, n),
+        "stool_type": rnd.choice(be.STOOL_TYPES, n),
+    }
+
+
+def _rows(cols):
+    keys = list(cols)
+    return [dict(zip(keys, vals)) for vals in zip(*(cols[k].tolist() for k in keys))]
+
+
+# ================================
+# 2. スカラー版（ベクトル化前のメイン計算ページと同じ 1 値ずつの式）
+# ================================
+def scalar_insensible(weight, temp, room_temp):
+    insensible = be.INSENSIBLE_BASE * weight
+    if temp > be.FEVER_THRESHOLD:
+        insensible *= 1 + be.FEVER_COEF * (temp - be.FEVER_THRESHOLD)
+    if room_temp > be.ROOM_THRESHOLD:
+        insensible *= 1 + be.ROOM_COEF * (room_temp - be.ROOM_THRESHOLD)
+    return insensible
+
+
+def scalar_stool(stool_weight, stool_type):
+    return stool_weight * (0.75 if stool_type == "普通" else 0.85 if stool_type == "軟便" else 0.95)
+
+
+def scalar_tbw_ratio(age, gender):
+    if age < 1:
+        return 0.8
+    elif age < 14:
+        return 0.7
+    elif age >= 65:
+        return 0.5
+    return 0.6 if gender == "男性" else 0.55
+
+
+def scalar_loss_rate(net, tbw):
+    loss_ml = -net if net < 0 else 0
+    return loss_ml / tbw * 100 if tbw > 0 else 0
+
+
+def scalar_loss_level(rate):
+    if rate >= be.LOSS_DANGER:
+        return be.LOSS_DANGER_LEVEL
+    elif rate >= be.LOSS_CAUTION:
+        return be.LOSS_CAUTION_LEVEL
+    elif rate > 0:
+        return be.LOSS_MILD
+    return be.LOSS_NONE
+
+
+def scalar_balance(r):
+    metabolic = r["kcal"] * r["meta_coef"]
+    insensible = scalar_insensible(r["weight"], r["temp"], r["room_temp"])
+    urine = r["urine_times"] * r["urine_volume"]
+    stool = scalar_stool(r["stool_weight"], r["stool_type"])
+    total_in = r["oral"] + r["iv"] + r["blood"] + metabolic
+    total_out = urine + r["bleeding"] + stool + insensible
+    net = total_in - total_out
+    if net > be.OVERLOAD_THRESHOLD:
+        judgment = be.JUDGMENT_OVERLOAD
+    elif net < be.DEHYDRATION_THRESHOLD:
+        judgment = be.JUDGMENT_DEHYDRATION
+    else:
+        judgment = be.JUDGMENT_MAINTAIN
+    ratio = scalar_tbw_ratio(r["age"], r["gender"])
+    tbw = r["weight"] * ratio * 1000
+    rate = scalar_loss_rate(net, tbw)
+    return {
+        "metabolic": metabolic, "insensible": insensible, "urine": urine, "stool": stool,
+        "total_in": total_in, "total_out": total_out, "net": net, "judgment": judgment,
+        "tbw_ratio": ratio, "tbw": tbw, "loss_rate": rate, "loss_level": scalar_loss_level(rate),
+    }
+
+
+# ================================
+# 3. 計測対象（名前: (スカラー版, 一括版)）
+# ================================
+CASES = {
+    "metabolic_water": (
+        lambda r: r["kcal"] * r["meta_coef"],
+        lambda c: be.metabolic_water(c["kcal"], c["meta_coef"]),
+    ),
+    "insensible_loss": (
+        lambda r: scalar_insensible(r["weight"], r["temp"], r["room_temp"]),
+        lambda c: be.insensible_loss(c["weight"], c["temp"], c["room_temp"]),
+    ),
+    "stool_water": (
+        lambda r: scalar_stool(r["stool_weight"], r["stool_type"]),
+        lambda c: be.stool_water(c["stool_weight"], c["stool_type"]),
+    ),
+    "tbw_ratio": (
+        lambda r: scalar_tbw_ratio(r["age"], r["gender"]),
+        lambda c: be.tbw_ratio(c["age"], c["gender"]),
+    ),
+    "loss_rate_warning": (
+        lambda r: scalar_loss_level(scalar_loss_rate(r["oral"] - r["iv"] - 2000, r["weight"] * 600)),
+        lambda c: be.loss_level(be.loss_rate(c["oral"] - c["iv"] - 2000, c["weight"] * 600)),
+    ),
+    "compute_balance": (
+        scalar_balance,
+        lambda c: be.compute_balance(**c),
+    ),
+    # 1 行ずつ計算エンジンを呼ぶ経路（画面・API の 1 件の計算）。一括版は compute_balance と同じ
+    "compute_one": (
+        lambda r: be.compute_one(**r),
+        None,
+    ),
+}
+
+
+def check_scalar(n=1_000):
+    """スカラー版が一括版と同じ値を返すことを確かめる（違えば AssertionError）。"""
+    cols = make_columns(n, seed=2)
+    rows = _rows(cols)
+    for name, (scalar, batched) in CASES.items():
+        expected = (batched or CASES["compute_balance"][1])(cols)
+        got = [scalar(r) for r in rows]
+        if isinstance(expected, dict):
+            for key, values in expected.items():
+                actual = [g[key] for g in got]
+                ok = list(values) == actual if values.dtype.kind == "U" else np.allclose(values, actual)
+                assert ok, f"{name}: {key} がスカラー版と一括版で一致しません"
+        else:
+            assert np.allclose(expected, got), f"{name}: スカラー版と一括版で一致しません"
+
+
+def rate(fn, units, repeat=5):
+    """fn の最良実行時間から 1 秒あたりの処理量を返す。"""
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    best = min(timer.repeat(repeat=repeat, number=number)) / number
+    return units / best
+
+
+def bench_formulas(sizes):
+    """(結果, 外挿した項目名のリスト) を返す。"""
+    results, extrapolated = {}, []
+    for n in sizes:
+        cols = make_columns(n)
+        # 大きな行数のスカラー版は先頭の SCALAR_SAMPLE_ROWS 行だけ計る（1 行あたりの時間は行数によらない）
+        sample = min(n, SCALAR_SAMPLE_ROWS)
+        rows = _rows({k: v[:sample] for k, v in cols.items()})
+        for name, (scalar, batched) in CASES.items():
+            if batched is not None:
+                results[f"{name}/batched/{n}"] = rate(lambda: batched(cols), n)
+            key = f"{name}/scalar/{n}"
+            results[key] = rate(lambda: [scalar(r) for r in rows], sample, repeat=5 if sample == n else 3)
+            if sample < n:
+                extrapolated.append(key)
+    return results, extrapolated
+
+
+def bench_pdf(bulk=True):
+    from batch_report import prepare_report_data, render_reports
+    from medical_report import generate_medical_report
+
+    cols = make_columns(PDF_BULK_PAGES, seed=1)
+    records = [prepare_report_data({**r, "patient_id": f"B{i:03d}"}) for i, r in enumerate(_rows(cols))]
+    generate_medical_report(records[0])  # ReportLab の読み込みとフォント登録を計測から除く
+
+    results = {"generate_medical_report/single/1": rate(lambda: generate_medical_report(records[0]), 1, repeat=3)}
+    if bulk:
+        for mode in ("files", "binder"):
+            with tempfile.TemporaryDirectory() as out:
+                pages, elapsed = render_reports(records, out, mode=mode)
+            results[f"generate_medical_report/bulk_{mode}/{PDF_BULK_PAGES}"] = pages / elapsed
+    return results
+
+
+# ================================
+# 4. 基準値との比較
+# ================================
+def compare(results, baseline, tolerance):
+    regressions = []
+    for key, value in results.items():
+        base = baseline.get(key)
+        if base and value < base * (1 - tolerance):
+            regressions.append((key, base, value))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="水分出納の計算式・PDF 描画のベンチマーク")
+    parser.add_argument("--quick", action="store_true", help="1M 行と一括 PDF を省略する")
+    parser.add_argument("--save-baseline", action="store_true", help=f"結果を {BASELINE.name} に保存する")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="許容する低下率（既定: 0.5 = 50%%）")
+    args = parser.parse_args(argv)
+
+    sizes = SIZES[:-1] if args.quick else SIZES
+    check_scalar()
+    results, extrapolated = bench_formulas(sizes)
+    results.update(bench_pdf(bulk=not args.quick))
+
+    baseline = json.loads(BASELINE.read_text(encoding="utf-8")) if BASELINE.exists() else {"results": {}}
+    print(f"{'項目':<48}{'処理量/秒':>16}{'基準比':>10}")
+    for key, value in results.items():
+        base = baseline["results"].get(key)
+        ratio = f"{value / base:>9.2f}x" if base else f"{'-':>10}"
+        note = f"  （外挿: {SCALAR_SAMPLE_ROWS:,} 行から）" if key in extrapolated else ""
+        print(f"{key:<48}{value:>16,.0f}{ratio}{note}")
+
+    if args.save_baseline:
+        BASELINE.write_text(json.dumps({
+            "machine": {"python": platform.python_version(), "numpy": np.__version__, "platform": platform.platform()},
+            "results": results,
+            "extrapolated": {"sample_rows": SCALAR_SAMPLE_ROWS, "keys": extrapolated},
+        }, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+        print(f"{BASELINE.name} を更新しました。")
+        return 0
+
+    regressions = compare(results, baseline["results"], args.tolerance)
+    for key, base, value in regressions:
+        print(f"性能低下: {key} {value:,.0f}/秒（基準 {base:,.0f}/秒）", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,170 @@
+"""保存の書き込み性能（1 件ずつのコミットとグループコミットの比較）
+
+ICU の時間ごとの記録のように、多数のセッションから小さな保存が続く状況を
+スレッドで再現する。各セッションは保存が確定する（コミットが返る）のを待って
+から次の記録を保存する。次の 2 つの経路について、1 件ずつコミットする場合と
+GroupCommitWriter でまとめてコミットする場合の 1 秒あたりの保存件数と
+保存 1 件のレイテンシ分位点（確定まで）を表示する。
+
+- events: 時間記録モードの時刻付き記録（ベッドサイドの時間尿・輸液の入力。
+  BalanceStore.save_events() と GroupCommitWriter.add_event()）
+- records: 患者日レコードの保存（BalanceStore.save() と GroupCommitWriter.save()）
+
+使い方:
+    python benchmarks/group_commit.py                       # 32 セッション × 100 件、両方の経路
+    python benchmarks/group_commit.py --path events         # 時刻付き記録だけ
+    python benchmarks/group_commit.py --sessions 64 --entries 200 --flush-ms 5 --json commit.json
+"""
+import argparse
+import datetime
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from balance_engine import compute_one  # noqa: E402
+from balance_store import DEFAULT_FLUSH_DELAY, BalanceStore, GroupCommitWriter  # noqa: E402
+from event_buffer import EVENT_KINDS  # noqa: E402
+
+PATHS = ("events", "records")
+
+
+def make_entries(session, count):
+    # 1 セッション = 1 ベッド。日ごとに 1 行なので、保存はすべて新しい行になる
+    rnd = random.Random(session)
+    day = datetime.date(2026, 1, 1)
+    entries = []
+    for i in range(count):
+        inputs = dict(
+            age=rnd.randint(20, 90), gender=rnd.choice(["男性", "女性"]), weight=rnd.uniform(40, 90),
+            temp=rnd.uniform(36, 39), room_temp=rnd.uniform(22, 30), oral=rnd.uniform(0, 2000),
+            iv=rnd.uniform(0, 2000), urine_times=rnd.randint(3, 8), urine_volume=rnd.uniform(100, 300),
+        )
+        entries.append((f"BED{session:03d}", day + datetime.timedelta(days=i), inputs, compute_one(**inputs)))
+    return entries
+
+
+def make_events(session, count):
+    # 1 セッション = 1 ベッド。15 分おきの時間尿・輸液などの入力
+    rnd = random.Random(session)
+    start = int(datetime.datetime(2026, 1, 1, tzinfo=datetime.timezone.utc).timestamp())
+    kinds = [key for key, _, _ in EVENT_KINDS]
+    return [(f"BED{session:03d}", start + i * 900, rnd.choice(kinds), rnd.uniform(10, 300)) for i in range(count)]
+
+
+def run(save, sessions, entries, make=make_entries):
+    """sessions 個のスレッドから save を呼び、(レイテンシのリスト, 所要秒) を返す。"""
+    work = [make(s, entries) for s in range(sessions)]
+    latencies = [[] for _ in range(sessions)]
+    barrier = threading.Barrier(sessions + 1)
+
+    def session(i):
+        barrier.wait()
+        for args in work[i]:
+            t = time.perf_counter()
+            save(*args, ward="ICU", recorder="bench")
+            latencies[i].append(time.perf_counter() - t)
+
+    threads = [threading.Thread(target=session, args=(i,)) for i in range(sessions)]
+    for th in threads:
+        th.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for th in threads:
+        th.join()
+    return [v for per in latencies for v in per], time.perf_counter() - start
+
+
+def percentile(values, q):
+    values = sorted(values)
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[q - 1]
+
+
+def summarize(latencies, elapsed, commits):
+    return {
+        "entries": len(latencies),
+        "wall_seconds": elapsed,
+        "entries_per_second": len(latencies) / elapsed,
+        "commits": commits,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "max_ms": max(latencies) * 1000,
+    }
+
+
+def _store_event(store):
+    # 1 件ずつのコミット（時刻付き記録 1 件を 1 トランザクションで追加）
+    def save(patient_id, ts, kind, volume, ward="", recorder=""):
+        store.save_events([store.make_event_row(patient_id, ts, kind, volume, ward, recorder)])
+    return save
+
+
+def bench(tmp, sessions, entries, flush_delay, path="events"):
+    make = make_events if path == "events" else make_entries
+    results = {}
+
+    store = BalanceStore(os.path.join(tmp, f"{path}_naive.db"))
+    try:
+        save = _store_event(store) if path == "events" else store.save
+        latencies, elapsed = run(save, sessions, entries, make)
+    finally:
+        store.close()
+    results["per_entry"] = summarize(latencies, elapsed, len(latencies))
+
+    store = BalanceStore(os.path.join(tmp, f"{path}_group.db"))
+    writer = GroupCommitWriter(store, flush_delay=flush_delay)
+    try:
+        latencies, elapsed = run(writer.add_event if path == "events" else writer.save, sessions, entries, make)
+    finally:
+        writer.close()
+        store.close()
+    results["group_commit"] = summarize(latencies, elapsed, writer.commits)
+    return results
+
+
+def print_report(results, sessions, flush_delay, path="events"):
+    print(f"[{path}] 同時セッション {sessions}  グループコミットの最大待ち {flush_delay * 1000:.1f} ms")
+    print(f"{'方式':<16}{'件数':>8}{'件/秒':>10}{'コミット':>10}{'p50':>9}{'p99':>9}{'max':>9}  (ms)")
+    for name, r in results.items():
+        print(f"{name:<16}{r['entries']:>8}{r['entries_per_second']:>10.0f}{r['commits']:>10}"
+              f"{r['p50_ms']:>9.1f}{r['p99_ms']:>9.1f}{r['max_ms']:>9.1f}")
+    speedup = results["group_commit"]["entries_per_second"] / results["per_entry"]["entries_per_second"]
+    print(f"グループコミットの処理件数は 1 件ずつのコミットの {speedup:.1f} 倍")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="保存の書き込み性能（1 件ずつのコミットとグループコミット）")
+    parser.add_argument("--sessions", type=int, default=32, help="同時に保存するセッション数（既定: 32）")
+    parser.add_argument("--entries", type=int, default=100, help="1 セッションあたりの保存件数（既定: 100）")
+    parser.add_argument("--path", choices=PATHS, action="append",
+                        help="測る経路（events: 時刻付き記録、records: 患者日レコード。既定: 両方）")
+    parser.add_argument("--flush-ms", type=float, default=DEFAULT_FLUSH_DELAY * 1000,
+                        help=f"グループコミットの最大待ち時間（ミリ秒、既定: {DEFAULT_FLUSH_DELAY * 1000:g}）")
+    parser.add_argument("--dir", help="データベースを置くディレクトリ（既定: 一時ディレクトリ。実際のディスクで測る場合に指定）")
+    parser.add_argument("--json", help="結果を JSON で保存するパス")
+    args = parser.parse_args(argv)
+
+    flush_delay = args.flush_ms / 1000
+    results = {}
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        for path in args.path or PATHS:
+            results[path] = bench(tmp, args.sessions, args.entries, flush_delay, path)
+            print_report(results[path], args.sessions, flush_delay, path)
+    if args.json:
+        summary = {"sessions": args.sessions, "flush_ms": args.flush_ms, "results": results}
+        Path(args.json).write_text(json.dumps(summary, ensure_ascii=False, indent=2), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
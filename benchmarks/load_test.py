@@ -0,0 +1,331 @@
+"""同時利用の負荷試験（実際の streamlit run サーバーに WebSocket で接続）
+
+`streamlit run` で起動したサーバー 1 つに、N 人分のブラウザセッションを WebSocket で
+同時に接続し、臨床スタッフの操作（体重・体温の入力、IN/OUT の編集、尿量・便量推算
+ダイアログ、記録の保存、PDF のダウンロード）を台本どおりに送る。操作ごとに、ブラウザと
+同じ BackMsg（ウィジェットの値と再実行の要求）を送ってからサーバーが script_finished を
+返すまでのレイテンシ分位点と、サーバープロセスのピークメモリ（RSS）を表示する。
+
+全セッションが同じサーバープロセスで動くため、スクリプト実行のスレッド・GIL・
+キャッシュ・SQLite の接続を取り合う実際の同時利用の負荷になる。フラグメント内の
+ウィジェットはブラウザと同じくそのフラグメントだけを再実行させる。
+PDF のダウンロードはブラウザと同じく、クリック時に遅延生成の要求（backend_operation_request）を
+送って PDF を描画させ、返ってきたメディア URL を HTTP で取得するまでを 1 操作として計る。
+
+使い方:
+    python benchmarks/load_test.py --users 20 --sessions 3
+    python benchmarks/load_test.py --users 50 --json result.json
+    python benchmarks/load_test.py --url http://localhost:8501   # 起動済みのサーバーに接続（メモリは計らない）
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import aiohttp
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.NumberInput_pb2 import NumberInput
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+ROOT = Path(__file__).resolve().parent.parent
+APP = ROOT / "水分管理.py"
+
+FINISHED_OK = (ForwardMsg.FINISHED_SUCCESSFULLY, ForwardMsg.FINISHED_FRAGMENT_RUN_SUCCESSFULLY)
+
+
+class Recorder:
+    # 操作名ごとのレイテンシ（秒）を集める
+    def __init__(self):
+        self.samples = defaultdict(list)
+
+    async def time(self, name, coro):
+        start = time.perf_counter()
+        await coro
+        self.samples[name].append(time.perf_counter() - start)
+
+
+class BrowserSession:
+    """1 つのブラウザタブの代わり。描画されたウィジェットを覚え、値の変更を BackMsg で送る。"""
+
+    def __init__(self, ws, http, url, timeout):
+        self.ws = ws
+        self.http = http
+        self.url = url
+        self.timeout = timeout
+        self.session_id = ""   # 最初の new_session で受け取る（遅延生成の要求に付ける）
+        self._request_id = 0
+        self.widgets = {}   # ウィジェット ID → (要素の種類, 要素の proto, フラグメント ID)
+        self.states = {}    # ウィジェット ID → WidgetState（ブラウザと同じく毎回すべて送る）
+
+    async def rerun(self, trigger=None, fragment_id=""):
+        msg = BackMsg()
+        msg.rerun_script.query_string = ""
+        msg.rerun_script.page_script_hash = ""
+        msg.rerun_script.fragment_id = fragment_id
+        states = list(self.states.values()) + ([trigger] if trigger is not None else [])
+        msg.rerun_script.widget_states.widgets.extend(states)
+        await self.ws.send_bytes(msg.SerializeToString())
+        await asyncio.wait_for(self._receive(), self.timeout)
+
+    async def _receive(self):
+        async for frame in self.ws:
+            if frame.type != aiohttp.WSMsgType.BINARY:
+                raise RuntimeError(f"WebSocket が閉じられました: {frame.type}")
+            fwd = ForwardMsg()
+            fwd.ParseFromString(frame.data)
+            kind = fwd.WhichOneof("type")
+            if kind == "new_session":
+                self.session_id = fwd.new_session.initialize.session_id
+            elif kind == "delta" and fwd.delta.WhichOneof("type") == "new_element":
+                element = fwd.delta.new_element
+                name = element.WhichOneof("type")
+                if name == "exception":
+                    raise RuntimeError(f"アプリでエラー: {element.exception.message}")
+                proto = getattr(element, name)
+                if "id" in proto.DESCRIPTOR.fields_by_name and proto.id:
+                    self.widgets[proto.id] = (name, proto, fwd.delta.fragment_id)
+            elif kind == "script_finished":
+                if fwd.script_finished == ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                    continue    # st.rerun() で打ち切られた。続く再実行の完了を待つ
+                if fwd.script_finished not in FINISHED_OK:
+                    raise RuntimeError(f"スクリプトが完了しませんでした: {fwd.script_finished}")
+                return
+        raise RuntimeError("script_finished を受け取る前に WebSocket が閉じられました。")
+
+    def find(self, key=None, label=None):
+        for widget_id, (name, proto, fragment_id) in self.widgets.items():
+            if (key and widget_id.endswith(f"-{key}")) or (label and getattr(proto, "label", None) == label):
+                return widget_id, name, proto, fragment_id
+        raise KeyError(key or label)
+
+    async def set(self, key, value):
+        widget_id, name, proto, fragment_id = self.find(key=key)
+        state = WidgetState(id=widget_id)
+        if name == "number_input":
+            if proto.data_type == NumberInput.INT:
+                state.int_value = int(value)
+            else:
+                state.double_value = float(value)
+        elif name == "text_input":
+            state.string_value = str(value)
+        else:
+            raise TypeError(f"未対応のウィジェットです: {name}")
+        self.states[widget_id] = state
+        await self.rerun(fragment_id=fragment_id)
+
+    async def click(self, key=None, label=None):
+        widget_id, _, _, fragment_id = self.find(key=key, label=label)
+        await self.rerun(trigger=WidgetState(id=widget_id, trigger_value=True), fragment_id=fragment_id)
+
+    async def download(self, key):
+        """download_button の遅延生成を要求し、返ってきた URL からファイルを取得して大きさを返す。"""
+        _, name, proto, _ = self.find(key=key)
+        if name != "download_button" or not proto.deferred_file_id:
+            raise TypeError(f"遅延生成の download_button ではありません: {key}")
+        self._request_id += 1
+        request_id = f"load-test-{self._request_id}"
+        msg = BackMsg()
+        msg.backend_operation_request.request_id = request_id
+        msg.backend_operation_request.session_id = self.session_id
+        msg.backend_operation_request.deferred_file.file_id = proto.deferred_file_id
+        await self.ws.send_bytes(msg.SerializeToString())
+        url = await asyncio.wait_for(self._receive_file_url(request_id), self.timeout)
+        async with self.http.get(self.url + url) as r:
+            r.raise_for_status()
+            body = await r.read()
+        if not body.startswith(b"%PDF"):
+            raise RuntimeError(f"PDF ではない応答です: {body[:40]!r}")
+        return len(body)
+
+    async def _receive_file_url(self, request_id):
+        async for frame in self.ws:
+            if frame.type != aiohttp.WSMsgType.BINARY:
+                raise RuntimeError(f"WebSocket が閉じられました: {frame.type}")
+            fwd = ForwardMsg()
+            fwd.ParseFromString(frame.data)
+            if fwd.WhichOneof("type") != "backend_operation_response":
+                continue
+            response = fwd.backend_operation_response
+            if response.request_id != request_id:
+                continue
+            if response.error_msg:
+                raise RuntimeError(f"ファイルを生成できませんでした: {response.error_msg}")
+            return response.deferred_file.url
+        raise RuntimeError("生成したファイルの URL を受け取る前に WebSocket が閉じられました。")
+
+
+async def run_session(http, url, user, rec, timeout):
+    """1 人分の操作を台本どおりに実行する。"""
+    rnd = random.Random(user)
+    stream = url.replace("http", "ws", 1) + "/_stcore/stream"
+    async with http.ws_connect(stream, protocols=("streamlit",), max_msg_size=0) as ws:
+        s = BrowserSession(ws, http, url, timeout)
+        await rec.time("initial_load", s.rerun())
+
+        await rec.time("set_weight", s.set("main_weight", round(rnd.uniform(40, 90), 1)))
+        await rec.time("set_temp", s.set("main_temp", round(rnd.uniform(36, 39.5), 1)))
+        await rec.time("set_room_temp", s.set("main_rtemp", rnd.choice([22.0, 26.0, 32.0])))
+        await rec.time("set_patient", s.set("main_patient_id", f"LT{user:04d}"))
+
+        for key, lo, hi in (("in_oral", 500, 2500), ("in_iv", 0, 2000), ("in_kcal", 800, 2500),
+                            ("out_bleed", 0, 300), ("out_utimes", 3, 10)):
+            await rec.time("edit_in_out", s.set(key, rnd.randint(lo, hi)))
+
+        await rec.time("open_urine_dialog", s.click(key="btn_u_calc"))
+        await rec.time("apply_dialog", s.click(label="✅ 入力に反映"))
+        await rec.time("open_stool_dialog", s.click(key="btn_s_calc"))
+        await rec.time("apply_dialog", s.click(label="✅ 入力に反映"))
+
+        await rec.time("save_record", s.click(key="btn_save_record"))
+        await rec.time("download_pdf", s.download("btn_final_unified"))
+
+
+async def run_user(http, url, user, sessions, timeout, rec):
+    # 1 ユーザーはセッションを順に開き直す（タブを閉じて開き直す操作）
+    for s in range(sessions):
+        await run_session(http, url, user * sessions + s, rec, timeout)
+
+
+async def run_all(url, users, sessions, timeout):
+    rec = Recorder()
+    async with aiohttp.ClientSession() as http:
+        start = time.perf_counter()
+        await asyncio.gather(*(run_user(http, url, u, sessions, timeout, rec) for u in range(users)))
+        elapsed = time.perf_counter() - start
+    return dict(rec.samples), elapsed
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(env, port, log_path, timeout=60):
+    """streamlit run をヘッドレスで起動し、応答するまで待って Popen を返す（出力は log_path へ）。"""
+    with open(log_path, "wb") as log:
+        server = subprocess.Popen(
+            [sys.executable, "-m", "streamlit", "run", str(APP), "--server.headless", "true",
+             "--server.port", str(port), "--browser.gatherUsageStats", "false"],
+            cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT,
+        )
+    deadline = time.monotonic() + timeout
+
+    async def wait_ready():
+        async with aiohttp.ClientSession() as http:
+            while time.monotonic() < deadline:
+                if server.poll() is not None:
+                    raise RuntimeError(f"サーバーが起動しませんでした: {Path(log_path).read_text(errors='replace')}")
+                try:
+                    async with http.get(f"http://127.0.0.1:{port}/_stcore/health") as r:
+                        if r.status == 200:
+                            return
+                except aiohttp.ClientError:
+                    pass
+                await asyncio.sleep(0.2)
+            raise RuntimeError("サーバーの起動がタイムアウトしました。")
+
+    try:
+        asyncio.run(wait_ready())
+    except BaseException:
+        server.kill()
+        raise
+    return server
+
+
+def peak_rss(pid):
+    # Linux の /proc からプロセスのピーク RSS（VmHWM）を読む。取れなければ None
+    try:
+        with open(f"/proc/{pid}/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def percentile(values, q):
+    values = sorted(values)
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[q - 1]
+
+
+def summarize(samples, elapsed, users, sessions, server_rss):
+    rows = {}
+    for name, v in samples.items():
+        rows[name] = {
+            "count": len(v),
+            "p50_ms": percentile(v, 50) * 1000,
+            "p90_ms": percentile(v, 90) * 1000,
+            "p99_ms": percentile(v, 99) * 1000,
+            "max_ms": max(v) * 1000,
+        }
+    return {
+        "users": users,
+        "sessions_per_user": sessions,
+        "wall_seconds": elapsed,
+        "interactions_per_second": sum(len(v) for v in samples.values()) / elapsed,
+        "server_peak_rss_mb": server_rss / 1024 / 1024 if server_rss else None,
+        "interactions": rows,
+    }
+
+
+def print_report(summary):
+    print(f"同時ユーザー {summary['users']} 人 × {summary['sessions_per_user']} セッション（サーバー 1 プロセス）  "
+          f"所要 {summary['wall_seconds']:.1f} 秒  ({summary['interactions_per_second']:.1f} 操作/秒)")
+    print(f"{'操作':<20}{'件数':>6}{'p50':>10}{'p90':>10}{'p99':>10}{'max':>10}  (ms)")
+    for name, r in summary["interactions"].items():
+        print(f"{name:<20}{r['count']:>6}{r['p50_ms']:>10.1f}{r['p90_ms']:>10.1f}{r['p99_ms']:>10.1f}{r['max_ms']:>10.1f}")
+    if summary["server_peak_rss_mb"] is not None:
+        print(f"サーバーのピークメモリ（RSS）: {summary['server_peak_rss_mb']:.1f} MB")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="水分出納アプリの同時利用負荷試験（streamlit run サーバーに接続）")
+    parser.add_argument("--users", type=int, default=10, help="同時ユーザー数（既定: 10）")
+    parser.add_argument("--sessions", type=int, default=1, help="1 ユーザーあたりのセッション数（既定: 1）")
+    parser.add_argument("--timeout", type=float, default=60, help="1 操作のタイムアウト秒数")
+    parser.add_argument("--url", help="起動済みのサーバーの URL（省略時は使い捨ての DB でサーバーを起動する）")
+    parser.add_argument("--json", help="結果を JSON で保存するパス")
+    args = parser.parse_args(argv)
+
+    tmp = tempfile.TemporaryDirectory()
+    server = None
+    try:
+        if args.url:
+            url = args.url.rstrip("/")
+        else:
+            # 保存先は使い捨ての DB にする
+            env = {**os.environ, "WATER_BALANCE_DB": os.path.join(tmp.name, "load_test.db")}
+            port = _free_port()
+            server = start_server(env, port, os.path.join(tmp.name, "server.log"))
+            url = f"http://127.0.0.1:{port}"
+        samples, elapsed = asyncio.run(run_all(url, args.users, args.sessions, args.timeout))
+        rss = peak_rss(server.pid) if server else None
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+        tmp.cleanup()
+
+    summary = summarize(samples, elapsed, args.users, args.sessions, rss)
+    print_report(summary)
+    if args.json:
+        Path(args.json).write_text(json.dumps(summary, ensure_ascii=False, indent=2), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+"""起動時間の計測（コールドスタート）
+
+新しいプロセスでアプリの最初の 1 回の実行（モジュール読み込み＋メイン画面の描画）に
+かかる時間を計り、その時点で読み込まれている重いモジュールを表示する。
+コンテナの再起動やオートスケールで増えたレプリカが応答できるまでの時間の目安になる。
+続けて各ページを初めて開いたときの時間も計る。
+
+使い方:
+    python benchmarks/startup_time.py               # 5 回計測して中央値を表示
+    python benchmarks/startup_time.py --runs 10 --json startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+APP = ROOT / "水分管理.py"
+
+# 初回描画では読み込まれないはずのモジュール
+# （pytz は pandas が読み込み時に自分で読み込むため含めない。アプリ自体は使っていない）
+HEAVY_MODULES = ("reportlab", "report_cache", "views.theory", "views.usage", "views.refs")
+PAGES = ("theory", "usage", "refs", "ward")
+
+# 子プロセスで実行する計測本体（毎回まっさらなインタープリタで動かす）
+_CHILD = """
+import json, sys, time
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+framework = time.perf_counter() - start
+
+at = AppTest.from_file(sys.argv[1], default_timeout=60)
+t = time.perf_counter()
+at.run()
+first = time.perf_counter() - t
+loaded = [m for m in sys.argv[2].split(",") if m in sys.modules]
+
+pages = {}
+for page in sys.argv[3].split(","):
+    at.session_state["page"] = page
+    t = time.perf_counter()
+    at.run()
+    pages[page] = time.perf_counter() - t
+print(json.dumps({"framework": framework, "first_run": first, "loaded": loaded, "pages": pages,
+                  "error": at.exception[0].message if at.exception else None}))
+"""
+
+
+def measure_once(env):
+    out = subprocess.run(
+        [sys.executable, "-c", _CHILD, str(APP), ",".join(HEAVY_MODULES), ",".join(PAGES)],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="水分出納アプリの起動時間の計測")
+    parser.add_argument("--runs", type=int, default=5, help="計測回数（既定: 5）")
+    parser.add_argument("--json", help="結果を JSON で保存するパス")
+    args = parser.parse_args(argv)
+
+    tmp = tempfile.TemporaryDirectory()
+    env = {**os.environ, "WATER_BALANCE_DB": os.path.join(tmp.name, "startup.db")}
+    runs = [measure_once(env) for _ in range(args.runs)]
+    tmp.cleanup()
+    for r in runs:
+        if r["error"]:
+            print(f"アプリでエラー: {r['error']}", file=sys.stderr)
+            return 1
+
+    summary = {
+        "runs": args.runs,
+        "framework_ms": statistics.median(r["framework"] for r in runs) * 1000,
+        "first_run_ms": statistics.median(r["first_run"] for r in runs) * 1000,
+        "pages_ms": {p: statistics.median(r["pages"][p] for r in runs) * 1000 for p in PAGES},
+        "loaded_on_first_run": runs[0]["loaded"],
+    }
+    print(f"Streamlit 読み込み      {summary['framework_ms']:>8.1f} ms")
+    print(f"初回実行（メイン画面）  {summary['first_run_ms']:>8.1f} ms   ({args.runs} 回の中央値)")
+    for page, ms in summary["pages_ms"].items():
+        print(f"  初めて開く {page:<10}{ms:>8.1f} ms")
+    loaded = ", ".join(summary["loaded_on_first_run"]) or "なし"
+    print(f"初回実行で読み込まれた重いモジュール: {loaded}")
+    if args.json:
+        Path(args.json).write_text(json.dumps(summary, ensure_ascii=False, indent=2), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,127 @@
+"""時刻付き IN/OUT 記録の列指向バッファ
+
+ICU のように 1 日に数百件の時刻付き記録（時間尿・輸液など）がある場合に使う。
+時刻・区分・量を NumPy の列配列に追記し、時間ごとの合計と累積バランスを
+np.bincount でまとめて計算する。容量は倍々に拡張するので追記は償却 O(1)。
+"""
+import datetime
+
+import numpy as np
+
+# 区分コード: (キー, 表示名, 符号) ※符号 +1 が IN、-1 が OUT
+EVENT_KINDS = (
+    ("oral", "経口摂取", 1),
+    ("iv", "静脈輸液", 1),
+    ("blood", "輸血", 1),
+    ("urine", "尿量", -1),
+    ("bleeding", "出血・ドレーン等", -1),
+)
+KIND_CODES = {key: i for i, (key, _, _) in enumerate(EVENT_KINDS)}
+KIND_LABELS = {key: label for key, label, _ in EVENT_KINDS}
+_SIGNS = np.array([sign for _, _, sign in EVENT_KINDS], dtype=np.float64)
+
+HOUR = 3600
+JST = datetime.timezone(datetime.timedelta(hours=9))
+
+
+def now_jst():
+    return datetime.datetime.now(JST)
+
+
+def today_jst():
+    # サーバーのタイムゾーンによらず、日本時間での今日
+    return now_jst().date()
+
+
+def day_start(day):
+    # 記録日の 0 時（日本時間）
+    return datetime.datetime.combine(day, datetime.time(), tzinfo=JST)
+
+
+def _epoch(ts):
+    if isinstance(ts, datetime.datetime):
+        return int(ts.timestamp())
+    return int(ts)
+
+
+class EventBuffer:
+    def __init__(self, capacity=256):
+        self._t = np.empty(capacity, dtype=np.int64)       # UNIX 時刻（秒）
+        self._kind = np.empty(capacity, dtype=np.int8)     # EVENT_KINDS の添字
+        self._vol = np.empty(capacity, dtype=np.float32)   # 量（mL）
+        self._n = 0
+        self.version = 0  # 追記のたびに増える（集計結果のキャッシュキー用）
+
+    def __len__(self):
+        return self._n
+
+    def _grow(self, need):
+        cap = len(self._t)
+        if need <= cap:
+            return
+        while cap < need:
+            cap *= 2
+        for name in ("_t", "_kind", "_vol"):
+            old = getattr(self, name)
+            new = np.empty(cap, dtype=old.dtype)
+            new[: self._n] = old[: self._n]
+            setattr(self, name, new)
+
+    def add(self, ts, kind, volume):
+        self._grow(self._n + 1)
+        self._t[self._n] = _epoch(ts)
+        self._kind[self._n] = KIND_CODES[kind]
+        self._vol[self._n] = volume
+        self._n += 1
+        self.version += 1
+
+    def extend(self, times, kinds, volumes):
+        """列配列でまとめて追記する（kinds はキー文字列の配列）。"""
+        times = np.asarray(times, dtype=np.int64)
+        n = len(times)
+        self._grow(self._n + n)
+        self._t[self._n:self._n + n] = times
+        self._kind[self._n:self._n + n] = [KIND_CODES[k] for k in kinds]
+        self._vol[self._n:self._n + n] = volumes
+        self._n += n
+        self.version += 1
+
+    @property
+    def nbytes(self):
+        return self._t.nbytes + self._kind.nbytes + self._vol.nbytes
+
+    def columns(self):
+        n = self._n
+        return self._t[:n], self._kind[:n], self._vol[:n]
+
+    # ================================
+    # 集計
+    # ================================
+    def hourly_totals(self, start, hours):
+        """start から hours 時間分の (時間 × 区分) 合計を返す。"""
+        start = _epoch(start)
+        t, kind, vol = self.columns()
+        idx = (t - start) // HOUR
+        mask = (idx >= 0) & (idx < hours)
+        bins = idx[mask] * len(EVENT_KINDS) + kind[mask]
+        totals = np.bincount(bins, weights=vol[mask], minlength=hours * len(EVENT_KINDS))
+        return totals.reshape(hours, len(EVENT_KINDS))
+
+    def hourly_balance(self, start, hours, insensible_per_hour=0.0, metabolic_per_hour=0.0, stool_per_hour=0.0):
+        """時間ごとの IN・OUT・バランスと累積バランスを返す。
+
+        便・不感蒸泄・代謝水は時刻付きで記録しないため、日量の 1/24 を毎時加える。
+        """
+        totals = self.hourly_totals(start, hours)
+        hourly_in = totals[:, _SIGNS > 0].sum(axis=1) + metabolic_per_hour
+        hourly_out = totals[:, _SIGNS < 0].sum(axis=1) + insensible_per_hour + stool_per_hour
+        net = hourly_in - hourly_out
+        return {"in": hourly_in, "out": hourly_out, "net": net, "cumulative": np.cumsum(net)}
+
+    def totals_between(self, start, end):
+        """[start, end) の区分別合計と件数を {キー: (合計, 件数)} で返す。"""
+        t, kind, vol = self.columns()
+        mask = (t >= _epoch(start)) & (t < _epoch(end))
+        sums = np.bincount(kind[mask], weights=vol[mask], minlength=len(EVENT_KINDS))
+        counts = np.bincount(kind[mask], minlength=len(EVENT_KINDS))
+        return {key: (float(sums[i]), int(counts[i])) for i, (key, _, _) in enumerate(EVENT_KINDS)}
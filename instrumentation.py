@@ -0,0 +1,143 @@
+"""処理段階ごとの所要時間と呼び出し回数の計測（任意）
+
+WATER_BALANCE_METRICS=1 のときだけ記録する。無効時の stage() は何もしない
+コンテキストマネージャを返すだけなので、計測箇所を残したままでも負荷はない。
+集計はプロセス全体で共有し、JSON と Prometheus テキスト形式で出力できる。
+"""
+import contextlib
+import functools
+import json
+import os
+import threading
+import time
+
+ENABLED = os.environ.get("WATER_BALANCE_METRICS", "") not in ("", "0")
+
+# Prometheus のヒストグラム境界（秒）
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class StageStats:
+    __slots__ = ("count", "total", "max", "last", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = 0.0
+        self.buckets = [0] * len(BUCKETS)
+
+    def observe(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.last = seconds
+        self.max = max(self.max, seconds)
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.buckets[i] += 1
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages = {}
+        self._values = {}
+        self.started_at = time.time()
+
+    def observe(self, name, seconds):
+        with self._lock:
+            stats = self._stages.get(name)
+            if stats is None:
+                stats = self._stages[name] = StageStats()
+            stats.observe(seconds)
+
+    def set_value(self, name, value):
+        with self._lock:
+            self._values[name] = value
+
+    def set_value_once(self, name, value):
+        # 1 回だけ測る値（起動時間など）。2 回目以降は無視する
+        with self._lock:
+            self._values.setdefault(name, value)
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+
+    def snapshot(self):
+        with self._lock:
+            stages = {
+                name: {
+                    "count": s.count,
+                    "total_seconds": s.total,
+                    "mean_seconds": s.total / s.count if s.count else 0.0,
+                    "max_seconds": s.max,
+                    "last_seconds": s.last,
+                    "buckets": dict(zip(BUCKETS, s.buckets)),
+                }
+                for name, s in sorted(self._stages.items())
+            }
+            return {"uptime_seconds": time.time() - self.started_at, "values": dict(self._values), "stages": stages}
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), ensure_ascii=False, indent=2)
+
+    def to_prometheus(self):
+        snap = self.snapshot()
+        lines = [
+            "# HELP water_balance_stage_seconds Wall time per processing stage.",
+            "# TYPE water_balance_stage_seconds histogram",
+        ]
+        for name, s in snap["stages"].items():
+            for bound, count in s["buckets"].items():
+                lines.append(f'water_balance_stage_seconds_bucket{{stage="{name}",le="{bound}"}} {count}')
+            lines.append(f'water_balance_stage_seconds_bucket{{stage="{name}",le="+Inf"}} {s["count"]}')
+            lines.append(f'water_balance_stage_seconds_sum{{stage="{name}"}} {s["total_seconds"]}')
+            lines.append(f'water_balance_stage_seconds_count{{stage="{name}"}} {s["count"]}')
+        lines.append("# TYPE water_balance_value gauge")
+        for name, value in snap["values"].items():
+            lines.append(f'water_balance_value{{name="{name}"}} {value}')
+        lines.append("# TYPE water_balance_uptime_seconds gauge")
+        lines.append(f"water_balance_uptime_seconds {snap['uptime_seconds']}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def stage(name):
+    """with stage("calc"): ... の形で段階の所要時間を記録する。"""
+    if not ENABLED:
+        return contextlib.nullcontext()
+    return REGISTRY.stage(name)
+
+
+def start_timer(name):
+    """計測を開始し、呼ぶと記録して終了する関数を返す（with で囲みにくい範囲用）。"""
+    if not ENABLED:
+        return lambda: None
+    start = time.perf_counter()
+    return lambda: REGISTRY.observe(name, time.perf_counter() - start)
+
+
+def timed(name):
+    """関数の所要時間を記録するデコレータ。"""
+    def decorator(fn):
+        if not ENABLED:
+            return fn
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with REGISTRY.stage(name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+    return decorator
@@ -0,0 +1,273 @@
+"""水分出納管理報告書（PDF）の生成
+
+Streamlit に依存しないため、メイン画面のほかバッチ処理やワーカープロセスからも利用できる。
+ReportLab は最初に報告書を描画するときに読み込み、フォント登録とあわせて
+プロセス内で 1 回だけ行う（setup_pdf）。
+"""
+import functools
+import re
+import types
+from io import BytesIO
+
+from event_buffer import now_jst
+from instrumentation import timed
+
+# reportlab.lib.units / pagesizes と同じ値（ReportLab を読み込まずに使えるようにする）
+mm = 72 / 25.4
+A4 = (210 * mm, 297 * mm)
+
+FONT_NAME = "HeiseiMin-W3"
+
+
+# ================================
+# 1. ReportLab の読み込みとフォント設定（初回のみ）
+# ================================
+@functools.lru_cache(maxsize=None)
+def setup_pdf():
+    from reportlab.lib import colors
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.cidfonts import UnicodeCIDFont
+    from reportlab.pdfgen import canvas
+    from reportlab.platypus import Table, TableStyle
+
+    try:
+        pdfmetrics.registerFont(UnicodeCIDFont(FONT_NAME))
+    except Exception:
+        pass
+    return types.SimpleNamespace(canvas=canvas, colors=colors, Table=Table, TableStyle=TableStyle)
+
+
+# ================================
+# 2. 報告書データ
+# ================================
+# 画面入力のうち報告書に載せる項目と、計算結果から載せる項目
+REPORT_INPUT_KEYS = ("age", "gender", "weight", "temp", "room_temp", "kcal", "oral", "iv", "blood", "bleeding")
+REPORT_RESULT_KEYS = ("metabolic", "urine", "stool", "insensible", "net", "judgment", "tbw", "loss_rate")
+# 報告書の描画に欠かせない項目（既定値で補わずにそのまま読む）
+REPORT_REQUIRED_KEYS = (
+    "age", "weight", "temp", "oral", "iv", "blood", "bleeding",
+    "metabolic", "urine", "stool", "insensible", "net", "judgment",
+)
+
+
+def build_report_data(inputs, result, recorder="未記入", **extra):
+    """balance_engine の入力・計算結果から generate_medical_report 用の dict を作る。"""
+    data = {k: inputs[k] for k in REPORT_INPUT_KEYS if k in inputs}
+    data.update({k: result[k] for k in REPORT_RESULT_KEYS})
+    data["recorder"] = recorder
+    data.update(extra)
+    return data
+
+
+def report_file_name(patient_id=None, when=None):
+    """患者ごと・作成日時ごとの PDF ファイル名を返す。"""
+    stem = re.sub(r"[^\w\-]", "_", str(patient_id)) if patient_id not in (None, "") else "patient"
+    when = when or now_jst()
+    return f"FluidBalance_{stem}_{when:%Y%m%d_%H%M}.pdf"
+
+
+def unique_file_names(names):
+    """同じ名前が続いても上書きしないよう、2 件目以降に _2, _3 ... を付けて返す。"""
+    seen = {}
+    for name in names:
+        n = seen[name] = seen.get(name, 0) + 1
+        yield name if n == 1 else name.replace(".pdf", f"_{n}.pdf")
+
+
+# ================================
+# 3. IN/OUT 内訳表
+# ================================
+def io_totals(data):
+    total_in = (
+        data["oral"]
+        + data["iv"]
+        + data["blood"]
+        + data["metabolic"]
+    )
+    total_out = (
+        data["urine"]
+        + data["bleeding"]
+        + data["stool"]
+        + data["insensible"]
+    )
+    return total_in, total_out
+
+
+def build_io_table(data, total_in, total_out):
+    rl = setup_pdf()
+    colors = rl.colors
+    io_table = rl.Table(
+        [
+            ["IN（流入）", "", "OUT（流出）", ""],
+            ["経口摂取", f"{data['oral']} mL", "尿量", f"{data['urine']:.0f} mL"],
+            ["静脈輸液", f"{data['iv']} mL", "出血等", f"{data['bleeding']} mL"],
+            ["輸血", f"{data['blood']} mL", "便中水分", f"{data['stool']:.0f} mL"],
+            ["代謝水", f"{data['metabolic']:.0f} mL", "不感蒸泄", f"{data['insensible']:.0f} mL"],
+            ["合計", f"{total_in:.0f} mL", "合計", f"{total_out:.0f} mL"],
+        ],
+        colWidths=[38 * mm, 32 * mm, 38 * mm, 32 * mm]
+    )
+
+    io_table.setStyle(rl.TableStyle([
+        # 見出し上下罫線
+        ("LINEABOVE", (0, 0), (-1, 0), 0.8, colors.black),
+
+        # 合計行の強調（上罫線＋下罫線）
+        ("LINEABOVE", (0, -1), (-1, -1), 0.8, colors.black),
+        ("LINEBELOW", (0, -1), (-1, -1), 0.8, colors.black),
+
+        # IN / OUT 境界線
+        ("LINEBEFORE", (2, 0), (2, -1), 0.8, colors.black),
+
+        # フォント
+        ("FONT", (0, 0), (-1, 0), "HeiseiMin-W3", 10),
+        ("FONT", (0, 1), (-1, -2), "HeiseiMin-W3", 10),
+        ("FONT", (0, -1), (-1, -1), "HeiseiMin-W3", 10),
+
+        # 配置
+        ("ALIGN", (0, 0), (-1, 0), "CENTER"),
+        ("ALIGN", (1, 1), (1, -1), "RIGHT"),
+        ("ALIGN", (3, 1), (3, -1), "RIGHT"),
+        ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+    ]))
+    return io_table
+
+
+# ================================
+# 4. 報告書ページ
+# ================================
+def draw_report_page(c, data):
+    """canvas に 1 患者分の報告書を 1 ページ描画する（showPage まで行う）。"""
+    colors = setup_pdf().colors
+    w, h = A4
+
+    room_temp = data.get("room_temp", data.get("r_temp", 0))
+
+    # ================================
+    # タイトル
+    # ================================
+    c.setFont("HeiseiMin-W3", 18)
+    c.drawCentredString(w / 2, h - 20 * mm, "水分出納管理報告書（サマリー）")
+
+    c.setFont("HeiseiMin-W3", 10)
+    recorded_at = data.get("recorded_at") or now_jst().strftime("%Y/%m/%d %H:%M")
+    c.drawString(20 * mm, h - 30 * mm, f"記録日時：{recorded_at}")
+    c.drawRightString(w - 20 * mm, h - 30 * mm, f"記録者：{data.get('recorder', '未記入')}")
+
+    y = h - 42 * mm
+
+    # ================================
+    # 【基本情報】（箇条書き）
+    # ================================
+    c.setFont("HeiseiMin-W3", 12)
+    c.drawString(20 * mm, y, "【基本情報】")
+    y -= 6 * mm
+
+    c.setFont("HeiseiMin-W3", 10)
+    c.drawString(25 * mm, y, f"・年齢：{data['age']} 歳")
+    c.drawString(70 * mm, y, f"・性別：{data.get('gender', '不明')}")
+    y -= 5 * mm
+    c.drawString(25 * mm, y, f"・体重：{data['weight']:.1f} kg")
+    c.drawString(70 * mm, y, f"・摂取エネルギー：{data.get('kcal', 0)} kcal")
+    y -= 5 * mm
+    c.drawString(25 * mm, y, f"・体温：{data['temp']:.1f} ℃")
+    y -= 5 * mm
+    c.drawString(25 * mm, y, f"・室温：{room_temp:.1f} ℃")
+
+    y -= 8 * mm
+
+    # ================================
+    # 【入出量内訳】（IN/OUT 横並び・合計行付き）
+    # ================================
+    c.setFont("HeiseiMin-W3", 12)
+    c.drawString(20 * mm, y, "【入出量内訳】")
+    y -= 6 * mm
+
+    total_in, total_out = io_totals(data)
+
+    io_table = build_io_table(data, total_in, total_out)
+
+    table_width, table_height = io_table.wrap(w - 40 * mm, h)
+    io_table.drawOn(c, 20 * mm, y - table_height)
+    y -= table_height + 10 * mm
+
+    # ================================
+    # 【判定】（薄いグレー帯）
+    # ================================
+    band_height = 14 * mm
+    c.setFillColor(colors.whitesmoke)
+    c.rect(20 * mm, y - band_height, w - 40 * mm, band_height, fill=1, stroke=0)
+
+    c.setFillColor(colors.black)
+    c.setFont("HeiseiMin-W3", 12)
+    c.drawString(22 * mm, y - 5 * mm, "【判定】")
+
+    c.setFont("HeiseiMin-W3", 14)
+    c.drawRightString(
+        w - 22 * mm,
+        y - 5 * mm,
+        f"ネットバランス： {data['net']:+.0f} mL / day"
+    )
+
+    y -= band_height + 4 * mm
+
+    # 追加：詳細分析（TBW, 損失率）
+    c.setFont("HeiseiMin-W3", 10)
+    tbw_text = f"推算TBW: {data.get('tbw', 0):.0f} mL"
+    loss_text = f"損失率: {data.get('loss_rate', 0):.2f} %"
+    
+    # 損失率による警告
+    loss_rate = data.get('loss_rate', 0)
+    warn_msg = ""
+    if loss_rate >= 3.0:
+        warn_msg = "【危険】熱中症リスク・パフォーマンス著効低下"
+        c.setFillColor(colors.red)
+    elif loss_rate >= 2.0:
+        warn_msg = "【注意】運動パフォーマンス低下の懸念"
+        c.setFillColor(colors.orange)
+    else:
+        c.setFillColor(colors.black)
+
+    c.drawString(25 * mm, y, f"{tbw_text}   /   {loss_text}   {warn_msg}")
+    c.setFillColor(colors.black) # 色を戻す
+    
+    y -= 6 * mm
+
+    c.setFont("HeiseiMin-W3", 11)
+    c.drawString(25 * mm, y, f"評価： {data['judgment']}")
+
+    y -= 10 * mm
+
+    # ================================
+    # 注意書き
+    # ================================
+    c.setFont("HeiseiMin-W3", 9)
+    c.drawString(
+        20 * mm, y,
+        "※本報告書は水分出納管理の補助を目的としたものであり、"
+        "最終的な臨床判断は医師が行ってください。"
+    )
+
+    c.showPage()
+
+
+@timed("pdf.render")
+def generate_medical_report(data):
+    buf = BytesIO()
+    c = setup_pdf().canvas.Canvas(buf, pagesize=A4)
+    draw_report_page(c, data)
+    c.save()
+    buf.seek(0)
+    return buf
+
+
+@timed("pdf.render_document")
+def generate_report_document(records, out):
+    """複数患者の報告書を 1 患者 1 ページで 1 つの PDF にまとめる。ページ数を返す。"""
+    c = setup_pdf().canvas.Canvas(out, pagesize=A4)
+    pages = 0
+    for data in records:
+        draw_report_page(c, data)
+        pages += 1
+    c.save()
+    return pages
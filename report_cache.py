@@ -0,0 +1,79 @@
+"""描画済み PDF のキャッシュ（内容アドレス・LRU・容量上限付き）
+
+report_data の内容から作ったハッシュをキーに、描画済みの PDF バイト列を保持する。
+同じ内容の再生成・再ダウンロードはキャッシュから即座に返し、合計サイズが
+上限を超えたら最も長く使われていないものから捨てる。
+
+PDF には記録日時（recorded_at）を印字するため、キーにも含める（キャッシュから返した
+PDF の記録日時が要求した時刻と食い違わないようにする）。画面では記録日時を分単位に
+そろえているので、同じ分のうちの再ダウンロードはキャッシュから返る。
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from instrumentation import timed
+from medical_report import generate_medical_report
+
+DEFAULT_MAX_BYTES = int(float(os.environ.get("WATER_BALANCE_PDF_CACHE_MB", "64")) * 1024 * 1024)
+
+
+def report_key(data):
+    # キーの順序や数値型の違い（numpy など）に左右されないよう正規化してからハッシュする
+    payload = json.dumps(data, sort_keys=True, ensure_ascii=False, default=str, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ReportCache:
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, render=generate_medical_report):
+        self.max_bytes = max_bytes
+        self._render = render
+        self._items = OrderedDict()  # key -> PDF bytes（末尾ほど最近使用）
+        self._lock = threading.Lock()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._items)
+
+    def get(self, key):
+        with self._lock:
+            pdf = self._items.get(key)
+            if pdf is not None:
+                self._items.move_to_end(key)
+                self.hits += 1
+            return pdf
+
+    def put(self, key, pdf):
+        if len(pdf) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+            self._items[key] = pdf
+            self.size += len(pdf)
+            while self.size > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self.size -= len(evicted)
+
+    @timed("pdf.request")
+    def get_or_render(self, data):
+        """data の PDF バイト列を返す（未描画なら描画してキャッシュする）。"""
+        key = report_key(data)
+        pdf = self.get(key)
+        if pdf is None:
+            # 描画はロックの外で行い、他セッションの参照を待たせない
+            pdf = self._render(data).getvalue()
+            with self._lock:
+                self.misses += 1
+            self.put(key, pdf)
+        return pdf
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._items), "bytes": self.size, "max_bytes": self.max_bytes,
+                    "hits": self.hits, "misses": self.misses}
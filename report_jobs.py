@@ -0,0 +1,147 @@
+"""PDF 報告書の一括出力ジョブ（バックグラウンド実行・進捗確認・ZIP）
+
+長期入院患者の 1 か月分や病棟全員分の報告書をまとめて出力するためのジョブキュー。
+ジョブは受け付け順に 1 件ずつ専用スレッドで進め、各ページの描画はプロセスプールに
+分散する。プールに渡すのはワーカー数の 2 倍までで、描画済みの PDF は
+一時ディレクトリ上の ZIP に書き込んだ時点で手放すため、画面の操作を止めず、
+ページ数が多くてもメモリ使用量は増えない。一時ディレクトリはプロセスの終了時
+（または shutdown()）に削除する。
+"""
+import datetime
+import itertools
+import os
+import shutil
+import tempfile
+import threading
+import time
+import weakref
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+from balance_engine import INPUT_DEFAULTS
+from medical_report import (
+    build_report_data, generate_medical_report, report_file_name, setup_pdf, unique_file_names,
+)
+
+JOB_QUEUED, JOB_RUNNING, JOB_DONE, JOB_FAILED = "待機中", "実行中", "完了", "失敗"
+DEFAULT_KEEP_JOBS = 50
+
+
+def store_row_report_data(row):
+    """balance_store のレコードから generate_medical_report 用の dict を作る。"""
+    recorded_at = datetime.datetime.fromisoformat(row["recorded_at"])
+    # 未入力のまま保存された項目は既定値で補う
+    row = {**row, **{k: v for k, v in INPUT_DEFAULTS.items() if row.get(k) is None}}
+    return build_report_data(
+        row, row, row.get("recorder") or "未記入",
+        patient_id=row["patient_id"], recorded_at=f"{recorded_at:%Y/%m/%d %H:%M}",
+    )
+
+
+def _zip_names(rows):
+    # 同じ患者・同じ記録時刻が重なってもファイル名が衝突しないようにする
+    return unique_file_names(
+        report_file_name(row["patient_id"], datetime.datetime.fromisoformat(row["recorded_at"])) for row in rows
+    )
+
+
+class Job:
+    def __init__(self, job_id, title, total):
+        self.id = job_id
+        self.title = title
+        self.total = total
+        self.done = 0
+        self.status = JOB_QUEUED
+        self.error = None
+        self.path = None
+        self.created_at = time.time()
+        self.finished_at = None
+
+    @property
+    def progress(self):
+        return self.done / self.total if self.total else 1.0
+
+    @property
+    def active(self):
+        return self.status in (JOB_QUEUED, JOB_RUNNING)
+
+
+class ReportJobQueue:
+    def __init__(self, workers=None, keep=DEFAULT_KEEP_JOBS):
+        self.workers = workers or os.cpu_count() or 1
+        self.keep = keep
+        self._pool = None  # 最初のジョブで起動する
+        self._runner = ThreadPoolExecutor(max_workers=1, thread_name_prefix="report-job")
+        self._jobs = OrderedDict()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._dir = tempfile.mkdtemp(prefix="water_balance_jobs_")
+        # shutdown() を呼ばずにプロセスが終わっても ZIP を残さない
+        self._cleanup = weakref.finalize(self, shutil.rmtree, self._dir, ignore_errors=True)
+
+    def submit(self, title, rows):
+        """balance_store のレコード列の報告書を ZIP にまとめるジョブを登録し、ジョブ ID を返す。"""
+        rows = list(rows)
+        with self._lock:
+            job = Job(next(self._ids), title, len(rows))
+            self._jobs[job.id] = job
+            self._prune()
+        self._runner.submit(self._run, job, rows)
+        return job.id
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def read_zip(self, job_id):
+        job = self.get(job_id)
+        if job is None or job.status != JOB_DONE:
+            raise KeyError(job_id)
+        with open(job.path, "rb") as f:
+            return f.read()
+
+    def shutdown(self):
+        self._runner.shutdown(wait=True, cancel_futures=True)
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+        self._cleanup()
+
+    def _prune(self):
+        # 終了済みの古いジョブから ZIP ごと捨てる（呼び出し側でロック済み）
+        finished = [j for j in self._jobs.values() if not j.active]
+        for job in finished[:max(0, len(self._jobs) - self.keep)]:
+            del self._jobs[job.id]
+            if job.path:
+                try:
+                    os.remove(job.path)
+                except OSError:
+                    pass
+
+    def _run(self, job, rows):
+        job.status = JOB_RUNNING
+        path = os.path.join(self._dir, f"job_{job.id}.zip")
+        try:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=setup_pdf)
+            # PDF は圧縮済みなので ZIP では無圧縮で格納する
+            with zipfile.ZipFile(path, "w", zipfile.ZIP_STORED) as zf:
+                # 描画中・描画済みで未書き込みの PDF がワーカー数の 2 倍を超えないように渡す
+                todo = zip(rows, _zip_names(rows))
+                window = {}
+                while True:
+                    for row, name in itertools.islice(todo, 2 * self.workers - len(window)):
+                        window[self._pool.submit(generate_medical_report, store_row_report_data(row))] = name
+                    if not window:
+                        break
+                    finished, _ = wait(window, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        zf.writestr(window.pop(future), future.result().getvalue())
+                        job.done += 1
+            job.path = path
+            job.status = JOB_DONE
+        except Exception as e:
+            job.error = str(e)
+            job.status = JOB_FAILED
+        finally:
+            job.finished_at = time.time()
@@ -0,0 +1,105 @@
+"""推算係数の感度分析（what-if）
+
+代謝水係数・不感蒸泄の基本量・発熱/室温補正・便中水分率と、体温・室温を
+軸にとった格子を balance_engine.compute_balance の 1 回の一括計算で評価する。
+各軸の値を別々の次元に置いてブロードキャストするため、格子点ごとのループはない。
+"""
+import numpy as np
+
+from balance_engine import (
+    FEVER_COEF, INSENSIBLE_BASE, JUDGMENT_DEHYDRATION, JUDGMENT_OVERLOAD, ROOM_COEF, compute_balance,
+    stool_factor,
+)
+
+# 名前: (表示名, 下限, 上限, 刻み)
+PARAMETERS = {
+    "meta_coef": ("代謝水係数 (mL/kcal)", 0.10, 0.20, 0.01),
+    "insensible_base": ("不感蒸泄 基本量 (mL/kg)", 10.0, 20.0, 0.5),
+    "fever_coef": ("発熱補正 (/℃)", 0.10, 0.20, 0.01),
+    "room_coef": ("室温補正 (/℃)", 0.10, 0.25, 0.005),
+    "stool_coef": ("便中水分率", 0.75, 0.95, 0.01),
+    "temp": ("体温 (℃)", 35.5, 41.0, 0.1),
+    "room_temp": ("室温 (℃)", 18.0, 38.0, 0.5),
+}
+
+# 全パラメータ格子の 1 軸あたりの点数（7 軸 × 5 点 = 78,125 通り）
+FULL_GRID_STEPS = 5
+
+
+def base_params(inputs):
+    """患者の入力値と画面の既定係数から、各パラメータの現在値を返す。"""
+    return {
+        "meta_coef": inputs["meta_coef"],
+        "insensible_base": INSENSIBLE_BASE,
+        "fever_coef": FEVER_COEF,
+        "room_coef": ROOM_COEF,
+        "stool_coef": stool_factor(inputs.get("stool_type", "普通")).item(),
+        "temp": inputs["temp"],
+        "room_temp": inputs["room_temp"],
+    }
+
+
+def evaluate(inputs, params):
+    # params の値は配列でもよく、結果はブロードキャスト後の形になる
+    return compute_balance(**{**inputs, **params})
+
+
+def grid(inputs, params, axes):
+    """axes（名前 → 値の列）の直積で評価する。結果の各配列は軸の順の多次元配列。"""
+    params = dict(params)
+    for i, (name, values) in enumerate(axes.items()):
+        shape = [1] * len(axes)
+        shape[i] = -1
+        params[name] = np.asarray(values, dtype=np.float64).reshape(shape)
+    result = evaluate(inputs, params)
+    shape = tuple(len(v) for v in axes.values())
+    return {k: np.broadcast_to(v, shape) for k, v in result.items()}
+
+
+def axis_values(name, steps):
+    _, low, high, _ = PARAMETERS[name]
+    return np.linspace(low, high, steps)
+
+
+def surface(inputs, params, x, y, steps=41):
+    """x・y の 2 軸の格子で (x の値, y の値, バランス, 損失率) を返す（形は (len(y), len(x))）。"""
+    xs, ys = axis_values(x, steps), axis_values(y, steps)
+    result = grid(inputs, params, {y: ys, x: xs})
+    return xs, ys, result["net"], result["loss_rate"]
+
+
+def tornado(inputs, params):
+    """各パラメータを 1 つずつ下限・上限に振ったときのバランスを、振れ幅の大きい順に返す。"""
+    names = list(PARAMETERS)
+    n = len(names)
+    # 2n 通りのシナリオ（行 2i: i 番目を下限, 行 2i+1: 上限, その他は現在値）を 1 回で計算する
+    scenario = {name: np.full(2 * n, float(params[name])) for name in names}
+    for i, name in enumerate(names):
+        _, low, high, _ = PARAMETERS[name]
+        scenario[name][2 * i] = low
+        scenario[name][2 * i + 1] = high
+    net = evaluate(inputs, scenario)["net"].reshape(n, 2)
+    base = float(evaluate(inputs, params)["net"])
+
+    rows = [
+        {"name": name, "label": PARAMETERS[name][0], "low": PARAMETERS[name][1], "high": PARAMETERS[name][2],
+         "net_low": float(net[i, 0]), "net_high": float(net[i, 1]), "swing": float(abs(net[i, 1] - net[i, 0]))}
+        for i, name in enumerate(names)
+    ]
+    rows.sort(key=lambda r: r["swing"], reverse=True)
+    return base, rows
+
+
+def full_grid_summary(inputs, steps=FULL_GRID_STEPS):
+    """全パラメータの直積（steps ** 7 通り）を 1 回で評価し、バランスの範囲と判定の割合を返す。"""
+    result = grid(inputs, {}, {name: axis_values(name, steps) for name in PARAMETERS})
+    net, judgment = result["net"], result["judgment"]
+    return {
+        "cells": net.size,
+        "net_min": float(net.min()),
+        "net_max": float(net.max()),
+        "net_median": float(np.median(net)),
+        "dehydration_share": float(np.mean(judgment == JUDGMENT_DEHYDRATION)),
+        "overload_share": float(np.mean(judgment == JUDGMENT_OVERLOAD)),
+        "loss_rate_max": float(result["loss_rate"].max()),
+    }
@@ -0,0 +1,76 @@
+"""サーバー運用モードでのセッション当たりメモリの上限管理
+
+WATER_BALANCE_SERVER_MODE=1 で有効になる。各セッションの st.session_state の
+大きさを（入れ子の dict・list も含めて）見積もり、上限（WATER_BALANCE_SESSION_MB、
+既定 4MB）を超えたら再構築できる一時データ（グラフ用集計・病棟一覧）を捨てる。
+時刻付き記録は患者データなので削らない。それでも上限を超える場合は
+session_full() が真になり、画面は新しい記録の追加を止めて警告を出す。
+"""
+import os
+import sys
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from balance_aggregate import PatientBalance, RunningBalance, _Window
+from event_buffer import EventBuffer
+from ward_board import WardBoard
+
+SERVER_MODE = os.environ.get("WATER_BALANCE_SERVER_MODE", "") not in ("", "0")
+MAX_SESSION_BYTES = int(float(os.environ.get("WATER_BALANCE_SESSION_MB", "4")) * 1024 * 1024)
+
+# 捨てても次回の表示時に作り直せるキー（対になるキーは一緒に捨てる）
+TRANSIENT_KEYS = ("event_chart", "event_chart_key", "board", "board_key", "mc_result", "mc_key")
+
+# 属性（__dict__ または __slots__）をたどって数えるクラス（患者ごとの集計は保存済みの記録と窓の deque を持つ）
+_OBJECT_TYPES = (PatientBalance, RunningBalance, _Window)
+
+
+def _deep_nbytes(value, seen):
+    # 同じオブジェクトを二重に数えないよう、たどった id を seen に記録する
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    if isinstance(value, EventBuffer):
+        return value.nbytes
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, WardBoard):
+        return _deep_nbytes(value.frame, seen)
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(_deep_nbytes(k, seen) + _deep_nbytes(v, seen) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset, deque)):
+        size += sum(_deep_nbytes(v, seen) for v in value)
+    elif isinstance(value, _OBJECT_TYPES):
+        if hasattr(value, "__dict__"):
+            size += _deep_nbytes(vars(value), seen)
+        size += sum(_deep_nbytes(getattr(value, name), seen) for name in getattr(type(value), "__slots__", ()))
+    return size
+
+
+def session_nbytes(state):
+    seen = set()
+    return sum(_deep_nbytes(state[k], seen) for k in list(state.keys()))
+
+
+def session_full(state, max_bytes=MAX_SESSION_BYTES):
+    return session_nbytes(state) > max_bytes
+
+
+def enforce_session_budget(state, max_bytes=MAX_SESSION_BYTES):
+    """一時データを捨てて state を max_bytes 以内に収めようとし、調整後の見積もりサイズを返す。
+
+    時刻付き記録（events）は保存されていない患者データなので、上限を超えていても削らない。
+    """
+    size = session_nbytes(state)
+    if size <= max_bytes:
+        return size
+
+    for key in TRANSIENT_KEYS:
+        if key in state:
+            del state[key]
+    return session_nbytes(state)
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# テストはリポジトリ直下のモジュールを import する（benchmarks/ と同じ）
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
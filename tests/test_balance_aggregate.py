@@ -0,0 +1,48 @@
+"""balance_aggregate の PatientBalance（差分の反映が日次記録からの作り直しと一致すること）"""
+import pytest
+
+from balance_aggregate import PatientBalance, RunningBalance
+
+TBW = 36_000
+
+
+def day(n):
+    return f"2026-01-{n:02d}"
+
+
+def records(*totals):
+    return [{"day": day(i + 1), "total_in": t_in, "total_out": t_out} for i, (t_in, t_out) in enumerate(totals)]
+
+
+def snapshot_from(rows):
+    return RunningBalance.from_records(sorted(rows, key=lambda r: r["day"]), TBW).snapshot()
+
+
+def test_initial_state_matches_from_records():
+    rows = records((2000, 1800), (2100, 2500), (1900, 2200))
+    assert PatientBalance(rows, TBW).agg.snapshot() == snapshot_from(rows)
+
+
+def test_saving_the_same_day_again_replaces_its_totals():
+    balance = PatientBalance(records((2000, 1800), (2100, 2500)), TBW)
+    balance.save({"day": day(3), "total_in": 1500, "total_out": 1600})
+    balance.save({"day": day(3), "total_in": 1700, "total_out": 2600})
+    expected = snapshot_from(balance.history())
+    assert balance.agg.snapshot() == pytest.approx(expected)
+    assert balance.agg.net == pytest.approx((2000 - 1800) + (2100 - 2500) + (1700 - 2600))
+
+
+def test_events_count_until_the_day_is_saved():
+    balance = PatientBalance(records((2000, 1800)), TBW)
+    balance.add_event(day(2), 1_767_312_000, "oral", 300)
+    balance.add_event(day(2), 1_767_315_600, "urine", 450)
+    assert balance.agg.net == pytest.approx(200 + 300 - 450)
+    # 保存した日次記録（時刻付き記録の分を含む）で置き換わり、二重に数えない
+    balance.save({"day": day(2), "total_in": 2300, "total_out": 2450})
+    assert balance.agg.net == pytest.approx(200 - 150)
+
+
+def test_saving_an_earlier_day_rebuilds():
+    balance = PatientBalance(records((2000, 1800), (2100, 2500), (1900, 2200)), TBW)
+    balance.save({"day": day(1), "total_in": 1000, "total_out": 1800})
+    assert balance.agg.snapshot() == pytest.approx(snapshot_from(balance.history()))
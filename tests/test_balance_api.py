@@ -0,0 +1,128 @@
+"""balance_api の入力チェック（400 を返す経路）と正常系"""
+import asyncio
+import threading
+
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+
+import balance_api
+from balance_api import MAX_BATCH, BadRequest, compute_records, create_app
+
+RECORD = {"age": 40, "gender": "男性", "weight": 60, "temp": 37, "room_temp": 25}
+
+
+def post(path, **kwargs):
+    # pytest-aiohttp に頼らず、テストごとにサーバーを起動して 1 回だけ要求する
+    async def run():
+        async with TestClient(TestServer(create_app(1))) as client:
+            resp = await client.post(path, **kwargs)
+            body = await resp.json() if resp.content_type == "application/json" else await resp.read()
+            return resp.status, body
+    return asyncio.run(run())
+
+
+def test_batch_reports_every_invalid_index():
+    records = [RECORD, {**RECORD, "weight": None}, RECORD, {**RECORD, "age": "x", "gender": 1}]
+    status, body = post("/v1/balance", json={"records": records})
+    assert status == 400
+    assert [d["index"] for d in body["details"]] == [1, 3]
+    assert body["details"][0]["errors"] == ["weight がありません"]
+    assert body["details"][1]["errors"] == ["age は数値で指定してください", "gender は文字列で指定してください"]
+    assert "index: 1, 3" in body["error"]
+
+
+def test_single_record_missing_required_field():
+    status, body = post("/v1/balance", json={**RECORD, "room_temp": None})
+    assert status == 400
+    assert body["details"] == ["room_temp がありません"]
+
+
+@pytest.mark.parametrize("kwargs", [
+    {"data": "{bad", "headers": {"Content-Type": "application/json"}},
+    {"json": {"records": "not a list"}},
+    {"json": {"records": [RECORD, 1]}},
+])
+def test_malformed_body(kwargs):
+    status, body = post("/v1/balance", **kwargs)
+    assert status == 400
+    assert "error" in body
+
+
+def test_report_validates_before_rendering():
+    status, body = post("/v1/report", json={**RECORD, "gender": None})
+    assert status == 400
+    assert body["details"] == ["gender がありません"]
+
+
+def test_ward_report_rejects_invalid_record():
+    status, body = post("/v1/ward-report", json={"records": [RECORD, {**RECORD, "temp": "高い"}]})
+    assert status == 400
+    assert [d["index"] for d in body["details"]] == [1]
+
+
+def test_valid_batch_with_null_optional_fields():
+    status, body = post("/v1/balance", json={"records": [RECORD, {**RECORD, "oral": None, "patient_id": "P2"}]})
+    assert status == 200
+    first, second = body["results"]
+    assert first["net"] == second["net"]
+    assert first["patient_id"] is None and second["patient_id"] == "P2"
+
+
+def test_unexpected_errors_are_not_reported_as_bad_requests(monkeypatch):
+    def broken(records):
+        raise RuntimeError("boom")
+    monkeypatch.setattr(balance_api, "compute_records", broken)
+    status, _ = post("/v1/balance", json={"records": [RECORD]})
+    assert status == 500
+
+
+def test_batch_size_limit():
+    with pytest.raises(BadRequest, match=str(MAX_BATCH)):
+        compute_records([RECORD] * (MAX_BATCH + 1))
+
+
+def test_gender_must_be_known_value():
+    status, body = post("/v1/balance", json={**RECORD, "gender": "male"})
+    assert status == 400
+    assert body["details"] == ["gender は 男性・女性 のいずれかで指定してください"]
+
+
+def computed_report():
+    return {**RECORD, **balance_api.compute_record(RECORD)}
+
+
+@pytest.mark.parametrize("path, body", [
+    ("/v1/report", {k: v for k, v in computed_report().items() if k != "urine"}),
+    ("/v1/ward-report", {"records": [computed_report(), {k: v for k, v in computed_report().items() if k != "urine"}]}),
+])
+def test_precomputed_record_missing_result_key(path, body):
+    # 計算済み（net を含む）でも報告書が読む項目が欠けていれば、描画・送信の前に 400 を返す
+    status, resp = post(path, json=body)
+    assert status == 400
+    assert "urine がありません" in str(resp["details"])
+
+
+def test_precomputed_record_with_text_number():
+    status, body = post("/v1/report", json={**computed_report(), "metabolic": "多い"})
+    assert status == 400
+    assert body["details"] == ["metabolic は数値で指定してください"]
+
+
+def test_precomputed_report_renders():
+    status, body = post("/v1/report", json=computed_report())
+    assert status == 200 and body.startswith(b"%PDF")
+
+
+def test_large_batch_is_computed_off_the_event_loop(monkeypatch):
+    threads = []
+    compute = balance_api.compute_records
+
+    def recording(records):
+        threads.append(threading.current_thread())
+        return compute(records)
+    monkeypatch.setattr(balance_api, "compute_records", recording)
+    monkeypatch.setattr(balance_api, "INLINE_BATCH", 2)
+    for n in (2, 3):
+        status, body = post("/v1/balance", json={"records": [RECORD] * n})
+        assert status == 200 and len(body["results"]) == n
+    assert threads[0] is threading.main_thread() and threads[1] is not threading.main_thread()
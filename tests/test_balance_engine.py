@@ -0,0 +1,93 @@
+"""balance_engine の一括計算がメイン計算ページの元の式（1 患者ずつの if 文）と一致すること"""
+import itertools
+
+import numpy as np
+import pytest
+
+from balance_engine import compute_balance, compute_one, stool_factor
+
+
+def baseline(age, gender, weight, temp, room_temp, kcal, meta_coef, oral, iv, blood,
+             urine_times, urine_volume, bleeding, stool_weight, stool_type):
+    # 元の 水分管理.py の計算をそのまま写したもの
+    metabolic = kcal * meta_coef
+    urine_total = urine_times * urine_volume
+    s_factor = 0.75 if stool_type == "普通" else 0.85 if stool_type == "軟便" else 0.95
+    stool_total = stool_weight * s_factor
+
+    insensible_total = 15.0 * weight
+    if temp > 37.0:
+        insensible_total *= (1 + 0.15 * (temp - 37.0))
+    if room_temp > 30.0:
+        insensible_total *= (1 + 0.175 * (room_temp - 30.0))
+
+    total_in = oral + iv + blood + metabolic
+    total_out = urine_total + bleeding + stool_total + insensible_total
+    net_balance = total_in - total_out
+
+    if net_balance > 500:
+        judg = "体液過剰の傾向"
+    elif net_balance < -200:
+        judg = "脱水リスク"
+    else:
+        judg = "維持範囲"
+
+    if age < 1:
+        tbw_ratio = 0.8
+    elif age < 14:
+        tbw_ratio = 0.7
+    elif age >= 65:
+        tbw_ratio = 0.5
+    else:
+        tbw_ratio = 0.6 if gender == "男性" else 0.55
+    tbw_val = weight * tbw_ratio * 1000
+
+    loss_ml = abs(net_balance) if net_balance < 0 else 0
+    loss_rate = (loss_ml / tbw_val) * 100 if tbw_val > 0 else 0
+    return {
+        "metabolic": metabolic, "insensible": insensible_total, "urine": urine_total, "stool": stool_total,
+        "total_in": total_in, "total_out": total_out, "net": net_balance, "judgment": judg,
+        "tbw_ratio": tbw_ratio, "tbw": tbw_val, "loss_rate": loss_rate,
+    }
+
+
+# 年齢区分・性別・発熱・高室温・便性状（未知の値を含む）・判定の境界をまたぐ組み合わせ
+CASES = [
+    dict(age=age, gender=gender, weight=weight, temp=temp, room_temp=room_temp,
+         kcal=1800, meta_coef=0.13, oral=oral, iv=500, blood=0,
+         urine_times=5, urine_volume=250, bleeding=50, stool_weight=150, stool_type=stool_type)
+    for age, gender, weight, temp, room_temp, oral, stool_type in itertools.product(
+        (0.5, 8, 40, 70), ("男性", "女性"), (3.5, 62.0), (36.5, 37.0, 39.2), (24.0, 30.0, 33.5),
+        (300, 1500, 3000), ("普通", "軟便", "下痢", "水様"),
+    )
+]
+
+
+@pytest.mark.parametrize("case", CASES[::7])
+def test_compute_one_matches_baseline(case):
+    expected = baseline(**case)
+    result = compute_one(**case)
+    for key, value in expected.items():
+        assert result[key] == pytest.approx(value, abs=1e-9), key
+
+
+def test_compute_balance_matches_baseline_for_all_rows():
+    columns = {k: np.array([c[k] for c in CASES]) for k in CASES[0]}
+    result = compute_balance(**columns)
+    for i, case in enumerate(CASES):
+        expected = baseline(**case)
+        assert result["net"][i] == pytest.approx(expected["net"])
+        assert result["loss_rate"][i] == pytest.approx(expected["loss_rate"])
+        assert result["judgment"][i] == expected["judgment"]
+
+
+def test_net_at_judgment_thresholds():
+    # 境界値ちょうどは維持範囲（> 500 / < -200 のみ）
+    base = dict(age=40, gender="男性", weight=60.0, temp=36.5, room_temp=24.0)
+    insensible = 15.0 * 60.0
+    for net, judg in ((500, "維持範囲"), (500.5, "体液過剰の傾向"), (-200, "維持範囲"), (-200.5, "脱水リスク")):
+        assert compute_one(**base, oral=insensible + net)["judgment"] == judg
+
+
+def test_unknown_stool_type_uses_diarrhea_factor():
+    assert stool_factor(["普通", "軟便", "下痢", "", "不明"]).tolist() == [0.75, 0.85, 0.95, 0.95, 0.95]
@@ -0,0 +1,94 @@
+"""balance_export の差分出力（rev 以降の追記・上書きされた記録・分割）"""
+import datetime
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pytest
+
+from balance_engine import compute_one
+from balance_export import PARTITION_SCHEMA, export_changes, read_state
+from balance_store import BalanceStore
+
+INPUTS = dict(age=40, gender="男性", weight=60.0, temp=36.5, room_temp=24.0, oral=1500, urine_times=5, urine_volume=250)
+DAY = datetime.date(2026, 1, 1)
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = BalanceStore(str(tmp_path / "balance.db"))
+    yield store
+    store.close()
+
+
+def save(store, patient_id, ward="ICU", day=DAY, **inputs):
+    inputs = {**INPUTS, **inputs}
+    store.save(patient_id, day, inputs, compute_one(**inputs), ward=ward, recorder="看護師A",
+               recorded_at=datetime.datetime(2026, 1, 1, 9, 0))
+
+
+def read(out_dir, fmt="parquet"):
+    partitioning = ds.partitioning(PARTITION_SCHEMA, flavor="hive")
+    return ds.dataset(out_dir, format=fmt, partitioning=partitioning).to_table().to_pylist()
+
+
+def latest(rows):
+    # 同じ (patient_id, day) は rev の大きい行が新しい
+    out = {}
+    for r in sorted(rows, key=lambda r: r["rev"]):
+        out[(r["patient_id"], r["day"])] = r
+    return out
+
+
+def test_second_export_appends_only_changes_after_upsert(store, tmp_path):
+    out = tmp_path / "export"
+    for pid in ("P1", "P2", "P3"):
+        save(store, pid)
+    assert export_changes(store, out) == (3, 3)
+
+    save(store, "P2", oral=2500)          # 上書き（rev が振り直される）
+    save(store, "P4", ward="5E")
+    written, rev = export_changes(store, out)
+    assert (written, rev) == (2, 5)
+    assert read_state(out) == {"rev": 5, "rows": 5, "format": "parquet"}
+
+    rows = read(out)
+    assert len(rows) == 5
+    current = latest(rows)
+    assert len(current) == 4
+    assert current[("P2", "2026-01-01")]["oral"] == 2500
+    assert current[("P2", "2026-01-01")]["net"] == pytest.approx(compute_one(**{**INPUTS, "oral": 2500})["net"])
+    assert current[("P4", "2026-01-01")]["ward"] == "5E"
+
+    assert export_changes(store, out) == (0, 5)
+    assert len(read(out)) == 5
+
+
+def test_partitions_and_types(store, tmp_path):
+    out = tmp_path / "export"
+    save(store, "P1", ward="")
+    save(store, "P2", day=DAY + datetime.timedelta(days=1))
+    export_changes(store, out)
+    assert (out / "day=2026-01-02" / "ward=ICU").is_dir()
+    # 病棟未設定は null のパーティションになる
+    assert (out / "day=2026-01-01" / "ward=__HIVE_DEFAULT_PARTITION__").is_dir()
+    table = ds.dataset(out, format="parquet", partitioning="hive").to_table()
+    # Parquet には秒単位の時刻型がないため ms で読み戻る
+    assert pa.types.is_timestamp(table.schema.field("recorded_at").type)
+    assert table.column("recorded_at")[0].as_py() == datetime.datetime(2026, 1, 1, 9, 0)
+    assert table.schema.field("loss_level").type == pa.int8()
+
+
+def test_small_batches_and_arrow_format(store, tmp_path):
+    out = tmp_path / "export"
+    for i in range(5):
+        save(store, f"P{i}")
+    assert export_changes(store, out, fmt="arrow", batch_size=2) == (5, 5)
+    assert sorted(r["patient_id"] for r in read(out, "ipc")) == [f"P{i}" for i in range(5)]
+    assert read_state(out)["format"] == "arrow"
+
+
+def test_full_export_ignores_state(store, tmp_path):
+    save(store, "P1")
+    export_changes(store, tmp_path / "a")
+    assert export_changes(store, tmp_path / "b", full=True) == (1, 1)
+    assert export_changes(store, tmp_path / "a", full=True) == (1, 1)
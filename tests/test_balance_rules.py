@@ -0,0 +1,82 @@
+"""balance_rules の RuleSet（境界・scope の優先・空の入力）"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from balance_rules import compile_rules
+from ward_board import DEFAULT_RULES, RISK_CAUTION, RISK_DANGER, RISK_LABELS, RISK_OVERLOAD
+
+OVERLOAD = [
+    {"name": "overload", "label": "過剰", "level": 2, "all": [["net", ">", 500]]},
+    {"name": "overload", "label": "過剰(ICU)", "level": 2, "scope": {"ward": ["ICU"]}, "all": [["net", ">", 1000]]},
+    {"name": "overload", "label": "過剰(ICU高齢)", "level": 2,
+     "scope": {"ward": "ICU", "age": {"min": 65}}, "all": [["net", ">", 1500]]},
+]
+
+
+def test_more_specific_scope_overrides_general_rule():
+    rules = compile_rules(OVERLOAD)
+    cols = {"net": np.array([800, 800, 1200, 1200, 1600]),
+            "ward": np.array(["5F", "ICU", "ICU", "ICU", "ICU"]),
+            "age": np.array([70, 40, 40, 70, 70])}
+    out = rules.evaluate(cols)
+    assert out["fired"]["overload"].tolist() == [True, False, True, False, True]
+    assert out["label"].tolist() == ["過剰", "", "過剰(ICU)", "", "過剰(ICU高齢)"]
+
+
+def test_range_scope_is_half_open():
+    rules = compile_rules([{"name": "r", "level": 1, "scope": {"age": {"min": 18, "max": 65}}, "all": [["net", "<", 0]]}])
+    out = rules.evaluate({"age": np.array([17, 18, 64, 65]), "net": np.array([-1, -1, -1, -1])})
+    assert out["fired"]["r"].tolist() == [False, True, True, False]
+
+
+def test_highest_level_wins_and_thresholds_are_inclusive():
+    rules = compile_rules(DEFAULT_RULES)
+    df = pd.DataFrame({"loss_rate": [3.0, 2.0, 1.99, 0.0], "net": [-1800, -1200, 600, 500]})
+    out = rules.evaluate(df)
+    assert out["level"].tolist() == [RISK_DANGER, RISK_CAUTION, RISK_OVERLOAD, 0]
+    assert out["label"].tolist() == [RISK_LABELS[RISK_DANGER], RISK_LABELS[RISK_CAUTION], RISK_LABELS[RISK_OVERLOAD], ""]
+
+
+def test_any_and_all_combined():
+    rules = compile_rules([{"name": "x", "level": 1, "all": [["age", ">=", 65]],
+                            "any": [["loss_rate", ">=", 1.5], ["net", "<", -500]]}])
+    out = rules.evaluate({"age": np.array([70, 70, 70, 40]), "loss_rate": np.array([1.5, 0, 0, 2]),
+                          "net": np.array([0, -600, 0, -600])})
+    assert out["fired"]["x"].tolist() == [True, True, False, False]
+
+
+def test_empty_rule_set_returns_one_row_per_record():
+    rules = compile_rules([])
+    out = rules.evaluate(pd.DataFrame({"net": [1, 2, 3]}))
+    assert out["level"].tolist() == [0, 0, 0]
+    assert out["label"].tolist() == ["", "", ""]
+    assert out["fired"] == {}
+
+
+def test_no_records():
+    out = compile_rules(DEFAULT_RULES).evaluate(pd.DataFrame({"net": [], "loss_rate": []}))
+    assert len(out["level"]) == 0 and len(out["label"]) == 0
+
+
+def test_index_name_can_be_used_as_a_column():
+    rules = compile_rules([{"name": "p", "level": 1, "scope": {"patient_id": "P2"}, "all": [["net", ">", 0]]}])
+    df = pd.DataFrame({"patient_id": ["P1", "P2"], "net": [10, 10]}).set_index("patient_id")
+    assert rules.evaluate(df)["fired"]["p"].tolist() == [False, True]
+
+
+def test_missing_column_is_an_error():
+    with pytest.raises(ValueError, match="loss_rate"):
+        compile_rules(DEFAULT_RULES).evaluate({"net": np.array([0])})
+
+
+@pytest.mark.parametrize("spec, message", [
+    ({"label": "x", "level": 1, "all": [["net", ">", 0]]}, "name"),
+    ({"name": "x", "level": 1}, "条件"),
+    ({"name": "x", "level": 1, "all": [["net", "=>", 0]]}, "演算子"),
+    ({"name": "x", "level": 1, "all": [["net", ">"]]}, "列名, 演算子, 値"),
+    ({"name": "x", "level": 1, "scope": {"age": {"from": 1}}, "all": [["net", ">", 0]]}, "min / max"),
+])
+def test_invalid_specs(spec, message):
+    with pytest.raises(ValueError, match=message):
+        compile_rules([spec])
@@ -0,0 +1,118 @@
+"""balance_store の GroupCommitWriter（まとめて書き込み・失敗時の 1 件ずつのやり直し）"""
+import datetime
+import sqlite3
+
+import pytest
+
+from balance_engine import compute_one
+from balance_store import BalanceStore, GroupCommitWriter
+
+INPUTS = dict(age=40, gender="男性", weight=60.0, temp=36.5, room_temp=24.0, oral=1500, urine_times=5, urine_volume=250)
+DAY = datetime.date(2026, 1, 1)
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = BalanceStore(str(tmp_path / "balance.db"))
+    yield store
+    store.close()
+
+
+def row(store, patient_id, **inputs):
+    inputs = {**INPUTS, **inputs}
+    return store.make_row(patient_id, DAY, inputs, compute_one(**INPUTS), ward="ICU")
+
+
+def test_batch_is_committed_once(store):
+    writer = GroupCommitWriter(store, flush_delay=0.2)
+    try:
+        futures = [writer.submit(row(store, f"P{i}")) for i in range(5)]
+        futures.append(writer.submit_event(store.make_event_row("P0", 1_767_200_000, "urine", 120)))
+        for f in futures:
+            f.result(timeout=5)
+    finally:
+        writer.close()
+    assert writer.commits == 1 and writer.rows == 6
+    assert len(store.ward_day("ICU", DAY)) == 5
+    assert store.patient_events("P0", 0, 2_000_000_000) == [{"ts": 1_767_200_000, "kind": "urine", "volume": 120.0}]
+
+
+def test_bad_row_fails_alone_and_the_rest_are_committed(store):
+    writer = GroupCommitWriter(store, flush_delay=0.2)
+    try:
+        good = [writer.submit(row(store, f"P{i}")) for i in range(3)]
+        bad = writer.submit(row(store, "BAD", oral=object()))  # SQLite に渡せない値
+        event = writer.submit_event(store.make_event_row("P1", 1_767_200_000, "iv", 500))
+        for f in good + [event]:
+            assert f.result(timeout=5) is None
+        with pytest.raises(sqlite3.Error):
+            bad.result(timeout=5)
+    finally:
+        writer.close()
+    assert sorted(r["patient_id"] for r in store.ward_day("ICU", DAY)) == ["P0", "P1", "P2"]
+    assert len(store.patient_events("P1", 0, 2_000_000_000)) == 1
+    # まとめた 1 回は取り消され、正しい 4 件は 1 件ずつコミットし直される
+    assert writer.commits == 4 and writer.rows == 4
+
+
+def test_close_flushes_pending_rows_and_rejects_new_ones(store):
+    writer = GroupCommitWriter(store, flush_delay=10)
+    future = writer.submit(row(store, "P0"))
+    writer.close()
+    assert future.done() and future.result() is None
+    assert len(store.ward_day("ICU", DAY)) == 1
+    with pytest.raises(RuntimeError):
+        writer.submit(row(store, "P1"))
+
+
+def test_save_overwrites_and_bumps_rev(store):
+    writer = GroupCommitWriter(store)
+    try:
+        writer.save("P0", DAY, INPUTS, compute_one(**INPUTS), ward="ICU")
+        first = store.ward_day("ICU", DAY)[0]["rev"]
+        writer.save("P0", DAY, INPUTS, compute_one(**INPUTS), ward="ICU")
+    finally:
+        writer.close()
+    rows = store.ward_day("ICU", DAY)
+    assert len(rows) == 1 and rows[0]["rev"] > first
+
+
+def test_recorded_at_is_japan_wall_clock(store):
+    # サーバーが UTC でも、記録時刻は日本時間の壁時計（オフセットなし）で保存する
+    utc = datetime.datetime(2026, 1, 1, 15, 30, tzinfo=datetime.timezone.utc)
+    stored = store.make_row("P0", DAY, INPUTS, compute_one(**INPUTS), recorded_at=utc)
+    assert stored["recorded_at"] == "2026-01-02T00:30:00"
+    event = store.make_event_row("P0", utc, "urine", 120, recorded_at=utc)
+    assert event["recorded_at"] == "2026-01-02T00:30:00"
+
+
+def test_default_recorded_at_uses_japan_time(store, monkeypatch):
+    import balance_store
+
+    jst = datetime.timezone(datetime.timedelta(hours=9))
+    monkeypatch.setattr(balance_store, "now_jst", lambda: datetime.datetime(2026, 1, 2, 0, 30, 5, tzinfo=jst))
+    stored = store.make_row("P0", DAY, INPUTS, compute_one(**INPUTS))
+    assert stored["recorded_at"] == "2026-01-02T00:30:05"
+
+
+def test_urine_measured_is_stored(store):
+    store.save_many([row(store, "P0"), {**row(store, "P1"), "urine_measured": 1}])
+    stored = {r["patient_id"]: r["urine_measured"] for r in store.ward_day("ICU", DAY)}
+    assert stored == {"P0": 0, "P1": 1}
+
+
+def test_old_database_gains_urine_measured(tmp_path):
+    # urine_measured 列のない以前の版のデータベースを開くと、列を足して既存の記録は推算（0）にする
+    path = str(tmp_path / "old.db")
+    store = BalanceStore(path)
+    store.save_many([row(store, "P0")])
+    store.close()
+    with sqlite3.connect(path) as conn:
+        conn.execute("ALTER TABLE balance_records DROP COLUMN urine_measured")
+    store = BalanceStore(path)
+    try:
+        assert store.ward_day("ICU", DAY)[0]["urine_measured"] == 0
+        store.save_many([{**row(store, "P1"), "urine_measured": 1}])
+        assert store.ward_day("ICU", DAY)[1]["urine_measured"] == 1
+    finally:
+        store.close()
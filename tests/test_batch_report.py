@@ -0,0 +1,45 @@
+"""batch_report の入力確認（必須項目が欠けたレコードは描画せずに報告する）"""
+import pytest
+
+from balance_engine import compute_one
+from batch_report import main, missing_fields, render_reports
+from medical_report import build_report_data
+
+RECORD = dict(patient_id="P1", age=70, gender="女性", weight=50.0, temp=36.8, room_temp=24.0, oral=1500, iv=500)
+
+
+def computed():
+    inputs = {**RECORD, "blood": 0, "bleeding": 0}
+    return build_report_data(inputs, compute_one(**{k: v for k, v in RECORD.items() if k != "patient_id"}),
+                             patient_id="P2")
+
+
+def test_missing_fields():
+    assert missing_fields(RECORD) == []
+    assert missing_fields({**RECORD, "weight": None}) == ["weight"]
+    assert missing_fields({k: v for k, v in RECORD.items() if k != "age"}) == ["age"]
+    assert missing_fields({**RECORD, "temp": float("nan")}) == ["temp"]
+    # 計算済みのレコードは報告書が読む項目を確かめる
+    assert missing_fields(computed()) == []
+    assert missing_fields({k: v for k, v in computed().items() if k != "urine"}) == ["urine"]
+
+
+@pytest.mark.parametrize("mode", ["files", "ward"])
+def test_bad_records_are_skipped_and_reported(tmp_path, mode):
+    records = [RECORD, {**RECORD, "patient_id": "P9", "weight": None}, computed(),
+               {k: v for k, v in computed().items() if k != "metabolic"}]
+    skipped = []
+    pages, _ = render_reports(records, tmp_path, mode=mode, workers=1, skipped=skipped)
+    assert [(i, pid) for i, pid, _ in skipped] == [(1, "P9"), (3, "P2")]
+    assert "weight" in skipped[0][2] and "metabolic" in skipped[1][2]
+    if mode == "files":
+        assert pages == 2 and len(list(tmp_path.glob("*.pdf"))) == 2
+
+
+def test_main_reports_skipped_records(tmp_path, capsys):
+    src = tmp_path / "ward.jsonl"
+    src.write_text('{"patient_id": "P1", "age": 70, "gender": "女性", "temp": 36.5, "room_temp": 24}\n',
+                   encoding="utf-8")
+    assert main([str(src), "-o", str(tmp_path / "out"), "--workers", "1"]) == 0
+    err = capsys.readouterr().err
+    assert "0 ページ" in err and "P1" in err and "weight" in err
@@ -0,0 +1,72 @@
+"""batch_score.score_frame の欠損値の扱い"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from balance_engine import compute_one
+from balance_rules import compile_rules
+from batch_score import MISSING_VALUE_ERROR, score_file, score_frame
+from ward_board import DEFAULT_RULES
+
+ROW = dict(age=40, gender="男性", weight=60.0, temp=36.5, room_temp=24.0, oral=1500, urine_times=5, urine_volume=250)
+
+
+def frame(*rows):
+    return pd.DataFrame([{**ROW, **r} for r in rows])
+
+
+def test_rows_with_missing_required_values_are_not_scored():
+    df = frame({}, {"weight": None}, {"gender": None, "temp": np.nan}, {})
+    out = score_frame(df, compile_rules(DEFAULT_RULES))
+
+    valid = [0, 3]
+    expected = compute_one(**ROW)
+    assert out.loc[valid, "net"].tolist() == pytest.approx([expected["net"]] * 2)
+    assert out.loc[valid, "error"].isna().all()
+    assert out.loc[valid, "alert"].notna().all()
+
+    # 欠けた行は判定・警告を含めて空にし、どの列が欠けているかを error に書く
+    for col in ("net", "total_out", "loss_rate", "judgment", "risk", "alert"):
+        assert out.loc[[1, 2], col].isna().all(), col
+    assert out.loc[1, "error"] == f"{MISSING_VALUE_ERROR}: weight"
+    assert out.loc[2, "error"] == f"{MISSING_VALUE_ERROR}: gender, temp"
+
+
+def test_missing_optional_values_use_defaults():
+    out = score_frame(frame({"oral": None, "urine_times": None}))
+    assert pd.isna(out.loc[0, "error"])
+    assert out.loc[0, "net"] == pytest.approx(compute_one(**{**ROW, "oral": 0, "urine_times": 0})["net"])
+
+
+def test_missing_required_column_is_an_error():
+    with pytest.raises(ValueError, match="room_temp"):
+        score_frame(frame({}).drop(columns="room_temp"))
+
+
+def test_all_rows_invalid_keeps_integer_columns_nullable():
+    out = score_frame(frame({"age": None}, {"age": None}), compile_rules(DEFAULT_RULES))
+    assert out["loss_level"].isna().all()
+    assert out["risk"].isna().all()
+
+
+def test_score_file_counts_invalid_rows(tmp_path):
+    src, dst = tmp_path / "in.csv", tmp_path / "out.csv"
+    frame({}, {"weight": None}, {}).to_csv(src, index=False)
+    assert score_file(src, dst, chunk_size=2) == (3, 1)
+    written = pd.read_csv(dst)
+    assert written["net"].isna().tolist() == [False, True, False]
+
+
+def test_parquet_chunks_keep_types_when_first_chunk_is_all_null(tmp_path):
+    # 最初のチャンクが全行欠けていても（judgment・alert・note が全件 null）後続のチャンクを書ける
+    src, dst = tmp_path / "in.csv", tmp_path / "out.parquet"
+    df = frame({"weight": None, "note": None}, {"weight": None, "note": None}, {"note": "経過観察"}, {"note": None})
+    df.to_csv(src, index=False)
+    rules = compile_rules(DEFAULT_RULES)
+    assert score_file(src, dst, chunk_size=2, rules=rules) == (4, 2)
+
+    written = pd.read_parquet(dst)
+    assert written["judgment"][:2].isna().all()
+    assert written["judgment"][2:].notna().all() and written["alert"][2:].notna().all()
+    assert written["note"].tolist()[2] == "経過観察"
+    assert written["net"][2:].tolist() == pytest.approx([compute_one(**ROW)["net"]] * 2)
@@ -0,0 +1,84 @@
+"""event_buffer の時刻付き記録の追記と時間ごと・期間ごとの集計"""
+import datetime
+
+import numpy as np
+import pytest
+
+from event_buffer import JST, EventBuffer, day_start, now_jst, today_jst
+
+DAY = datetime.date(2026, 1, 1)
+START = day_start(DAY)
+
+
+def at(hour, minute=0):
+    return START + datetime.timedelta(hours=hour, minutes=minute)
+
+
+def test_day_start_is_japan_midnight():
+    assert day_start(DAY) == datetime.datetime(2025, 12, 31, 15, tzinfo=datetime.timezone.utc)
+    assert now_jst().utcoffset() == datetime.timedelta(hours=9)
+    assert today_jst() == now_jst().date()
+
+
+def test_add_grows_past_capacity_and_bumps_version():
+    buf = EventBuffer(capacity=2)
+    for i in range(5):
+        buf.add(at(i), "urine", 100)
+    assert len(buf) == 5 and buf.version == 5
+    t, kind, vol = buf.columns()
+    assert t.tolist() == [int(at(i).timestamp()) for i in range(5)]
+    assert vol.tolist() == [100.0] * 5
+
+
+def test_extend_matches_add():
+    times = [int(at(h).timestamp()) for h in (1, 2, 2)]
+    kinds = ["oral", "urine", "iv"]
+    added, extended = EventBuffer(capacity=1), EventBuffer(capacity=1)
+    for ts, k in zip(times, kinds):
+        added.add(ts, k, 200)
+    extended.extend(times, kinds, [200, 200, 200])
+    assert all(np.array_equal(a, b) for a, b in zip(added.columns(), extended.columns()))
+    assert extended.version == 1
+
+
+def test_hourly_totals_bins_by_hour_and_kind():
+    buf = EventBuffer()
+    buf.add(at(0, 10), "oral", 100)
+    buf.add(at(0, 50), "oral", 50)
+    buf.add(at(2), "urine", 300)
+    buf.add(at(-1), "urine", 999)    # 範囲外（前日）
+    buf.add(at(3), "urine", 999)     # 範囲外（hours=3 の外）
+    totals = buf.hourly_totals(START, 3)
+    assert totals.shape == (3, 5)
+    assert totals[0].tolist() == [150, 0, 0, 0, 0]
+    assert totals[1].sum() == 0
+    assert totals[2].tolist() == [0, 0, 0, 300, 0]
+
+
+def test_hourly_balance_adds_daily_estimates_per_hour():
+    buf = EventBuffer()
+    buf.add(at(0), "iv", 240)
+    buf.add(at(1), "urine", 100)
+    out = buf.hourly_balance(START, 2, insensible_per_hour=30, metabolic_per_hour=10, stool_per_hour=5)
+    assert out["in"].tolist() == [250, 10]
+    assert out["out"].tolist() == [35, 135]
+    assert out["cumulative"].tolist() == pytest.approx([215, 90])
+
+
+def test_totals_between_is_half_open():
+    buf = EventBuffer()
+    buf.add(at(0), "urine", 100)
+    buf.add(at(1), "urine", 50)
+    buf.add(at(1), "bleeding", 20)
+    totals = buf.totals_between(at(0), at(1))
+    assert totals["urine"] == (100.0, 1)
+    assert totals["bleeding"] == (0.0, 0)
+    assert buf.totals_between(at(0), at(2))["urine"] == (150.0, 2)
+
+
+def test_datetime_and_epoch_timestamps_are_the_same():
+    buf = EventBuffer()
+    buf.add(at(5), "oral", 10)
+    buf.add(int(at(5).timestamp()), "oral", 10)
+    assert buf.columns()[0][0] == buf.columns()[0][1]
+    assert datetime.datetime.fromtimestamp(buf.columns()[0][0], JST) == at(5)
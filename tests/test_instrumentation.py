@@ -0,0 +1,78 @@
+"""instrumentation の計測（無効時は何もしない・集計・Prometheus 形式）"""
+import contextlib
+import json
+
+import pytest
+
+import instrumentation
+from instrumentation import BUCKETS, Registry
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    registry = Registry()
+    monkeypatch.setattr(instrumentation, "REGISTRY", registry)
+    monkeypatch.setattr(instrumentation, "ENABLED", True)
+    return registry
+
+
+def test_disabled_helpers_do_nothing(monkeypatch):
+    monkeypatch.setattr(instrumentation, "ENABLED", False)
+
+    def fn():
+        return 1
+
+    assert instrumentation.timed("x")(fn) is fn
+    assert isinstance(instrumentation.stage("x"), contextlib.nullcontext)
+    assert instrumentation.start_timer("x")() is None
+
+
+def test_observations_are_aggregated_with_cumulative_buckets(registry):
+    for seconds in (0.002, 0.02, 3.0):
+        registry.observe("calc", seconds)
+    stats = registry.snapshot()["stages"]["calc"]
+    assert stats["count"] == 3
+    assert stats["total_seconds"] == pytest.approx(3.022)
+    assert stats["max_seconds"] == 3.0 and stats["last_seconds"] == 3.0
+    assert stats["buckets"][0.001] == 0 and stats["buckets"][0.005] == 1
+    assert stats["buckets"][0.025] == 2 and stats["buckets"][BUCKETS[-1]] == 3
+
+
+def test_stage_timed_and_start_timer_record(registry):
+    with instrumentation.stage("block"):
+        pass
+
+    @instrumentation.timed("func")
+    def fn(x):
+        return x * 2
+
+    assert fn(2) == 4 and fn.__name__ == "fn"
+    instrumentation.start_timer("manual")()
+    with pytest.raises(ValueError), instrumentation.stage("failing"):
+        raise ValueError
+    assert {name: s["count"] for name, s in registry.snapshot()["stages"].items()} == {
+        "block": 1, "failing": 1, "func": 1, "manual": 1,
+    }
+
+
+def test_values_and_reset(registry):
+    registry.set_value_once("startup", 1.5)
+    registry.set_value_once("startup", 9.0)
+    registry.set_value("sessions", 3)
+    registry.observe("calc", 0.1)
+    registry.reset()
+    snap = json.loads(registry.to_json())
+    assert snap["values"] == {"startup": 1.5, "sessions": 3}
+    assert snap["stages"] == {}
+
+
+def test_prometheus_text(registry):
+    registry.observe("pdf.request", 0.2)
+    registry.set_value("sessions", 2)
+    text = registry.to_prometheus()
+    assert 'water_balance_stage_seconds_bucket{stage="pdf.request",le="0.1"} 0' in text
+    assert 'water_balance_stage_seconds_bucket{stage="pdf.request",le="0.25"} 1' in text
+    assert 'water_balance_stage_seconds_bucket{stage="pdf.request",le="+Inf"} 1' in text
+    assert 'water_balance_stage_seconds_count{stage="pdf.request"} 1' in text
+    assert 'water_balance_value{name="sessions"} 2' in text
+    assert text.endswith("\n")
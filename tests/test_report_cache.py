@@ -0,0 +1,71 @@
+"""report_cache の ReportCache（ヒット・ミス・容量上限での追い出し）"""
+from io import BytesIO
+
+import numpy as np
+
+from report_cache import ReportCache, report_key
+
+DATA = {"patient_id": "P1", "net": -250.0, "judgment": "脱水リスク", "recorded_at": "2026/01/01 09:00"}
+
+
+class Renderer:
+    # 描画の代わりに size バイトの PDF もどきを返し、呼ばれた回数を数える
+    def __init__(self, size=100):
+        self.size = size
+        self.calls = 0
+
+    def __call__(self, data):
+        self.calls += 1
+        return BytesIO(b"%PDF" + str(data["patient_id"]).encode().ljust(self.size - 4, b"."))
+
+
+def test_hit_returns_cached_pdf_without_rendering():
+    render = Renderer()
+    cache = ReportCache(max_bytes=1_000, render=render)
+    first = cache.get_or_render(DATA)
+    second = cache.get_or_render(dict(reversed(DATA.items())))  # キーの順序は問わない
+    assert first == second and render.calls == 1
+    assert cache.stats() == {"entries": 1, "bytes": 100, "max_bytes": 1_000, "hits": 1, "misses": 1}
+
+
+def test_key_includes_recorded_at_and_normalizes_numbers():
+    assert report_key(DATA) != report_key({**DATA, "recorded_at": "2026/01/01 09:01"})
+    assert report_key(DATA) == report_key({**DATA, "net": np.float64(-250.0)})
+
+
+def test_changed_content_misses():
+    render = Renderer()
+    cache = ReportCache(max_bytes=1_000, render=render)
+    cache.get_or_render(DATA)
+    cache.get_or_render({**DATA, "net": -300.0})
+    assert render.calls == 2 and cache.stats()["misses"] == 2 and len(cache) == 2
+
+
+def test_least_recently_used_is_evicted_under_the_cap():
+    render = Renderer(size=100)
+    cache = ReportCache(max_bytes=250, render=render)
+    a, b, c = ({**DATA, "patient_id": pid} for pid in "ABC")
+    cache.get_or_render(a)
+    cache.get_or_render(b)
+    cache.get_or_render(a)          # A を最近使用にする
+    cache.get_or_render(c)          # 上限を超えるので最も古い B を捨てる
+    assert cache.size == 200 and len(cache) == 2
+    assert cache.get(report_key(b)) is None
+    assert cache.get(report_key(a)) is not None and cache.get(report_key(c)) is not None
+    cache.get_or_render(b)
+    assert render.calls == 4
+
+
+def test_pdf_larger_than_cap_is_not_cached():
+    render = Renderer(size=500)
+    cache = ReportCache(max_bytes=250, render=render)
+    assert cache.get_or_render(DATA).startswith(b"%PDF")
+    cache.get_or_render(DATA)
+    assert render.calls == 2 and len(cache) == 0 and cache.size == 0
+
+
+def test_put_replaces_existing_entry_size():
+    cache = ReportCache(max_bytes=1_000, render=Renderer())
+    cache.put("k", b"x" * 300)
+    cache.put("k", b"y" * 100)
+    assert cache.size == 100 and cache.get("k") == b"y" * 100
@@ -0,0 +1,86 @@
+"""report_jobs の一括出力ジョブ（ZIP の中身・失敗・古いジョブの削除・後片付け）"""
+import datetime
+import io
+import os
+import time
+import zipfile
+
+import pytest
+
+from balance_engine import compute_one
+from balance_store import BalanceStore
+from report_jobs import JOB_DONE, JOB_FAILED, ReportJobQueue, store_row_report_data
+
+INPUTS = dict(age=40, gender="男性", weight=60.0, temp=36.5, room_temp=24.0, oral=1500, urine_times=5, urine_volume=250)
+WHEN = datetime.datetime(2026, 1, 2, 9, 30)
+
+
+def row(patient_id, day=datetime.date(2026, 1, 1)):
+    return BalanceStore.make_row(patient_id, day, INPUTS, compute_one(**INPUTS), recorder="看護師A", recorded_at=WHEN)
+
+
+@pytest.fixture
+def queue():
+    queue = ReportJobQueue(workers=1, keep=2)
+    yield queue
+    queue.shutdown()
+
+
+def wait_done(queue, job_id, timeout=60):
+    deadline = time.monotonic() + timeout
+    while queue.get(job_id).active:
+        assert time.monotonic() < deadline, "ジョブが終わりません"
+        time.sleep(0.02)
+    return queue.get(job_id)
+
+
+def test_store_row_report_data_fills_defaults_and_formats_time():
+    stored = {**row("P1"), "kcal": None}
+    data = store_row_report_data(stored)
+    assert data["recorded_at"] == "2026/01/02 09:30"
+    assert data["kcal"] == 0 and data["recorder"] == "看護師A" and data["patient_id"] == "P1"
+
+
+def test_job_writes_one_pdf_per_row_with_unique_names(queue):
+    rows = [row("P1"), row("P1", datetime.date(2026, 1, 2)), row("P2")]
+    job = wait_done(queue, queue.submit("3 件", rows))
+    assert job.status == JOB_DONE and job.done == job.total == 3 and job.progress == 1.0
+    with zipfile.ZipFile(io.BytesIO(queue.read_zip(job.id))) as zf:
+        names = zf.namelist()
+        assert names == ["FluidBalance_P1_20260102_0930.pdf", "FluidBalance_P1_20260102_0930_2.pdf",
+                         "FluidBalance_P2_20260102_0930.pdf"]
+        assert all(zf.read(n).startswith(b"%PDF") for n in names)
+
+
+def test_failed_job_reports_error(queue):
+    bad = {**row("P1"), "recorded_at": "not a time"}
+    job = wait_done(queue, queue.submit("失敗", [row("P0"), bad]))
+    assert job.status == JOB_FAILED and job.error
+    with pytest.raises(KeyError):
+        queue.read_zip(job.id)
+
+
+def test_old_finished_jobs_are_pruned_with_their_zip(queue):
+    first = wait_done(queue, queue.submit("1", [row("P1")]))
+    wait_done(queue, queue.submit("2", [row("P2")]))
+    third = queue.submit("3", [row("P3")])
+    wait_done(queue, third)
+    assert queue.get(first.id) is None and not os.path.exists(first.path)
+    assert queue.get(third).status == JOB_DONE
+
+
+def test_shutdown_removes_temporary_directory():
+    queue = ReportJobQueue(workers=1)
+    job = wait_done(queue, queue.submit("1", [row("P1")]))
+    assert os.path.exists(job.path)
+    queue.shutdown()
+    assert not os.path.exists(os.path.dirname(job.path))
+
+
+def test_empty_job_completes():
+    queue = ReportJobQueue(workers=1)
+    try:
+        job = wait_done(queue, queue.submit("0 件", []))
+        assert job.status == JOB_DONE and job.progress == 1.0
+    finally:
+        queue.shutdown()
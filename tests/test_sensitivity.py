@@ -0,0 +1,58 @@
+"""sensitivity の格子評価（1 点ずつの計算との一致・トルネード図の並び・全格子の集計）"""
+import numpy as np
+import pytest
+
+from balance_engine import META_COEF_DEFAULT, compute_one
+from sensitivity import PARAMETERS, axis_values, base_params, full_grid_summary, grid, surface, tornado
+
+INPUTS = dict(age=70, gender="女性", weight=50.0, temp=37.8, room_temp=31.0, kcal=1600, meta_coef=META_COEF_DEFAULT,
+              oral=1200, iv=800, urine_times=6, urine_volume=200, stool_weight=150, stool_type="軟便")
+
+
+def test_base_params_reproduce_main_page_result():
+    params = base_params(INPUTS)
+    assert params["stool_coef"] == 0.85
+    base, _ = tornado(INPUTS, params)
+    assert base == pytest.approx(compute_one(**INPUTS)["net"])
+
+
+def test_grid_matches_point_by_point_computation():
+    params = base_params(INPUTS)
+    temps, rooms = [36.0, 38.5, 40.0], [20.0, 33.0]
+    result = grid(INPUTS, params, {"temp": temps, "room_temp": rooms})
+    assert result["net"].shape == (3, 2)
+    for i, t in enumerate(temps):
+        for j, r in enumerate(rooms):
+            expected = compute_one(**{**INPUTS, "temp": t, "room_temp": r, "stool_coef": params["stool_coef"]})
+            assert result["net"][i, j] == pytest.approx(expected["net"])
+            assert result["judgment"][i, j] == expected["judgment"]
+
+
+def test_surface_shape_is_y_by_x():
+    xs, ys, net, rate = surface(INPUTS, base_params(INPUTS), "temp", "insensible_base", steps=7)
+    assert xs.tolist() == axis_values("temp", 7).tolist()
+    assert net.shape == rate.shape == (7, 7)
+    # 体温・不感蒸泄の基本量が上がるほどバランスは下がる
+    assert np.all(np.diff(net, axis=0) <= 0) and np.all(np.diff(net, axis=1) <= 0)
+
+
+def test_tornado_rows_are_sorted_by_swing():
+    params = base_params(INPUTS)
+    _, rows = tornado(INPUTS, params)
+    assert {r["name"] for r in rows} == set(PARAMETERS)
+    swings = [r["swing"] for r in rows]
+    assert swings == sorted(swings, reverse=True)
+    for r in rows:
+        low = compute_one(**{**INPUTS, **params, r["name"]: r["low"]})
+        assert r["net_low"] == pytest.approx(low["net"])
+
+
+def test_full_grid_summary_covers_every_combination():
+    summary = full_grid_summary(INPUTS, steps=3)
+    assert summary["cells"] == 3 ** len(PARAMETERS)
+    assert summary["net_min"] <= summary["net_median"] <= summary["net_max"]
+    assert 0 <= summary["dehydration_share"] + summary["overload_share"] <= 1
+    # 最も乾く組み合わせ（係数・体温・室温がすべて上限、代謝水係数だけ下限）がそのまま最小値になる
+    extremes = {name: PARAMETERS[name][2] for name in PARAMETERS}
+    extremes["meta_coef"] = PARAMETERS["meta_coef"][1]
+    assert summary["net_min"] == pytest.approx(compute_one(**{**INPUTS, **extremes})["net"])
@@ -0,0 +1,52 @@
+"""session_limits のセッションサイズの見積もりと上限超過時の一時データの破棄"""
+import datetime
+import sys
+
+import numpy as np
+
+from balance_aggregate import PatientBalance
+from balance_engine import compute_one
+from event_buffer import EventBuffer
+from session_limits import TRANSIENT_KEYS, enforce_session_budget, session_full, session_nbytes
+
+INPUTS = dict(age=40, gender="男性", weight=60.0, temp=36.5, room_temp=24.0, oral=1500)
+
+
+def records(days):
+    start = datetime.date(2026, 1, 1)
+    result = compute_one(**INPUTS)
+    return [{**INPUTS, **result, "day": str(start + datetime.timedelta(days=i))} for i in range(days)]
+
+
+def test_patient_balance_counts_records_and_window_entries():
+    # 保存済みの記録（records）と移動窓の deque（_Window.entries）の中身まで数える
+    small = session_nbytes({"patient_balance": PatientBalance(records(1), 36_000)})
+    large = session_nbytes({"patient_balance": PatientBalance(records(30), 36_000)})
+    assert large > small + 29 * sys.getsizeof(records(1)[0])
+
+    balance = PatientBalance(records(1), 36_000)
+    before = session_nbytes({"patient_balance": balance})
+    for i in range(500):
+        balance.add_event("2026-01-01", 1_767_225_600 + i * 60, "urine", 10)
+    assert session_nbytes({"patient_balance": balance}) > before + 500 * sys.getsizeof(1.0)
+
+
+def test_shared_objects_are_counted_once():
+    buf = EventBuffer()
+    buf.extend(np.arange(100), ["urine"] * 100, np.ones(100))
+    assert session_nbytes({"a": buf, "b": buf}) == session_nbytes({"a": buf})
+
+
+def test_budget_drops_transient_keys_only():
+    events = EventBuffer()
+    state = {"events": events, "mc_result": np.zeros(200_000), "mc_key": ("x",), "weight": 60.0}
+    assert session_full(state, max_bytes=100_000)
+    size = enforce_session_budget(state, max_bytes=100_000)
+    assert not set(TRANSIENT_KEYS) & set(state)
+    assert state["events"] is events and size == session_nbytes(state)
+
+
+def test_budget_keeps_state_under_limit():
+    state = {"mc_result": np.zeros(10), "mc_key": ("x",)}
+    enforce_session_budget(state, max_bytes=1_000_000)
+    assert "mc_result" in state
@@ -0,0 +1,39 @@
+"""uncertainty のモンテカルロ区間（尿量を実測として固定するかどうか）"""
+import numpy as np
+
+from uncertainty import simulate, simulate_ward
+
+RECORD = dict(age=70, gender="女性", weight=50.0, temp=37.5, room_temp=26.0, oral=1200, iv=500,
+              urine_times=6, urine_volume=1200, stool_weight=150, stool_type="普通")
+
+
+def width(result, i=None):
+    lo, hi = result["net_low"], result["net_high"]
+    return (hi - lo) if i is None else (hi[i] - lo[i])
+
+
+def test_same_input_gives_same_interval():
+    first, _ = simulate(RECORD, samples=2_000)
+    second, _ = simulate(RECORD, samples=2_000)
+    assert first == second
+
+
+def test_measured_urine_narrows_interval():
+    estimated, _ = simulate(RECORD, samples=5_000, seed=1)
+    measured, _ = simulate(RECORD, samples=5_000, seed=1, urine_measured=True)
+    assert width(measured) < width(estimated)
+
+
+def test_ward_fixes_urine_only_for_measured_records():
+    # 同じ入力の 2 人のうち、時間記録モードで保存した 1 人だけ尿量を固定する
+    records = [{**RECORD, "urine_measured": 0}, {**RECORD, "urine_measured": 1}]
+    mc = simulate_ward(records, samples=5_000, seed=1)
+    assert width(mc, 1) < width(mc, 0)
+
+
+def test_ward_treats_missing_mode_as_estimated():
+    # 列のない記録や DataFrame 経由の NaN は推算として扱う
+    records = [dict(RECORD), {**RECORD, "urine_measured": float("nan")}, {**RECORD, "urine_measured": None}]
+    mc = simulate_ward(records, samples=5_000, seed=1)
+    estimated = simulate_ward([{**RECORD, "urine_measured": 0}] * 3, samples=5_000, seed=1)
+    assert np.allclose(mc["net_low"], estimated["net_low"])
@@ -0,0 +1,38 @@
+"""urine_monitor の移動窓の判定（無尿・少尿・多尿）"""
+from balance_aggregate import HOUR
+from urine_monitor import STATE_ANURIA, STATE_NORMAL, STATE_OLIGURIA, STATE_POLYURIA, UrineMonitor, replay
+
+WEIGHT = 60.0
+
+
+def test_no_urine_since_start_is_anuria():
+    status, alerts = replay([], [], WEIGHT, 30 * HOUR, start=0)
+    assert {name: state for name, (_, _, state) in status.items()} == {"6h": STATE_ANURIA, "12h": STATE_ANURIA, "24h": STATE_ANURIA}
+    assert [(a["window"], a["time"]) for a in alerts] == [("6h", 6 * HOUR), ("12h", 12 * HOUR), ("24h", 24 * HOUR)]
+
+
+def test_no_start_and_no_urine_has_no_status():
+    assert replay([], [], WEIGHT, 30 * HOUR) == (None, [])
+
+
+def test_windows_are_not_judged_before_their_span():
+    status, alerts = replay([], [], WEIGHT, 8 * HOUR, start=0)
+    assert [state for _, _, state in status.values()] == [STATE_ANURIA, None, None]
+    assert len(alerts) == 1
+
+
+def test_urine_stopping_turns_oliguria_then_anuria():
+    # 20 mL/kg/day（正常）で 24 時間出たあと止まる
+    hourly = 20 * WEIGHT / 24
+    times = [h * HOUR for h in range(1, 25)]
+    status, alerts = replay(times, [hourly] * 24, WEIGHT, 36 * HOUR, start=0)
+    six_hour = [a["state"] for a in alerts if a["window"] == "6h"]
+    assert six_hour == [STATE_OLIGURIA, STATE_ANURIA]
+    assert status["24h"][2] == STATE_NORMAL
+
+
+def test_polyuria_is_judged_before_the_window_is_full():
+    monitor = UrineMonitor()
+    monitor.admit("P", WEIGHT, 0)
+    alerts = monitor.add("P", HOUR, 3000)  # 24h 窓でも 50 mL/kg/day
+    assert {a["window"]: a["state"] for a in alerts} == {"6h": STATE_POLYURIA, "12h": STATE_POLYURIA, "24h": STATE_POLYURIA}
@@ -0,0 +1,63 @@
+"""ward_board の WardBoard（更新分だけの再評価・リスク順の並べ替え）"""
+import pytest
+
+from balance_rules import compile_rules
+from ward_board import (
+    DEFAULT_RULES, RISK_CAUTION, RISK_DANGER, RISK_DEHYDRATION, RISK_LABELS, RISK_NONE, RISK_OVERLOAD, WardBoard,
+)
+
+
+def rec(pid, rev, net, loss_rate=0.0):
+    return {"patient_id": pid, "rev": rev, "net": net, "loss_rate": loss_rate}
+
+
+class CountingRules:
+    # 評価した行数を数える
+    def __init__(self):
+        self.rules = compile_rules(DEFAULT_RULES)
+        self.rows = []
+
+    def evaluate(self, records):
+        self.rows.append(len(records))
+        return self.rules.evaluate(records)
+
+
+def test_orders_by_risk_then_loss_rate_then_net():
+    board = WardBoard()
+    board.update([
+        rec("ok", 1, 0), rec("dry", 2, -300), rec("wet", 3, 800), rec("danger", 4, -2000, 3.5),
+        rec("caution", 5, -1500, 2.5), rec("dry2", 6, -600),
+    ])
+    frame = board.frame
+    assert frame.index.tolist() == ["danger", "caution", "wet", "dry2", "dry", "ok"]
+    assert frame["risk"].tolist() == [RISK_DANGER, RISK_CAUTION, RISK_OVERLOAD, RISK_DEHYDRATION,
+                                      RISK_DEHYDRATION, RISK_NONE]
+    assert frame.loc["ok", "alert"] == RISK_LABELS[RISK_NONE]
+
+
+def test_only_changed_records_are_evaluated():
+    rules = CountingRules()
+    board = WardBoard(rules)
+    records = [rec(f"P{i}", 1, 0) for i in range(5)]
+    assert board.update(records) == {f"P{i}" for i in range(5)}
+    assert board.update(records) == set()
+    records[2] = rec("P2", 7, 900)
+    assert board.update(records) == {"P2"}
+    assert rules.rows == [5, 1]
+    assert board.frame.index[0] == "P2" and len(board.frame) == 5
+
+
+def test_removed_records_leave_the_board():
+    board = WardBoard()
+    board.update([rec("P0", 1, 0), rec("P1", 2, 900)])
+    assert board.update([rec("P0", 1, 0)]) == set()
+    assert board.frame.index.tolist() == ["P0"]
+    board.update([])
+    assert len(board.frame) == 0
+
+
+@pytest.mark.parametrize("net, risk", [(500, RISK_NONE), (501, RISK_OVERLOAD), (-200, RISK_NONE), (-201, RISK_DEHYDRATION)])
+def test_thresholds_match_main_page(net, risk):
+    board = WardBoard()
+    board.update([rec("P", 1, net)])
+    assert board.frame.loc["P", "risk"] == risk
@@ -0,0 +1,73 @@
+"""ward_report の分冊の分け方・目次・逐次出力"""
+import io
+import re
+
+import pytest
+
+import ward_report
+from balance_engine import compute_one
+from batch_report import prepare_report_data
+from ward_report import INDEX_NAME, iter_volumes, iter_ward_report, read_index, volume_name, write_ward_report
+
+RECORD = dict(age=70, gender="女性", weight=50.0, temp=36.8, room_temp=24.0, oral=1500, iv=500)
+
+
+def records(n):
+    return [prepare_report_data({**RECORD, "oral": 1000 + i, "patient_id": f"P{i:02d}"}) for i in range(n)]
+
+
+def pdf_pages(pdf):
+    return len(re.findall(rb"/Type /Page\b(?!s)", pdf))
+
+
+@pytest.fixture(autouse=True)
+def small_volumes(monkeypatch):
+    # 1 冊 2 ページ（8 人）・目次 1 ページ 5 行にして分冊の境界を試す
+    monkeypatch.setattr(ward_report, "PAGES_PER_VOLUME", 2)
+    monkeypatch.setattr(ward_report, "INDEX_ROWS_PER_PAGE", 5)
+
+
+def test_volumes_split_by_pages_and_index_points_to_volume_and_page():
+    spool = io.StringIO()
+    volumes = [(v, first, len(chunk)) for v, first, chunk in iter_volumes(records(19), spool)]
+    assert volumes == [(1, 1, 8), (2, 9, 8), (3, 17, 3)]
+
+    index = list(read_index(spool))
+    assert [r["no"] for r in index] == list(range(1, 20))
+    assert [(r["volume"], r["page"]) for r in index[:9]] == [(1, 1)] * 4 + [(1, 2)] * 4 + [(2, 1)]
+    assert index[-1]["patient_id"] == "P18" and (index[-1]["volume"], index[-1]["page"]) == (3, 1)
+    expected = compute_one(**{**RECORD, "oral": 1018})
+    assert index[-1]["net"] == pytest.approx(expected["net"])
+    assert index[-1]["total_in"] == pytest.approx(expected["total_in"])
+
+
+def test_iter_ward_report_yields_volumes_then_index():
+    out = list(iter_ward_report(records(19), "3 階東病棟"))
+    assert [name for name, _ in out] == [volume_name(1), volume_name(2), volume_name(3), INDEX_NAME]
+    assert [pdf_pages(pdf) for _, pdf in out] == [2, 2, 1, 4]
+
+
+def test_records_are_consumed_one_volume_at_a_time():
+    consumed = 0
+
+    def source():
+        nonlocal consumed
+        for data in records(19):
+            consumed += 1
+            yield data
+
+    report = iter_ward_report(source(), "3 階東病棟")
+    next(report)
+    assert consumed == 8
+
+
+def test_write_ward_report_counts_pages(tmp_path):
+    assert write_ward_report(records(19), tmp_path, "3 階東病棟") == 5 + 4
+    assert sorted(p.name for p in tmp_path.iterdir()) == sorted(
+        [volume_name(1), volume_name(2), volume_name(3), INDEX_NAME])
+
+
+def test_empty_ward_still_has_an_index(tmp_path):
+    assert write_ward_report([], tmp_path, "空床") == 1
+    assert [p.name for p in tmp_path.iterdir()] == [INDEX_NAME]
+    assert pdf_pages((tmp_path / INDEX_NAME).read_bytes()) == 1
@@ -0,0 +1,139 @@
+"""推算値の不確かさ（モンテカルロ法によるネットバランス・損失率の信頼区間）
+
+OUT 側の多くは実測ではなく推算である（不感蒸泄・便中水分・尿量 = 回数 × 平均量）。
+推算に使う係数と平均尿量を、入力値を最頻値とする三角分布から多数回サンプリングし、
+ネットバランスと損失率の分布から区間を求める。経口・輸液・輸血・出血は実測値として固定する
+（時間記録モードで尿量を実測した場合は尿量も固定する）。
+乱数の種を渡さなければ入力値から決めるため、同じ入力なら再実行しても同じ区間になる。
+全サンプルを (患者数, サンプル数) の配列で balance_engine.compute_balance に渡すため、
+患者ごと・サンプルごとのループはない。病棟全体では患者をまとめて一括で評価する。
+"""
+import hashlib
+import json
+
+import numpy as np
+
+from balance_engine import (
+    DEHYDRATION_THRESHOLD, FEVER_COEF, INPUT_COLUMNS, INPUT_DEFAULTS, INSENSIBLE_BASE, LOSS_CAUTION,
+    OVERLOAD_THRESHOLD, REQUIRED_COLUMNS, ROOM_COEF, compute_balance, stool_factor,
+)
+
+DEFAULT_SAMPLES = 20_000
+WARD_SAMPLES = 5_000                   # 病棟一覧では患者数が多いため少なめにする
+DEFAULT_LEVEL = 0.90
+# 1 回の一括計算で扱う要素数の上限（患者数 × サンプル数）。メモリ使用量を抑える
+MAX_CELLS_PER_BATCH = 2_000_000
+
+# 推算値のばらつき：(下限, 上限) の絶対値、または最頻値に対する相対幅
+COEF_RANGES = {
+    "insensible_base": (10.0, 20.0),   # mL/kg/day
+    "fever_coef": (0.10, 0.20),        # /℃
+    "room_coef": (0.10, 0.25),         # /℃
+    "meta_coef": (0.12, 0.15),         # mL/kcal
+}
+STOOL_COEF_SPREAD = 0.10               # 便中水分率 ±0.10（0.5〜1.0 の範囲内）
+URINE_VOLUME_SPREAD = 0.30             # 1 回尿量 ±30%
+
+
+def _triangular(rng, low, mode, high, shape):
+    # 最頻値が範囲外の場合は範囲を広げる（入力値そのものは必ず取りうる値にする）
+    low, high = np.minimum(low, mode), np.maximum(high, mode)
+    width = np.where(high > low, high - low, 1.0)
+    u = rng.random(shape)
+    c = (mode - low) / width
+    left = low + np.sqrt(u * width * (mode - low))
+    right = high - np.sqrt((1 - u) * width * (high - mode))
+    return np.where(u < c, left, right)
+
+
+def _columns(records):
+    cols = {c: np.asarray([r[c] for r in records]) for c in REQUIRED_COLUMNS}
+    for c, default in INPUT_DEFAULTS.items():
+        # 未入力（None・DataFrame 経由の NaN）は既定値で補う
+        values = (r.get(c) for r in records)
+        cols[c] = np.asarray([default if v is None or v != v else v for v in values])
+    return cols
+
+
+def input_seed(records):
+    """入力値から決まる乱数の種（同じ入力なら同じサンプルになる）。"""
+    values = [[r.get(c) for c in INPUT_COLUMNS] for r in records]
+    digest = hashlib.sha256(json.dumps(values, ensure_ascii=False, default=str).encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "little")
+
+
+def sample_batch(cols, samples, rng, urine_measured=False):
+    """入力列（長さ p の配列の dict）から (p, samples) のネットバランスと損失率を返す。
+
+    urine_measured が真なら urine_volume は実測の合計として固定する（ばらつかせない）。
+    患者ごとに違う場合は長さ p の真偽値の配列を渡す。
+    """
+    p = len(cols["weight"])
+    shape = (p, samples)
+    inputs = {c: v[:, None] for c, v in cols.items()}
+
+    # 患者によらない係数は 1 組のサンプルを全患者で共有する（各患者の分布は変わらない）
+    modes = {"insensible_base": INSENSIBLE_BASE, "fever_coef": FEVER_COEF, "room_coef": ROOM_COEF}
+    coefs = {name: _triangular(rng, COEF_RANGES[name][0], mode, COEF_RANGES[name][1], (1, samples))
+             for name, mode in modes.items()}
+    meta = inputs["meta_coef"].astype(np.float64)
+    inputs["meta_coef"] = _triangular(rng, COEF_RANGES["meta_coef"][0], meta, COEF_RANGES["meta_coef"][1], shape)
+    factor = stool_factor(inputs["stool_type"])
+    coefs["stool_coef"] = _triangular(
+        rng, np.maximum(factor - STOOL_COEF_SPREAD, 0.5), factor, np.minimum(factor + STOOL_COEF_SPREAD, 1.0), shape,
+    )
+    measured = np.broadcast_to(np.asarray(urine_measured, dtype=bool), (p,))
+    if not measured.all():
+        volume = inputs["urine_volume"].astype(np.float64)
+        sampled = _triangular(
+            rng, volume * (1 - URINE_VOLUME_SPREAD), volume, volume * (1 + URINE_VOLUME_SPREAD), shape,
+        )
+        inputs["urine_volume"] = np.where(measured[:, None], volume, sampled)
+
+    result = compute_balance(**inputs, **coefs)
+    return result["net"], result["loss_rate"]
+
+
+def summarize(net, rate, level=DEFAULT_LEVEL):
+    """サンプル（最後の軸）から区間と判定の確率を求める。各値は患者数の長さの配列。"""
+    lo, hi = (1 - level) / 2, 1 - (1 - level) / 2
+    net_q = np.quantile(net, [lo, 0.5, hi], axis=-1)
+    rate_q = np.quantile(rate, [lo, 0.5, hi], axis=-1)
+    return {
+        "net_low": net_q[0], "net_median": net_q[1], "net_high": net_q[2],
+        "loss_rate_low": rate_q[0], "loss_rate_median": rate_q[1], "loss_rate_high": rate_q[2],
+        "p_dehydration": np.mean(net < DEHYDRATION_THRESHOLD, axis=-1),
+        "p_overload": np.mean(net > OVERLOAD_THRESHOLD, axis=-1),
+        "p_loss_caution": np.mean(rate >= LOSS_CAUTION, axis=-1),
+    }
+
+
+def simulate(inputs, samples=DEFAULT_SAMPLES, level=DEFAULT_LEVEL, seed=None, urine_measured=False):
+    """1 患者分：(区間の dict（スカラー値）, ネットバランスのサンプル) を返す。
+
+    seed を省略すると input_seed(inputs) を使う。
+    """
+    rng = np.random.default_rng(input_seed([inputs]) if seed is None else seed)
+    net, rate = sample_batch(_columns([inputs]), samples, rng, urine_measured)
+    return {k: v.item() for k, v in summarize(net, rate, level).items()}, net[0]
+
+
+def simulate_ward(records, samples=WARD_SAMPLES, level=DEFAULT_LEVEL, seed=None):
+    """病棟全体：records の順に区間の dict（各値は配列）を返す。
+
+    尿量は保存した記録の urine_measured（時間記録モードで実測）が 1 の患者だけ固定する。
+    患者は MAX_CELLS_PER_BATCH を超えない人数ずつまとめて評価する。
+    seed を省略すると input_seed(records) を使う。
+    """
+    rng = np.random.default_rng(input_seed(records) if seed is None else seed)
+    per_batch = max(1, MAX_CELLS_PER_BATCH // samples)
+    parts = []
+    for start in range(0, len(records), per_batch):
+        batch = records[start:start + per_batch]
+        # 以前の版で保存した記録（列なし・NULL・DataFrame 経由の NaN）は推算として扱う
+        measured = np.asarray([r.get("urine_measured") == 1 for r in batch])
+        net, rate = sample_batch(_columns(batch), samples, rng, measured)
+        parts.append(summarize(net, rate, level))
+    if not parts:
+        return {}
+    return {k: np.concatenate([p[k] for p in parts]) for k in parts[0]}
@@ -0,0 +1,261 @@
+"""時刻付き尿量の逐次監視（無尿・少尿・多尿の検出）
+
+病院全体の尿量記録を時刻順のストリームとして受け取り、患者ごとに移動窓
+（6h・12h・24h）の尿量を体重あたりの日量（mL/kg/day）に換算して、
+urine_dialog と同じ目安（10 / 40 mL/kg/day）をまたいだ時点で通知を返す。
+観察を始めてから窓の長さのあいだ尿量が 0 なら、少尿と分けて無尿とする。
+
+窓の扱いは balance_aggregate と同じで、窓から外れた記録を先頭から取り除くだけ。
+記録がないまま尿量が減って閾値を下回る場合（無尿を含む）は、窓の先頭の記録が
+外れる時刻を患者ごとに 1 つだけヒープに積んでおき、advance() でその時刻に
+再評価する。1 件あたりのコストは窓の数に比例する定数（ヒープ操作は患者数の対数）。
+
+使い方:
+    monitor = UrineMonitor()
+    monitor.admit("P001", weight=60.0, ts=start)
+    for alert in monitor.process(stream):   # (patient_id, ts, volume) の時刻順の列
+        ...
+"""
+import argparse
+import csv
+import datetime
+import heapq
+import json
+import sys
+from collections import deque
+
+from balance_aggregate import DAY, HOUR, _seconds
+from balance_engine import URINE_OLIGURIA_RATE, URINE_POLYURIA_RATE
+
+DEFAULT_WINDOWS = {"6h": 6 * HOUR, "12h": 12 * HOUR, "24h": DAY}
+
+STATE_NORMAL = "正常"
+STATE_OLIGURIA = "少尿"
+STATE_POLYURIA = "多尿"
+STATE_ANURIA = "無尿"     # 観察時間が窓に達して、窓内の尿量が 0
+
+
+class _UrineWindow:
+    # 1 つの移動窓：窓内の尿量記録と合計、直近の判定
+    __slots__ = ("span", "entries", "total", "state")
+
+    def __init__(self, span):
+        self.span = span
+        self.entries = deque()
+        self.total = 0.0
+        self.state = None   # 観察時間が窓に満たず判定できないうちは None
+
+    def expire(self, t):
+        # 窓は (t - span, t] の範囲
+        while self.entries and self.entries[0][0] <= t - self.span:
+            self.total -= self.entries.popleft()[1]
+        if not self.entries:
+            self.total = 0.0    # 浮動小数の誤差を持ち越さない
+
+
+class _Patient:
+    __slots__ = ("weight", "start", "last_time", "due", "windows")
+
+    def __init__(self, weight, start, windows):
+        self.weight = weight
+        self.start = start
+        self.last_time = start
+        self.due = None     # 次に再評価する時刻（ヒープに積んだ時刻）
+        self.windows = {name: _UrineWindow(span) for name, span in windows.items()}
+
+
+class UrineMonitor:
+    """全患者の尿量を移動窓で監視する。
+
+    通知は {"patient_id", "window", "time", "state", "previous", "rate"} の dict で、
+    判定（STATE_*）が変わったときだけ返す。rate は窓内の尿量を体重と窓の長さで
+    割った mL/kg/day。観察時間が窓の長さに満たないうちは無尿・少尿を判定しない
+    （多尿は窓内の合計だけで閾値を超えるため、満たなくても判定する）。
+    """
+
+    def __init__(self, windows=None, oliguria=URINE_OLIGURIA_RATE, polyuria=URINE_POLYURIA_RATE):
+        self.windows = dict(windows or DEFAULT_WINDOWS)
+        self.oliguria = oliguria
+        self.polyuria = polyuria
+        self._patients = {}
+        self._heap = []     # (再評価の時刻, patient_id)
+
+    def __len__(self):
+        return len(self._patients)
+
+    def __contains__(self, patient_id):
+        return patient_id in self._patients
+
+    # ================================
+    # 患者の登録
+    # ================================
+    def admit(self, patient_id, weight, ts):
+        """監視を始める。ts から窓の長さだけ記録がなければ無尿になる。"""
+        if not weight or weight <= 0:
+            raise ValueError(f"体重が不正です（患者ID {patient_id}）。")
+        p = _Patient(float(weight), _seconds(ts), self.windows)
+        self._patients[patient_id] = p
+        self._schedule(patient_id, p)
+        return p
+
+    def set_weight(self, patient_id, weight):
+        if not weight or weight <= 0:
+            raise ValueError(f"体重が不正です（患者ID {patient_id}）。")
+        self._patients[patient_id].weight = float(weight)
+
+    def discharge(self, patient_id):
+        # ヒープに残った時刻は advance() で読み飛ばされる
+        self._patients.pop(patient_id, None)
+
+    # ================================
+    # 逐次更新
+    # ================================
+    def add(self, patient_id, ts, volume, weight=None):
+        """尿量の記録を 1 件追加し、この患者の新しい通知のリストを返す。
+
+        未登録の患者は、weight を渡せばこの記録の時刻から監視を始める。
+        """
+        t = _seconds(ts)
+        p = self._patients.get(patient_id)
+        if p is None:
+            if weight is None:
+                raise ValueError(f"体重が未設定です（患者ID {patient_id}）。")
+            p = self.admit(patient_id, weight, t)
+        elif weight is not None:
+            self.set_weight(patient_id, weight)
+        if t < p.last_time:
+            raise ValueError("記録は時刻順に追加してください。")
+        p.last_time = t
+        for w in p.windows.values():
+            w.entries.append((t, float(volume)))
+            w.total += volume
+        alerts = self._evaluate(patient_id, p, t)
+        self._schedule(patient_id, p)
+        return alerts
+
+    def advance(self, now):
+        """now までに窓から記録が外れた患者を再評価し、新しい通知のリストを返す。"""
+        now = _seconds(now)
+        alerts = []
+        while self._heap and self._heap[0][0] <= now:
+            due, patient_id = heapq.heappop(self._heap)
+            p = self._patients.get(patient_id)
+            if p is None or p.due != due:
+                continue    # 退院済み、または積み直した古い時刻
+            p.due = None
+            if due >= p.last_time:
+                p.last_time = due
+                alerts += self._evaluate(patient_id, p, due)
+            self._schedule(patient_id, p)
+        return alerts
+
+    def process(self, stream):
+        """(patient_id, ts, volume[, weight]) の時刻順の列から通知を順に返す。"""
+        for patient_id, ts, volume, *weight in stream:
+            yield from self.advance(ts)
+            yield from self.add(patient_id, ts, volume, weight[0] if weight else None)
+
+    # ================================
+    # 判定
+    # ================================
+    def _rate(self, p, w):
+        return w.total / p.weight * (DAY / w.span)
+
+    def _evaluate(self, patient_id, p, t):
+        alerts = []
+        for name, w in p.windows.items():
+            w.expire(t)
+            rate = self._rate(p, w)
+            if rate > self.polyuria:
+                state = STATE_POLYURIA
+            elif t - p.start < w.span:
+                continue
+            elif not w.entries or w.total <= 0:
+                state = STATE_ANURIA
+            elif rate < self.oliguria:
+                state = STATE_OLIGURIA
+            else:
+                state = STATE_NORMAL
+            previous, w.state = w.state, state
+            # 判定開始時の正常と、同じ判定が続く場合は通知しない
+            if state == previous or (previous is None and state == STATE_NORMAL):
+                continue
+            alerts.append({
+                "patient_id": patient_id, "window": name, "time": t,
+                "state": state, "previous": previous, "rate": rate,
+            })
+        return alerts
+
+    def _schedule(self, patient_id, p):
+        # 記録がなくても判定が変わりうる最も早い時刻：窓の先頭が外れる時刻か、観察時間が窓に達する時刻
+        due = None
+        for w in p.windows.values():
+            for candidate in (w.entries[0][0] + w.span if w.entries else None,
+                              p.start + w.span if w.state is None else None):
+                if candidate is not None and candidate > p.last_time and (due is None or candidate < due):
+                    due = candidate
+        # 先に積んだ時刻のほうが早ければ、そのときに積み直す
+        if due is not None and (p.due is None or due < p.due or p.due <= p.last_time):
+            p.due = due
+            heapq.heappush(self._heap, (due, patient_id))
+
+    def status(self, patient_id):
+        """窓ごとの (尿量合計 mL, mL/kg/day, 判定) を返す。判定前の窓は判定が None。"""
+        p = self._patients[patient_id]
+        return {name: (w.total, self._rate(p, w), w.state) for name, w in p.windows.items()}
+
+
+def replay(times, volumes, weight, until, start=None):
+    """1 患者分の記録（順不同）を時刻順に流し、until 時点の (status(), 通知のリスト) を返す。
+
+    start（入院・観察開始の時刻。他の区分の最初の記録など）と最初の尿量の記録の
+    早いほうから監視を始めるため、start から窓の長さだけ尿量の記録がなければ
+    無尿と判定する。start も尿量の記録もなければ (None, [])。
+    until より後の記録は使わない。
+    """
+    until = _seconds(until)
+    entries = sorted((_seconds(t), v) for t, v in zip(times, volumes) if _seconds(t) <= until)
+    starts = [entries[0][0]] if entries else []
+    if start is not None and _seconds(start) <= until:
+        starts.append(_seconds(start))
+    if not starts:
+        return None, []
+    monitor = UrineMonitor()
+    monitor.admit("", weight, min(starts))
+    alerts = list(monitor.process(("", t, v) for t, v in entries))
+    alerts += monitor.advance(until)
+    return monitor.status(""), alerts
+
+
+def _read_feed(f):
+    # 列: patient_id, time（ISO 形式または UNIX 秒）, volume[, weight]
+    for row in csv.DictReader(f):
+        ts, weight = row["time"], row.get("weight")
+        if ts.replace(".", "", 1).isdigit():
+            ts = float(ts)
+        yield row["patient_id"], ts, float(row["volume"]), float(weight) if weight else None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="時刻付き尿量の記録から無尿・少尿・多尿の通知を出力します。")
+    parser.add_argument("input", nargs="?", default="-", help="入力 CSV（patient_id,time,volume[,weight]、既定は標準入力）")
+    parser.add_argument("--weight", type=float, help="weight 列がない患者に使う体重（kg）")
+    args = parser.parse_args(argv)
+
+    f = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8", newline="")
+    monitor = UrineMonitor()
+    try:
+        stream = ((pid, ts, vol, weight or args.weight) for pid, ts, vol, weight in _read_feed(f))
+        for alert in monitor.process(stream):
+            alert["time"] = datetime.datetime.fromtimestamp(alert["time"]).isoformat()
+            print(json.dumps(alert, ensure_ascii=False), flush=True)
+    except ValueError as e:
+        parser.exit(2, f"エラー: {e}\n")
+    finally:
+        if f is not sys.stdin:
+            f.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,5 @@
+"""メイン計算以外のページ（推算根拠・使い方・引用文献・感度分析）
+
+メイン計算ページだけを使うセッションが多いため、各ページは最初に開かれたときに
+import し、起動直後の初回描画では読み込まない。各モジュールは render() を持つ。
+"""
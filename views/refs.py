@@ -0,0 +1,58 @@
+"""引用・参考文献ページ"""
+import streamlit as st
+
+
+def render():
+    st.title("📚 引用・参考文献")
+
+    st.info(
+        "本システムの計算式および判定基準は、以下の公的機関・学会等の資料に基づき作成されています。"
+    )
+
+    # 1. 公的ガイドライン・基準
+    st.markdown(
+        '<h4 class="report-header">1. 公的ガイドライン・基準</h4>',
+        unsafe_allow_html=True
+    )
+
+
+    st.markdown("""
+- **[厚生労働省：日本人の食事摂取基準（2025年版）](https://www.mhlw.go.jp)**  
+  *水分の必要量や代謝水の生成根拠となる栄養素の酸化プロセスに関する標準的な数値が記載されています。*
+
+- **[環境省：熱中症環境保健マニュアル](https://www.wbgt.env.go.jp)**  
+  *室温・外気温上昇に伴う不感蒸泄および発汗量の増加に関する知見がまとめられています。*
+    """)
+
+    # 2. 臨床医学的エビデンス
+    st.markdown(
+        '<h4 class="report-header">2. 臨床医学的エビデンス</h4>',
+        unsafe_allow_html=True
+    )
+
+
+    st.markdown("""
+- **[MSDマニュアル プロフェッショナル版：水分平衡](https://www.msdmanuals.com)**  
+  *世界共通の臨床基準として、不感蒸泄（10〜15mL/kg/day）や、体温上昇に伴う損失増（1℃につき10〜15%）の根拠となります。*
+
+- **[一般社団法人 日本臨床栄養代謝学会（JSPEN）：ガイドライン](https://www.jspen.or.jp)**  
+  *臨床現場における水・電解質管理の最新の国内ガイドラインを確認できます。*
+    """)
+
+    # 3. 文献検索（最新知見）
+    st.markdown(
+        '<h4 class="report-header">3. 文献検索（最新知見）</h4>',
+        unsafe_allow_html=True
+    )
+
+
+    st.markdown("""
+- **[CiNii Research（日本の論文検索：水分出納）](https://cinii.clear.ndl.go.jp)**  
+  *本システムで採用している各係数（15mL/kg/day 等）の妥当性を検証した最新の論文を検索可能です。*
+    """)
+
+    st.warning("""
+**臨床現場での利用にあたって**  
+2026年現在の医学的知見に基づき構成されていますが、臨床的な最終判断は  
+患者個別の身体所見（血圧、浮腫、血清Na値等）に基づき、医師が行ってください。
+""")
@@ -0,0 +1,92 @@
+"""感度分析ページ（推算係数・体温・室温を振ったときのネットバランス）"""
+import altair as alt
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from balance_engine import DEHYDRATION_THRESHOLD, OVERLOAD_THRESHOLD
+from sensitivity import PARAMETERS, base_params, full_grid_summary, surface, tornado
+
+
+def _sliders(defaults):
+    params = {}
+    cols = st.columns(4)
+    for i, (name, (label, low, high, step)) in enumerate(PARAMETERS.items()):
+        value = min(max(float(defaults[name]), low), high)
+        params[name] = cols[i % 4].slider(label, low, high, value, step, key=f"sens_{name}")
+    return params
+
+
+def _tornado_chart(base, rows):
+    data = pd.DataFrame([
+        {"項目": r["label"], "端": end, "値": value, "バランス": r[f"net_{end}"], "基準": base}
+        for r in rows for end, value in (("low", r["low"]), ("high", r["high"]))
+    ])
+    data["端"] = data["端"].map({"low": "下限", "high": "上限"})
+    order = [r["label"] for r in rows]
+    bars = alt.Chart(data).mark_bar().encode(
+        y=alt.Y("項目:N", sort=order, title=None),
+        x=alt.X("バランス:Q", title="ネットバランス (mL/day)"),
+        x2="基準:Q",
+        color=alt.Color("端:N", scale=alt.Scale(domain=["下限", "上限"], range=["#6ea8fe", "#e5533d"])),
+        tooltip=["項目", "端", alt.Tooltip("値:Q", format=".3g"), alt.Tooltip("バランス:Q", format="+.0f")],
+    )
+    rule = alt.Chart(pd.DataFrame({"基準": [base]})).mark_rule(color="gray").encode(x="基準:Q")
+    return (bars + rule).properties(height=40 * len(rows))
+
+
+def _surface_chart(x, y, xs, ys, values, title, scheme):
+    gx, gy = np.meshgrid(xs.round(4), ys.round(4))
+    grid = pd.DataFrame({PARAMETERS[x][0]: gx.ravel(), PARAMETERS[y][0]: gy.ravel(), title: values.ravel()})
+    return alt.Chart(grid).mark_rect().encode(
+        x=alt.X(f"{PARAMETERS[x][0]}:O", axis=alt.Axis(labelOverlap=True, format=".3g")),
+        y=alt.Y(f"{PARAMETERS[y][0]}:O", sort="descending", axis=alt.Axis(labelOverlap=True, format=".3g")),
+        color=alt.Color(f"{title}:Q", scale=scheme),
+        tooltip=[PARAMETERS[x][0], PARAMETERS[y][0], alt.Tooltip(f"{title}:Q", format=".1f")],
+    ).properties(height=380)
+
+
+def render(inputs):
+    st.title("🔬 感度分析（推算係数の what-if）")
+    if not inputs:
+        st.info("メイン計算ページで患者の値を入力すると、その条件で感度分析を行います。")
+        return
+    st.caption(
+        "メイン計算ページの入力値を基準に、推算係数・体温・室温を振ったときのネットバランスを"
+        "一括計算で評価します。スライダーを動かすと表示がすぐに更新されます。"
+    )
+
+    @st.fragment
+    def explorer():
+        params = _sliders(base_params(inputs))
+
+        base, rows = tornado(inputs, params)
+        st.markdown(f"##### 各項目を下限・上限に振ったときのバランス（現在値 {base:+.0f} mL/day）")
+        st.altair_chart(_tornado_chart(base, rows), use_container_width=True)
+
+        st.markdown("##### 2 項目の組み合わせ")
+        names = list(PARAMETERS)
+        c1, c2, c3 = st.columns(3)
+        x = c1.selectbox("横軸", names, index=names.index("temp"), format_func=lambda n: PARAMETERS[n][0], key="sens_x")
+        y = c2.selectbox("縦軸", [n for n in names if n != x], format_func=lambda n: PARAMETERS[n][0], key="sens_y")
+        metric = c3.radio("表示", ["ネットバランス", "損失率"], horizontal=True, key="sens_metric")
+        xs, ys, net, rate = surface(inputs, params, x, y)
+        if metric == "ネットバランス":
+            scheme = alt.Scale(scheme="redblue", domainMid=0)
+            chart = _surface_chart(x, y, xs, ys, net, "バランス (mL/day)", scheme)
+        else:
+            chart = _surface_chart(x, y, xs, ys, rate, "損失率 (%)", alt.Scale(scheme="orangered"))
+        st.altair_chart(chart, use_container_width=True)
+        st.caption(
+            f"判定の境界：{OVERLOAD_THRESHOLD:+d} mL を超えると体液過剰、{DEHYDRATION_THRESHOLD:+d} mL 未満で脱水リスク"
+        )
+
+    explorer()
+
+    summary = full_grid_summary(inputs)
+    st.markdown(f"##### 全項目の組み合わせ（{summary['cells']:,} 通り）")
+    m1, m2, m3, m4 = st.columns(4)
+    m1.metric("バランスの範囲", f"{summary['net_min']:+.0f} 〜 {summary['net_max']:+.0f} mL")
+    m2.metric("中央値", f"{summary['net_median']:+.0f} mL")
+    m3.metric("脱水リスク判定の割合", f"{summary['dehydration_share']:.0%}")
+    m4.metric("体液過剰判定の割合", f"{summary['overload_share']:.0%}")
@@ -0,0 +1,87 @@
+"""推算根拠ページ（推算式と判定基準）"""
+import streamlit as st
+
+from app_content import JUDGMENT_TABLE
+
+
+def render():
+    st.title("📖 水分出納の推算根拠と判定基準")
+
+    st.info(
+        "本プログラムで使用している各種推算式は以下の通りです。"
+        "これらは臨床現場で一般的に用いられる指標に基づいています。"
+    )
+
+    # 1. 入出量合計の算出式
+    st.markdown(
+        '<h4 class="report-header">1. 入出量合計の算出式</h4>',
+        unsafe_allow_html=True
+    )
+
+    st.write("**■ 総 Intake (総流入量)**")
+    st.latex(r"\text{総IN} = \text{経口摂取(経管)} + \text{静脈輸液} + \text{輸血製剤} + \text{代謝水}")
+
+    st.write("**■ 総 Output (総流出量)**")
+    st.latex(r"\text{総OUT} = \text{尿量} + \text{出血・ドレーン等} + \text{便中水分} + \text{不感蒸泄}")
+
+    st.write("**■ ネットバランス (Net Balance)**")
+    st.latex(r"\text{バランス} = \text{総IN} - \text{総OUT}")
+
+    # 2. 各項目の推算根拠
+    st.markdown(
+        '<h4 class="report-header">2. 各項目の推算根拠</h4>',
+        unsafe_allow_html=True
+    )
+
+    st.markdown("##### ① 代謝水 (Metabolic Water)")
+    st.write("栄養素が体内で燃焼（酸化）される際に生成される水分です。")
+    st.latex(r"\text{算出式: } \text{摂取エネルギー(kcal)} \times 0.12 \sim 0.15")
+    st.caption(
+        "根拠: 一般的に摂取エネルギー 1kcal あたり 0.12mL 〜 0.15mL の代謝水が生成されると推定されています。"
+    )
+
+    st.markdown("##### ② 不感蒸泄 (Insensible Water Loss)")
+    st.write(
+        "呼気や皮膚から自覚なしに失われる水分です。"
+        "体温や周囲の温度によって変動します。"
+    )
+    st.latex(r"\text{基本式: } 15\,\text{mL} \times \text{体重(kg)}")
+
+    st.write("**・発熱補正:** 体温が37℃を超える場合、1℃上昇につき15%増加させます。")
+    st.latex(r"\text{補正係数} = 1.0 + 0.15 \times (\text{体温} - 37)")
+
+    st.write("**・室温補正:** 室温が30℃を超える場合、1℃上昇につき17.5%増加させます。")
+    st.latex(r"\text{補正係数} = 1.0 + 0.175 \times (\text{室温} - 30)")
+
+    st.markdown("##### ③ 便中水分")
+    st.write("便の性状（水分含有率）に基づき、重量から水分量を推定します。")
+    st.write("- **普通便:** $重量(g) \\times 0.75$")
+    st.write("- **軟便:** $重量(g) \\times 0.85$")
+    st.write("- **下痢:** $重量(g) \\times 0.95$")
+
+    st.markdown("##### ④ 推定体水分率 (Total Body Water %)")
+    st.write("加齢に伴う細胞内液の減少を考慮した推算式です。")
+    st.write("- **乳児(0-1歳):** 80%から月齢に応じて減少")
+    st.write("- **幼児・学童(1-13歳):** 70%から年齢に応じて減少")
+    st.write("- **成人(14-65歳):** 60%から年齢に応じて減少")
+    st.write("- **高齢者(65歳以上):** 一律 50%")
+
+    # 3. 判定基準
+    st.markdown(
+        '<h4 class="report-header">3. 2026年現在の臨床的判定基準</h4>',
+        unsafe_allow_html=True
+    )
+
+
+    st.write(
+        "本システムでは、24時間あたりのネットバランスに基づき以下の判定を行っています。"
+    )
+
+    st.table(JUDGMENT_TABLE)
+
+    st.warning("""
+**※これらの数値はあくまで目安です。**  
+2026年1月9日現在の臨床ガイドラインに則り、実際の診断には
+血清ナトリウム値、心エコー、皮膚緊張度（ツルゴール）等の
+身体所見を併せて評価する必要があります。
+""")
@@ -0,0 +1,64 @@
+"""使い方ページ（水分出納の考え方と利用シーン）"""
+import streamlit as st
+
+from app_content import USAGE_TABLE
+
+
+def render():
+    st.title("🧭 使い方（シーン別）")
+    st.info("本アプリは医療・看護・生活・学校など、複数の現場で共通に利用できる水分出納整理ツールです。")
+
+    st.subheader("① 水分出納とは その重要性")
+    st.write("""
+    **水分出納（Water Balance）**とは、体に入ってくる水分（IN）と体から出ていく水分（OUT）のバランスのことです。
+    私たちの体は成人で約60%が水分で構成されており、このバランスが崩れると生命維持に支障をきたします。
+
+    - **脱水（IN < OUT）**: 循環不全、腎機能低下、意識障害などのリスク
+    - **体液過剰（IN > OUT）**: 浮腫（むくみ）、心不全、呼吸困難などのリスク
+
+    このバランスを日々把握し、適切に管理・補正することが健康維持の第一歩です。
+    """)
+
+    st.subheader("② IN（摂取・流入）の項目")
+    st.markdown("""
+    水分出納において、体内に水分が入ってくるルートは主に以下の通りです。
+
+    - **経口摂取水 (Oral Intake)**  
+      飲み物や食事に含まれる水分です。食事にも多くの水分が含まれているため、これらも重要な水分源となります。
+
+    - **代謝水 (Metabolic Water)**  
+      体内で栄養素（糖質・脂質・タンパク質）がエネルギーとして燃焼される際に化学反応で生成される水分です。
+      飲まなくても体内で自然に作られる「見えない水分」です。
+
+    - **静脈輸液 (Intravenous Fluids)**  
+      点滴によって血管内に直接水分や電解質、薬剤を投与することです。医療現場で最も確実な水分補給手段です。
+
+    - **輸血 (Transfusion)**  
+      血液製剤の投与です。これも水分量としてカウントされますが、循環血液量の増加という点で輸液とは異なる慎重な管理が必要です。
+    """)
+
+    st.subheader("③ OUT（排出・喪失）の項目")
+    st.markdown("""
+    体から水分が出ていくルートは、生理的なものと病的なものに分けられます。
+
+    - **排尿 (Urine Output)**  
+      腎臓で血液が濾過され、不要な老廃物とともに水分が排出される生理現象です。
+      体内の水分量調節・電解質バランスの維持に最も重要な役割を果たします。
+
+    - **便中水分 (Stool Water)**  
+      便として排出される水分です。通常は少量ですが、下痢の場合は大量の水分喪失となり得ます。
+
+    - **出血・ドレーン排液 (Bleeding / Drainage)**  
+      手術や怪我による出血、または体内に溜まった液体を管（ドレーン）で外に出す場合の水分です。
+      これらは「異常な喪失」として、INを増やして補う必要があります。
+
+    - **不感蒸泄 (Insensible Water Loss)**  
+      発汗とは別に、皮膚や呼気から自然に蒸発して失われる水分です。発熱時などは増加します。
+    """)
+
+    st.divider()
+
+
+
+    st.subheader("📋 利用シーン別一覧")
+    st.table(USAGE_TABLE)
@@ -0,0 +1,72 @@
+"""病棟一覧（全ベッドの一括評価とリスク順の並べ替え）
+
+balance_store の病棟 1 日分のレコードを受け取り、前回から更新された（rev が
+変わった）患者だけに警告ルール（balance_rules）を当てて、リスクの高い順に並べた
+表を返す。IN/OUT・バランスなどは保存時に計算済みの値をそのまま使う。
+ルールを渡さなければ DEFAULT_RULES を使う。
+"""
+import numpy as np
+import pandas as pd
+
+from balance_engine import DEHYDRATION_THRESHOLD, LOSS_CAUTION, LOSS_DANGER, OVERLOAD_THRESHOLD
+from balance_rules import compile_rules
+
+RISK_DANGER, RISK_CAUTION, RISK_OVERLOAD, RISK_DEHYDRATION, RISK_NONE = 4, 3, 2, 1, 0
+RISK_LABELS = {
+    RISK_DANGER: "🔴 危険（損失率≥3%）",
+    RISK_CAUTION: "🟠 注意（損失率≥2%）",
+    RISK_OVERLOAD: "🟣 体液過剰",
+    RISK_DEHYDRATION: "🟡 脱水リスク",
+    RISK_NONE: "🟢 維持範囲",
+}
+
+# 損失率の警告を最優先し、次にネットバランスの判定で順位を付ける（メイン計算ページの判定と同じ閾値）。
+# 病棟・年齢層ごとの閾値は同じ name のルールに scope を付けて足す（balance_rules を参照）
+DEFAULT_RULES = [
+    {"name": "loss_danger", "label": RISK_LABELS[RISK_DANGER], "level": RISK_DANGER,
+     "all": [["loss_rate", ">=", LOSS_DANGER]]},
+    {"name": "loss_caution", "label": RISK_LABELS[RISK_CAUTION], "level": RISK_CAUTION,
+     "all": [["loss_rate", ">=", LOSS_CAUTION]]},
+    {"name": "overload", "label": RISK_LABELS[RISK_OVERLOAD], "level": RISK_OVERLOAD,
+     "all": [["net", ">", OVERLOAD_THRESHOLD]]},
+    {"name": "dehydration", "label": RISK_LABELS[RISK_DEHYDRATION], "level": RISK_DEHYDRATION,
+     "all": [["net", "<", DEHYDRATION_THRESHOLD]]},
+]
+
+
+class WardBoard:
+    """1 病棟 1 日分の評価結果を保持し、更新分だけを再計算する。"""
+
+    def __init__(self, rules=None):
+        self.rules = rules if rules is not None else compile_rules(DEFAULT_RULES)
+        self._frame = pd.DataFrame()
+        self._revs = {}  # patient_id -> rev（保存のたびに振り直される更新番号）
+
+    def update(self, records):
+        """最新のレコード一覧を反映し、更新された患者 ID の集合を返す。"""
+        current = {r["patient_id"]: r for r in records}
+        changed = [r for pid, r in current.items() if self._revs.get(pid) != r["rev"]]
+        removed = set(self._revs) - set(current)
+
+        frame = self._frame
+        if removed or changed:
+            drop = removed | {r["patient_id"] for r in changed}
+            frame = frame[~frame.index.isin(drop)] if len(frame) else frame
+        if changed:
+            batch = pd.DataFrame(changed).set_index("patient_id")
+            alerts = self.rules.evaluate(batch)
+            batch["risk"] = alerts["level"]
+            batch["alert"] = np.where(alerts["level"] > RISK_NONE, alerts["label"], RISK_LABELS[RISK_NONE])
+            frame = pd.concat([frame, batch]) if len(frame) else batch
+
+        if len(frame):
+            # リスク → 損失率 → バランスの絶対値 の降順
+            order = np.lexsort((-frame["net"].abs().to_numpy(), -frame["loss_rate"].to_numpy(), -frame["risk"].to_numpy()))
+            frame = frame.iloc[order]
+        self._frame = frame
+        self._revs = {pid: r["rev"] for pid, r in current.items()}
+        return {r["patient_id"] for r in changed}
+
+    @property
+    def frame(self):
+        return self._frame
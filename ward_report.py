@@ -0,0 +1,213 @@
+"""病棟報告書（複数患者を 1 ページにまとめ、分冊で逐次出力する）
+
+ReportLab の canvas は save() まで全ページを保持するため、患者数に比例して
+メモリが増えないよう、PAGES_PER_VOLUME ページごとに 1 冊（1 つの PDF）として
+描画しては書き出す。各患者の内訳は medical_report の IN/OUT 表をそのまま使う。
+目次（全患者の一覧と掲載分冊・ページ）は患者ページの描画中に一時ファイルへ
+書き溜め、最後に別冊として描画する。
+
+使い方:
+    for name, pdf in iter_ward_report(records, "3 階東病棟 2026/01/09"):
+        ...  # ファイルや HTTP レスポンスに順に書き出す
+"""
+import itertools
+import json
+import tempfile
+from io import BytesIO
+from pathlib import Path
+
+from balance_engine import LOSS_CAUTION, LOSS_DANGER
+from medical_report import A4, FONT_NAME, build_io_table, io_totals, mm, setup_pdf
+
+PATIENTS_PER_PAGE = 4
+PAGES_PER_VOLUME = 50
+INDEX_ROWS_PER_PAGE = 40
+
+INDEX_NAME = "ward_00_index.pdf"
+
+
+def volume_name(volume):
+    return f"ward_{volume:02d}.pdf"
+
+
+def _loss_color(colors, loss_rate):
+    if loss_rate >= LOSS_DANGER:
+        return colors.red
+    if loss_rate >= LOSS_CAUTION:
+        return colors.orange
+    return colors.black
+
+
+def _chunks(iterable, size):
+    it = iter(iterable)
+    while chunk := list(itertools.islice(it, size)):
+        yield chunk
+
+
+# ================================
+# 1. ページの描画
+# ================================
+def _draw_header(c, title, footer):
+    w, h = A4
+    c.setFont(FONT_NAME, 14)
+    c.drawString(20 * mm, h - 18 * mm, title)
+    c.setFont(FONT_NAME, 9)
+    c.drawCentredString(w / 2, 10 * mm, footer)
+    c.setLineWidth(0.8)
+    c.line(20 * mm, h - 21 * mm, w - 20 * mm, h - 21 * mm)
+    return h - 28 * mm
+
+
+def draw_patient_block(c, no, data, y):
+    """1 患者分（基本情報・IN/OUT 表・判定）を y から下に描画し、次の y を返す。"""
+    colors = setup_pdf().colors
+    w, h = A4
+    room_temp = data.get("room_temp", data.get("r_temp", 0))
+
+    c.setFont(FONT_NAME, 11)
+    c.drawString(20 * mm, y, f"{no}. 患者ID：{data.get('patient_id', '')}")
+    c.setFont(FONT_NAME, 9)
+    c.drawString(
+        75 * mm, y,
+        f"{data['age']} 歳 / {data.get('gender', '不明')} / 体重 {data['weight']:.1f} kg / "
+        f"体温 {data['temp']:.1f} ℃ / 室温 {room_temp:.1f} ℃",
+    )
+    y -= 5 * mm
+    c.drawString(25 * mm, y, f"記録日時：{data.get('recorded_at', '')}   記録者：{data.get('recorder', '未記入')}")
+    y -= 2 * mm
+
+    total_in, total_out = io_totals(data)
+    io_table = build_io_table(data, total_in, total_out)
+    _, table_height = io_table.wrap(w - 40 * mm, h)
+    io_table.drawOn(c, 25 * mm, y - table_height)
+    y -= table_height + 6 * mm
+
+    loss_rate = data.get("loss_rate", 0)
+    c.setFont(FONT_NAME, 10)
+    c.drawString(25 * mm, y, f"ネットバランス：{data['net']:+.0f} mL / day   評価：{data['judgment']}")
+    c.setFillColor(_loss_color(colors, loss_rate))
+    c.drawRightString(w - 20 * mm, y, f"TBW {data.get('tbw', 0):.0f} mL / 損失率 {loss_rate:.2f} %")
+    c.setFillColor(colors.black)
+    y -= 5 * mm
+
+    c.setLineWidth(0.3)
+    c.setStrokeColor(colors.grey)
+    c.line(20 * mm, y, w - 20 * mm, y)
+    c.setStrokeColor(colors.black)
+    return y - 7 * mm
+
+
+def draw_ward_page(c, title, first_no, records, footer):
+    y = _draw_header(c, title, footer)
+    for i, data in enumerate(records):
+        y = draw_patient_block(c, first_no + i, data, y)
+    c.showPage()
+
+
+def draw_index_page(c, title, rows, footer):
+    rl = setup_pdf()
+    colors = rl.colors
+    w, h = A4
+    y = _draw_header(c, f"{title}　目次", footer)
+
+    table = rl.Table(
+        [["No.", "患者ID", "IN (mL)", "OUT (mL)", "バランス", "損失率", "評価", "掲載"]]
+        + [[r["no"], r["patient_id"], f"{r['total_in']:.0f}", f"{r['total_out']:.0f}", f"{r['net']:+.0f}",
+            f"{r['loss_rate']:.2f} %", r["judgment"], f"{r['volume']}-{r['page']}"] for r in rows],
+        colWidths=[12 * mm, 30 * mm, 18 * mm, 18 * mm, 18 * mm, 18 * mm, 36 * mm, 16 * mm],
+    )
+    style = [
+        ("LINEABOVE", (0, 0), (-1, 0), 0.8, colors.black),
+        ("LINEBELOW", (0, 0), (-1, 0), 0.8, colors.black),
+        ("LINEBELOW", (0, -1), (-1, -1), 0.8, colors.black),
+        ("FONT", (0, 0), (-1, -1), FONT_NAME, 9),
+        ("ALIGN", (0, 0), (-1, 0), "CENTER"),
+        ("ALIGN", (2, 1), (5, -1), "RIGHT"),
+        ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+    ]
+    for i, r in enumerate(rows, start=1):
+        color = _loss_color(colors, r["loss_rate"])
+        if color is not colors.black:
+            style.append(("TEXTCOLOR", (0, i), (-1, i), color))
+    table.setStyle(rl.TableStyle(style))
+    _, table_height = table.wrap(w - 40 * mm, h)
+    table.drawOn(c, 20 * mm, y - table_height)
+    c.showPage()
+
+
+# ================================
+# 2. 分冊の描画
+# ================================
+def render_volume(title, volume, first_no, records):
+    """1 冊分（最大 PAGES_PER_VOLUME ページ）の PDF バイト列を返す。"""
+    buf = BytesIO()
+    c = setup_pdf().canvas.Canvas(buf, pagesize=A4)
+    for page, chunk in enumerate(_chunks(records, PATIENTS_PER_PAGE), start=1):
+        draw_ward_page(c, title, first_no, chunk, f"第 {volume} 分冊　{page} ページ")
+        first_no += len(chunk)
+    c.save()
+    return buf.getvalue()
+
+
+def render_index(title, rows_iter):
+    buf = BytesIO()
+    c = setup_pdf().canvas.Canvas(buf, pagesize=A4)
+    pages = 0
+    for pages, rows in enumerate(_chunks(rows_iter, INDEX_ROWS_PER_PAGE), start=1):
+        draw_index_page(c, title, rows, f"目次　{pages} ページ")
+    if not pages:
+        draw_index_page(c, title, [], "目次")
+    c.save()
+    return buf.getvalue()
+
+
+def iter_volumes(records, spool):
+    """records を 1 冊分ずつ (分冊番号, 先頭の通し番号, レコード列) で返す。
+
+    目次の行は spool（テキストの一時ファイル）に 1 行 1 JSON で書き足していく。
+    """
+    no = 1
+    for volume, chunk in enumerate(_chunks(records, PATIENTS_PER_PAGE * PAGES_PER_VOLUME), start=1):
+        for i, data in enumerate(chunk):
+            total_in, total_out = io_totals(data)
+            spool.write(json.dumps({
+                "no": no + i, "patient_id": str(data.get("patient_id", "")),
+                "total_in": total_in, "total_out": total_out, "net": data["net"],
+                "loss_rate": data.get("loss_rate", 0), "judgment": data["judgment"],
+                "volume": volume, "page": i // PATIENTS_PER_PAGE + 1,
+            }, ensure_ascii=False) + "\n")
+        yield volume, no, chunk
+        no += len(chunk)
+
+
+def read_index(spool):
+    spool.seek(0)
+    return (json.loads(line) for line in spool)
+
+
+def iter_ward_report(records, title):
+    """records（report_data の反復可能オブジェクト）から (ファイル名, PDF バイト列) を順に返す。
+
+    患者ページの分冊を先に、目次を最後に返す。同時に保持するのは 1 冊分だけ。
+    """
+    with tempfile.TemporaryFile("w+", encoding="utf-8") as spool:
+        for volume, first_no, chunk in iter_volumes(records, spool):
+            yield volume_name(volume), render_volume(title, volume, first_no, chunk)
+        yield INDEX_NAME, render_index(title, read_index(spool))
+
+
+def write_ward_report(records, out_dir, title):
+    """病棟報告書を out_dir に分冊で書き出し、総ページ数を返す。"""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    count = 0
+
+    def counted():
+        nonlocal count
+        for data in records:
+            count += 1
+            yield data
+
+    for name, pdf in iter_ward_report(counted(), title):
+        (out_dir / name).write_bytes(pdf)
+    return -(-count // PATIENTS_PER_PAGE) + max(1, -(-count // INDEX_ROWS_PER_PAGE))
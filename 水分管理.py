@@ -1,79 +1,47 @@
-import streamlit as st
+import time
+
+_script_started = time.perf_counter()
+
 import datetime
-import pytz
-from io import BytesIO
+import os
 
-# PDF生成用
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.units import mm
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.cidfonts import UnicodeCIDFont
+import numpy as np
+import pandas as pd
+import streamlit as st
 
-# ================================
-# 0. タイムゾーン設定
-# ================================
-def get_jst_now():
-    return datetime.datetime.now(pytz.timezone("Asia/Tokyo"))
+from instrumentation import ENABLED as METRICS_ENABLED, REGISTRY, stage, start_timer, timed
+
+_stop_rerun_timer = start_timer("rerun")
+
+from balance_engine import (
+    compute_one, metabolic_water, insensible_loss, stool_water,
+    JUDGMENT_OVERLOAD, JUDGMENT_DEHYDRATION,
+    URINE_NORMAL_RATE, URINE_OLIGURIA_RATE, URINE_POLYURIA_RATE,
+)
+from event_buffer import EVENT_KINDS, EventBuffer, KIND_CODES, KIND_LABELS, JST, day_start, now_jst, today_jst
+from app_content import SECTION_HEADER_CSS, BASE_CSS, MAIN_PAGE_CSS
+from session_limits import SERVER_MODE, enforce_session_budget, session_full
 
 # ================================
 # 1. ページ基本設定
 # ================================
 st.set_page_config(page_title="水分出納管理システム", layout="wide")
 
-st.markdown("""
-<style>
-/* IN / OUT 見出し専用（ダークモード完全対応） */
-.section-header-in {
-    background-color: rgba(30, 60, 100, 0.85); /* Blue-ish */
-    color: #F0F8FF !important;
-    padding: 0.6em 0.8em;
-    border-radius: 0.6em;
-    font-weight: 700;
-    font-size: 1.05rem;
-    text-align: center;
-    border: 1px solid rgba(135, 206, 250, 0.25);
-}
-
-.section-header-out {
-    background-color: rgba(100, 30, 30, 0.85); /* Red-ish */
-    color: #FFF0F0 !important;
-    padding: 0.6em 0.8em;
-    border-radius: 0.6em;
-    font-weight: 700;
-    font-size: 1.05rem;
-    text-align: center;
-    border: 1px solid rgba(250, 128, 114, 0.25);
-}
-
-/* ライトモード補正 */
-@media (prefers-color-scheme: light) {
-    .section-header-in {
-        background-color: #E3F2FD;
-        color: #0d47a1 !important;
-        border: 1px solid #BBDEFB;
-    }
-    .section-header-out {
-        background-color: #FFEBEE;
-        color: #b71c1c !important;
-        border: 1px solid #FFCDD2;
-    }
-}
-</style>
-""", unsafe_allow_html=True)
-
 
 # ================================
 # 1. ダイアログ関数定義（最初に）
 # ================================
 @st.dialog("🚻 標準尿量の推算（体重補正）")
+@timed("dialog.urine")
 def urine_dialog():
     weight = st.session_state.get("weight", 60.0)
-    std_type = st.selectbox(
-        "評価基準を選択",
-        ["正常（20 mL/kg/day）", "少尿境界（10 mL/kg/day）", "多尿境界（40 mL/kg/day）"]
-    )
-    coef = 20 if "20" in std_type else 10 if "10" in std_type else 40
+    standards = {
+        f"正常（{URINE_NORMAL_RATE} mL/kg/day）": URINE_NORMAL_RATE,
+        f"少尿境界（{URINE_OLIGURIA_RATE} mL/kg/day）": URINE_OLIGURIA_RATE,
+        f"多尿境界（{URINE_POLYURIA_RATE} mL/kg/day）": URINE_POLYURIA_RATE,
+    }
+    std_type = st.selectbox("評価基準を選択", list(standards))
+    coef = standards[std_type]
     std_urine = coef * weight
     est_u_vol = std_urine / max(st.session_state.get("u_times", 5), 1)
 
@@ -95,6 +63,7 @@ def urine_dialog():
 # 便量推算ダイアログ（定義だけ）
 # ================================
 @st.dialog("🚽 標準便量の推算（体重・状態別）")
+@timed("dialog.stool")
 def stool_dialog():
     # 体重取得（未設定なら60kg）
     weight = st.session_state.get("weight", 60.0)
@@ -158,207 +127,68 @@ if "weight" not in st.session_state:
 if "recorder" not in st.session_state:
     st.session_state.recorder = "本人"
 
-st.markdown("""
-<style>
-.report-header-box {
-    background-color: #e9ecef;
-    padding: 10px 20px;
-    border-radius: 8px;
-    border-left: 6px solid #007bff;
-    margin: 20px 0;
-}
-.report-header-box h4 { margin: 0; }
-div.stButton > button {
-    border-radius: 10px;
-    font-weight: bold;
-    height: 3em;
-}
-[data-testid="stMetricValue"] { color: #007bff; }
-</style>
-""", unsafe_allow_html=True)
-
-# ================================
-# 2. PDF設定
-# ================================
-try:
-    pdfmetrics.registerFont(UnicodeCIDFont("HeiseiMin-W3"))
-except:
-    pass
-
-def generate_medical_report(data):
-    from reportlab.platypus import Table, TableStyle
-    from reportlab.lib import colors
-
-    buf = BytesIO()
-    c = canvas.Canvas(buf, pagesize=A4)
-    w, h = A4
-
-    room_temp = data.get("room_temp", data.get("r_temp", 0))
-
-    # ================================
-    # タイトル
-    # ================================
-    c.setFont("HeiseiMin-W3", 18)
-    c.drawCentredString(w / 2, h - 20 * mm, "水分出納管理報告書（サマリー）")
-
-    c.setFont("HeiseiMin-W3", 10)
-    c.drawString(20 * mm, h - 30 * mm, f"記録日時：{get_jst_now().strftime('%Y/%m/%d %H:%M')}")
-    c.drawRightString(w - 20 * mm, h - 30 * mm, f"記録者：{data.get('recorder', '未記入')}")
-
-    y = h - 42 * mm
-
-    # ================================
-    # 【基本情報】（箇条書き）
-    # ================================
-    c.setFont("HeiseiMin-W3", 12)
-    c.drawString(20 * mm, y, "【基本情報】")
-    y -= 6 * mm
-
-    c.setFont("HeiseiMin-W3", 10)
-    c.drawString(25 * mm, y, f"・年齢：{data['age']} 歳")
-    c.drawString(70 * mm, y, f"・性別：{data.get('gender', '不明')}")
-    y -= 5 * mm
-    c.drawString(25 * mm, y, f"・体重：{data['weight']:.1f} kg")
-    c.drawString(70 * mm, y, f"・摂取エネルギー：{data.get('kcal', 0)} kcal")
-    y -= 5 * mm
-    c.drawString(25 * mm, y, f"・体温：{data['temp']:.1f} ℃")
-    y -= 5 * mm
-    c.drawString(25 * mm, y, f"・室温：{room_temp:.1f} ℃")
-
-    y -= 8 * mm
-
-    # ================================
-    # 【入出量内訳】（IN/OUT 横並び・合計行付き）
-    # ================================
-    c.setFont("HeiseiMin-W3", 12)
-    c.drawString(20 * mm, y, "【入出量内訳】")
-    y -= 6 * mm
-
-    total_in = (
-        data["oral"]
-        + data["iv"]
-        + data["blood"]
-        + data["metabolic"]
-    )
-    total_out = (
-        data["urine"]
-        + data["bleeding"]
-        + data["stool"]
-        + data["insensible"]
-    )
+st.markdown(BASE_CSS, unsafe_allow_html=True)
 
-    io_table = Table(
-        [
-            ["IN（流入）", "", "OUT（流出）", ""],
-            ["経口摂取", f"{data['oral']} mL", "尿量", f"{data['urine']} mL"],
-            ["静脈輸液", f"{data['iv']} mL", "出血等", f"{data['bleeding']} mL"],
-            ["輸血", f"{data['blood']} mL", "便中水分", f"{data['stool']:.0f} mL"],
-            ["代謝水", f"{data['metabolic']:.0f} mL", "不感蒸泄", f"{data['insensible']:.0f} mL"],
-            ["合計", f"{total_in:.0f} mL", "合計", f"{total_out:.0f} mL"],
-        ],
-        colWidths=[38 * mm, 32 * mm, 38 * mm, 32 * mm]
-    )
+# ================================
+# 2. 記録の保存先（balance_store.py）
+# ================================
+from balance_store import BalanceStore, GroupCommitWriter
+from balance_aggregate import PatientBalance
+from urine_monitor import replay
+from ward_board import WardBoard, RISK_CAUTION, RISK_OVERLOAD, RISK_DEHYDRATION
 
-    io_table.setStyle(TableStyle([
-        # 見出し上下罫線
-        ("LINEABOVE", (0, 0), (-1, 0), 0.8, colors.black),
-
-        # 合計行の強調（上罫線＋下罫線）
-        ("LINEABOVE", (0, -1), (-1, -1), 0.8, colors.black),
-        ("LINEBELOW", (0, -1), (-1, -1), 0.8, colors.black),
-
-        # IN / OUT 境界線
-        ("LINEBEFORE", (2, 0), (2, -1), 0.8, colors.black),
-
-        # フォント
-        ("FONT", (0, 0), (-1, 0), "HeiseiMin-W3", 10),
-        ("FONT", (0, 1), (-1, -2), "HeiseiMin-W3", 10),
-        ("FONT", (0, -1), (-1, -1), "HeiseiMin-W3", 10),
-
-        # 配置
-        ("ALIGN", (0, 0), (-1, 0), "CENTER"),
-        ("ALIGN", (1, 1), (1, -1), "RIGHT"),
-        ("ALIGN", (3, 1), (3, -1), "RIGHT"),
-        ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
-    ]))
-
-    table_width, table_height = io_table.wrap(w - 40 * mm, h)
-    io_table.drawOn(c, 20 * mm, y - table_height)
-    y -= table_height + 10 * mm
-
-    # ================================
-    # 【判定】（薄いグレー帯）
-    # ================================
-    band_height = 14 * mm
-    c.setFillColor(colors.whitesmoke)
-    c.rect(20 * mm, y - band_height, w - 40 * mm, band_height, fill=1, stroke=0)
-
-    c.setFillColor(colors.black)
-    c.setFont("HeiseiMin-W3", 12)
-    c.drawString(22 * mm, y - 5 * mm, "【判定】")
-
-    c.setFont("HeiseiMin-W3", 14)
-    c.drawRightString(
-        w - 22 * mm,
-        y - 5 * mm,
-        f"ネットバランス： {data['net']:+.0f} mL / day"
-    )
 
-    y -= band_height + 4 * mm
+@st.cache_resource
+def get_store():
+    # プロセス内の全セッションで 1 つの接続を共有する
+    return BalanceStore()
 
-    # 追加：詳細分析（TBW, 損失率）
-    c.setFont("HeiseiMin-W3", 10)
-    tbw_text = f"推算TBW: {data.get('tbw', 0):.0f} mL"
-    loss_text = f"損失率: {data.get('loss_rate', 0):.2f} %"
-    
-    # 損失率による警告
-    loss_rate = data.get('loss_rate', 0)
-    warn_msg = ""
-    if loss_rate >= 3.0:
-        warn_msg = "【危険】熱中症リスク・パフォーマンス著効低下"
-        c.setFillColor(colors.red)
-    elif loss_rate >= 2.0:
-        warn_msg = "【注意】運動パフォーマンス低下の懸念"
-        c.setFillColor(colors.orange)
-    else:
-        c.setFillColor(colors.black)
 
-    c.drawString(25 * mm, y, f"{tbw_text}   /   {loss_text}   {warn_msg}")
-    c.setFillColor(colors.black) # 色を戻す
-    
-    y -= 6 * mm
+@st.cache_resource
+def get_writer():
+    # 全セッションの保存をまとめてコミットする（コミットが終わるまで save() は返らない）
+    return GroupCommitWriter(get_store())
 
-    c.setFont("HeiseiMin-W3", 11)
-    c.drawString(25 * mm, y, f"評価： {data['judgment']}")
 
-    y -= 10 * mm
+@st.cache_resource
+def get_rules():
+    # 病棟一覧の警告ルール（WATER_BALANCE_RULES に JSON ファイルを指定すると差し替え）
+    from balance_rules import compile_rules, load_rules
+    from ward_board import DEFAULT_RULES
+
+    path = os.environ.get("WATER_BALANCE_RULES")
+    return load_rules(path) if path else compile_rules(DEFAULT_RULES)
+
+# ================================
+# 2. PDF設定（medical_report.py）
+# PDF 関連は PDF パネルの初回描画時に読み込み、ReportLab とフォント登録は
+# 最初のレポート生成時にプロセスで 1 回だけ行う
+# ================================
+@st.cache_resource
+def get_report_cache():
+    # 描画済み PDF を全セッションで共有（容量上限は WATER_BALANCE_PDF_CACHE_MB）
+    from report_cache import ReportCache
+    return ReportCache()
 
-    # ================================
-    # 注意書き
-    # ================================
-    c.setFont("HeiseiMin-W3", 9)
-    c.drawString(
-        20 * mm, y,
-        "※本報告書は水分出納管理の補助を目的としたものであり、"
-        "最終的な臨床判断は医師が行ってください。"
-    )
 
-    c.showPage()
-    c.save()
-    buf.seek(0)
-    return buf
+@st.cache_resource
+def get_job_queue():
+    # 一括出力ジョブ（病棟全員分・患者の期間分）を全セッションで共有
+    from report_jobs import ReportJobQueue
+    return ReportJobQueue()
 
 
 # ================================
 # 3. ページ状態管理
 # ================================
 if "page" not in st.session_state:
-    st.session_state.page = "main"
+    # 診断ページはナビゲーションに出さず ?page=diag でのみ開く
+    st.session_state.page = "diag" if st.query_params.get("page") == "diag" else "main"
 
 # ================================
 # 4. タブ風ナビゲーション
 # ================================
-b1, b2, b3, b4 = st.columns(4)
+b1, b2, b3, b4, b5, b6 = st.columns(6)
 
 with b1:
     if st.button("🏠 メイン計算", use_container_width=True):
@@ -372,6 +202,12 @@ with b3:
 with b4:
     if st.button("📚 引用・参考文献", use_container_width=True):
         st.session_state.page = "refs"
+with b5:
+    if st.button("🛏 病棟一覧", use_container_width=True):
+        st.session_state.page = "ward"
+with b6:
+    if st.button("🔬 感度分析", use_container_width=True):
+        st.session_state.page = "sensitivity"
 
 
 st.markdown("---")
@@ -385,6 +221,7 @@ st.markdown("---")
 # 5. メイン計算ページ（2026/01/09 最終安定版）
 # =========================================================
 if st.session_state.page == "main":
+    st.markdown(SECTION_HEADER_CSS, unsafe_allow_html=True)
     st.title("🏥 水分出納バランス記録")
 
     # --- 1. 変数の初期化 ---
@@ -405,232 +242,420 @@ if st.session_state.page == "main":
     recorder = c6.text_input("記録者", value=st.session_state.recorder, key="main_recorder")
     st.session_state.recorder = recorder
 
-    # --- 3. IN / OUT 入力エリア ---
-    st.divider()
-    col_in, col_out = st.columns(2)
-
-    with col_in:
-        st.markdown('<p class="section-header-in">📥 IN (摂取・流入)</p>', unsafe_allow_html=True)
-        oral = st.number_input(
-            ":blue[経口摂取(mL)] ※代謝水除く", 
-            0, 10000, 1500, 50, 
-            key="in_oral",
-            help="水、お茶、ジュース、スープ、飲み薬の水など。\n食事中の水分（ご飯、野菜など）を含めるかどうかは方針に従ってください。"
+    p1, p2, p3, _ = st.columns([2, 2, 2, 6])
+    patient_id = p1.text_input("患者ID", key="main_patient_id", help="記録の保存・履歴表示に使用します。")
+    ward = p2.text_input("病棟", key="main_ward")
+    record_day = p3.date_input("記録日", value=today_jst(), key="main_day")
+
+    # --- 3. 計算パネル（IN / OUT 入力・結果表示） ---
+    # IN・OUT の入力を変更したときは、このフラグメントだけが再実行される。
+    # 保存・PDF パネルは st.session_state.latest から最新の計算結果を読む。
+    # 制約：IN と OUT を別々のフラグメントにはしていない。Streamlit のフラグメントは
+    # 自分のウィジェットの変更でしか再実行されず、別のフラグメント（結果表示）を
+    # 再実行させるにはページ全体の st.rerun() が必要になるため、結果が両方に依存する
+    # 以上、IN の変更でも OUT の入力欄まで描き直す。そのかわり重い処理（時間別の集計・
+    # 尿量の判定・モンテカルロ）は入力が変わったときだけ計算し直し、結果は
+    # st.session_state に置いて再実行のたびには計算しない。
+    if "latest" not in st.session_state:
+        st.session_state.latest = {}
+
+    @st.fragment
+    @timed("fragment.calc")
+    def calc_panel(age, gender, weight, temp, r_temp, record_day, patient_id, ward, recorder):
+        st.divider()
+        event_mode = st.toggle(
+            "⏱ 時間記録モード（時刻付きの尿量・輸液などを記録日の集計に使用）",
+            key="event_mode",
         )
+        col_in, col_out = st.columns(2)
+
+        with col_in:
+            st.markdown('<p class="section-header-in">📥 IN (摂取・流入)</p>', unsafe_allow_html=True)
+            oral = st.number_input(
+                ":blue[経口摂取(mL)] ※代謝水除く", 
+                0, 10000, 1500, 50, 
+                key="in_oral",
+                help="水、お茶、ジュース、スープ、飲み薬の水など。\n食事中の水分（ご飯、野菜など）を含めるかどうかは方針に従ってください。"
+            )
         
-        # 代謝水計算用カロリー入力
-        ck1, ck2 = st.columns([2, 1])
-        kcal = ck1.number_input(
-            ":blue[摂取エネルギー(kcal)] ※代謝水推算用", 
-            0, 5000, 2000, 100, 
-            key="in_kcal",
-            help="1日の食事・補食の総カロリー。\n(例) おにぎり1個:約180kcal, 一般的な定食:約700kcal"
-        )
-        meta_coef = ck2.number_input(
-            ":blue[係数]", 
-            0.10, 0.20, 0.13, 0.01, 
-            format="%.2f", 
-            key="in_meta_coef",
-            help="代謝水産生係数（通常 0.12 〜 0.15）"
-        )
+            # 代謝水計算用カロリー入力
+            ck1, ck2 = st.columns([2, 1])
+            kcal = ck1.number_input(
+                ":blue[摂取エネルギー(kcal)] ※代謝水推算用", 
+                0, 5000, 2000, 100, 
+                key="in_kcal",
+                help="1日の食事・補食の総カロリー。\n(例) おにぎり1個:約180kcal, 一般的な定食:約700kcal"
+            )
+            meta_coef = ck2.number_input(
+                ":blue[係数]", 
+                0.10, 0.20, 0.13, 0.01, 
+                format="%.2f", 
+                key="in_meta_coef",
+                help="代謝水産生係数（通常 0.12 〜 0.15）"
+            )
         
-        iv = st.number_input(
-            ":blue[静脈輸液(mL)]", 
-            0, 10000, 0, 50, 
-            key="in_iv",
-            help="点滴（輸液製剤、抗生剤の溶解液など）。"
-        )
-        blood = st.number_input(
-            ":blue[輸血(mL)]", 
-            0, 5000, 0, 50, 
-            key="in_blood",
-            help="赤血球製剤(RBC)、新鮮凍結血漿(FFP)などの輸血量。"
-        )
+            iv = st.number_input(
+                ":blue[静脈輸液(mL)]", 
+                0, 10000, 0, 50, 
+                key="in_iv",
+                help="点滴（輸液製剤、抗生剤の溶解液など）。"
+            )
+            blood = st.number_input(
+                ":blue[輸血(mL)]", 
+                0, 5000, 0, 50, 
+                key="in_blood",
+                help="赤血球製剤(RBC)、新鮮凍結血漿(FFP)などの輸血量。"
+            )
         
-        # 代謝水計算
-        # 代謝水計算
-        # 代謝水計算
-        metabolic = kcal * meta_coef
-        st.session_state["disp_metabolic"] = float(metabolic)
-        st.number_input(
-            ":blue[代謝水(自動計算) mL]", 
-            value=float(metabolic), 
-            disabled=True, 
-            key="disp_metabolic",
-            help="食事や栄養が体内でエネルギーに変わるときに作られる水。\n摂取エネルギー × 係数 で算出されます。"
-        )
-
-    with col_out:
-        st.markdown('<p class="section-header-out">📤 OUT (排出・喪失)</p>', unsafe_allow_html=True)
-        u_times = st.number_input(
-            ":red[排尿回数]", 
-            0, 20, value=u_times_init, 
-            key="out_utimes",
-            help="24時間でトイレに行った回数。"
-        )
-        st.session_state.u_times = u_times
-
-        ucol_l, ucol_r = st.columns([3, 2])
-        with ucol_l:
-            u_vol = st.number_input(
-                ":red[1回尿量(mL)]", 
-                0, 1000, value=u_vol_init, 
-                key="out_uvol",
-                help="1回あたりの平均的な量。\n・紙コップ1杯: 約200mL\n・尿器の目盛りなどを参考に。"
+            # 代謝水計算
+            metabolic = metabolic_water(kcal, meta_coef).item()
+            st.session_state["disp_metabolic"] = float(metabolic)
+            st.number_input(
+                ":blue[代謝水(自動計算) mL]", 
+                value=float(metabolic), 
+                disabled=True, 
+                key="disp_metabolic",
+                help="食事や栄養が体内でエネルギーに変わるときに作られる水。\n摂取エネルギー × 係数 で算出されます。"
             )
-            st.session_state.u_vol = u_vol
-        with ucol_r:
-            st.markdown("###### ")
-            if st.button("📐 尿量推算", use_container_width=True, key="btn_u_calc"):
-                urine_dialog()
-
-        bleeding = st.number_input(
-            ":red[出血・ドレーン等(mL)]", 
-            0, 5000, 0, 
-            key="out_bleed",
-            help="手術痕からの出血、ドレーン排液、嘔吐物など、尿・便以外の喪失。"
-        )
 
-        scol_l, scol_r = st.columns([3, 2])
-        with scol_l:
-            s_vol = st.number_input(
-                ":red[便重量(g)]", 
-                0, 1000, value=s_vol_init, 
-                key="out_svol",
-                help="便の重さ。\n・バナナ1本分: 約100g〜150g\n・卵1個分: 約50g"
+        with col_out:
+            st.markdown('<p class="section-header-out">📤 OUT (排出・喪失)</p>', unsafe_allow_html=True)
+            u_times = st.number_input(
+                ":red[排尿回数]", 
+                0, 20, value=u_times_init, 
+                key="out_utimes",
+                help="24時間でトイレに行った回数。"
+            )
+            st.session_state.u_times = u_times
+
+            ucol_l, ucol_r = st.columns([3, 2])
+            with ucol_l:
+                u_vol = st.number_input(
+                    ":red[1回尿量(mL)]", 
+                    0, 1000, value=u_vol_init, 
+                    key="out_uvol",
+                    help="1回あたりの平均的な量。\n・紙コップ1杯: 約200mL\n・尿器の目盛りなどを参考に。"
+                )
+                st.session_state.u_vol = u_vol
+            with ucol_r:
+                st.markdown("###### ")
+                if st.button("📐 尿量推算", use_container_width=True, key="btn_u_calc"):
+                    urine_dialog()
+
+            bleeding = st.number_input(
+                ":red[出血・ドレーン等(mL)]", 
+                0, 5000, 0, 
+                key="out_bleed",
+                help="手術痕からの出血、ドレーン排液、嘔吐物など、尿・便以外の喪失。"
             )
-            st.session_state.s_vol = s_vol
-        with scol_r:
-            st.markdown("###### ")
-            if st.button("📐 便量推算", use_container_width=True, key="btn_s_calc"):
-                stool_dialog()
+
+            scol_l, scol_r = st.columns([3, 2])
+            with scol_l:
+                s_vol = st.number_input(
+                    ":red[便重量(g)]", 
+                    0, 1000, value=s_vol_init, 
+                    key="out_svol",
+                    help="便の重さ。\n・バナナ1本分: 約100g〜150g\n・卵1個分: 約50g"
+                )
+                st.session_state.s_vol = s_vol
+            with scol_r:
+                st.markdown("###### ")
+                if st.button("📐 便量推算", use_container_width=True, key="btn_s_calc"):
+                    stool_dialog()
         
-        # 入力項目の最後
-        s_type = st.selectbox(
-            ":red[便性状]", 
-            ["普通", "軟便", "下痢"], 
-            key="out_stype_main",
-            help="便の水分量補正に使用します。\n・普通: ×0.75\n・軟便: ×0.85\n・下痢: ×0.95"
-        )
+            # 入力項目の最後
+            s_type = st.selectbox(
+                ":red[便性状]", 
+                ["普通", "軟便", "下痢"], 
+                key="out_stype_main",
+                help="便の水分量補正に使用します。\n・普通: ×0.75\n・軟便: ×0.85\n・下痢: ×0.95"
+            )
         
-        # 不感蒸泄の計算と表示（これまで下部で行っていた計算をここでも行う）
-        insensible_calc = 15.0 * weight
-        if temp > 37.0: 
-            insensible_calc *= (1 + 0.15 * (temp - 37.0))
-        if r_temp > 30.0: 
-            insensible_calc *= (1 + 0.175 * (r_temp - 30.0))
-            
-        if r_temp > 30.0: 
-            insensible_calc *= (1 + 0.175 * (r_temp - 30.0))
-            
-        st.session_state["disp_insensible"] = float(insensible_calc)
-        st.number_input(
-            ":red[不感蒸泄(自動計算) mL]", 
-            value=float(insensible_calc), 
-            disabled=True, 
-            key="disp_insensible",
-            help="発汗とは別に、皮膚や呼吸から自然に失われる水分。\n体重・体温・室温から算出され、熱や暑さで増加します。"
-        )
+            # 不感蒸泄の計算と表示（下部の確定計算と同じ計算エンジンを使用）
+            insensible_calc = insensible_loss(weight, temp, r_temp).item()
+            st.session_state["disp_insensible"] = float(insensible_calc)
+            st.number_input(
+                ":red[不感蒸泄(自動計算) mL]", 
+                value=float(insensible_calc), 
+                disabled=True, 
+                key="disp_insensible",
+                help="発汗とは別に、皮膚や呼吸から自然に失われる水分。\n体重・体温・室温から算出され、熱や暑さで増加します。"
+            )
 
-    # =========================================================
-    # 【完結】これより下は計算と表示。重複コードはすべて消去してください
-    # =========================================================
-    
-    # 1. 確定計算
-    urine_total = st.session_state.u_times * st.session_state.u_vol
-    s_factor = 0.75 if s_type == "普通" else 0.85 if s_type == "軟便" else 0.95
-    stool_total = st.session_state.s_vol * s_factor
-    
-    insensible_total = 15.0 * weight
-    if temp > 37.0: 
-        insensible_total *= (1 + 0.15 * (temp - 37.0))
-    if r_temp > 30.0: 
-        insensible_total *= (1 + 0.175 * (r_temp - 30.0))
-
-    total_in = oral + iv + blood + metabolic
-    total_out = urine_total + bleeding + stool_total + insensible_total
-    net_balance = total_in - total_out
-
-    # 2. 結果表示（1回のみ実行）
-    st.divider()
-    m1, m2, m3 = st.columns(3)
-    m1.metric("総流入 (IN)", f"{total_in:.0f} mL")
-    m2.metric("総流出 (OUT)", f"{total_out:.0f} mL")
-    m3.metric("バランス", f"{net_balance:+.0f} mL")
-
-    # 3. 判定メッセージ（status_funcなどの変数を使わず直接表示）
-    # 3. 判定メッセージ（status_funcなどの変数を使わず直接表示）
-    if net_balance > 500:
-        judg = "体液過剰の傾向"
-        st.error(f"判定：{judg}")
-    elif net_balance < -200:
-        judg = "脱水リスク"
-        st.warning(f"判定：{judg}")
-    else:
-        judg = "維持範囲"
-        st.success(f"判定：{judg}")
-
-    # --- 追加: 体内全水分量と損失率の計算 ---
-    # 係数決定
-    if age < 1:
-        tbw_ratio = 0.8
-    elif age < 14:
-        tbw_ratio = 0.7
-    elif age >= 65:
-        tbw_ratio = 0.5
-    else:
-        # 成人(14-64)
-        if gender == "男性":
-            tbw_ratio = 0.6
+        # --- 4. 時間記録モード（時刻付き記録の入力と時間別グラフ） ---
+        if event_mode:
+            # 患者IDがあれば記録はデータベースに保存し、患者・記録日が変わったら直近7日分を読み直す
+            events_key = (patient_id, record_day) if patient_id else None
+            if "events" not in st.session_state or (events_key and st.session_state.get("events_key") != events_key):
+                st.session_state.events = EventBuffer()
+                if events_key:
+                    saved = get_store().patient_events(
+                        patient_id,
+                        day_start(record_day) - datetime.timedelta(days=6),
+                        day_start(record_day + datetime.timedelta(days=1)),
+                    )
+                    if saved:
+                        st.session_state.events.extend(
+                            [r["ts"] for r in saved], [r["kind"] for r in saved], [r["volume"] for r in saved]
+                        )
+                st.session_state.events_key = events_key
+            events = st.session_state.events
+
+            st.markdown('<div class="report-header-box"><h4>⏱ 時刻付き記録</h4></div>', unsafe_allow_html=True)
+            with st.form("event_form", clear_on_submit=True, border=False):
+                e1, e2, e3, e4 = st.columns([2, 2, 2, 1])
+                ev_time = e1.time_input("時刻", value=now_jst().time().replace(second=0, microsecond=0), step=900)
+                ev_kind = e2.selectbox("区分", list(KIND_LABELS), format_func=KIND_LABELS.get)
+                ev_vol = e3.number_input("量(mL)", 0, 5000, 50, 10)
+                e4.markdown("###### ")
+                # 上限を超えても記録は削らず、これ以上の追加だけを止める
+                blocked = SERVER_MODE and session_full(st.session_state)
+                if e4.form_submit_button("➕ 追加", use_container_width=True, disabled=blocked):
+                    ev_ts = datetime.datetime.combine(record_day, ev_time, tzinfo=JST)
+                    if patient_id:
+                        # コミットが終わってから画面に反映する（同時に届いた他のベッドの記録とまとめて書き込む）
+                        get_writer().add_event(patient_id, ev_ts, ev_kind, ev_vol, ward=ward, recorder=recorder)
+                    events.add(ev_ts, ev_kind, ev_vol)
+                    if patient_id and st.session_state.get("patient_balance_key") == (patient_id, record_day):
+                        st.session_state.patient_balance.add_event(record_day, ev_ts, ev_kind, ev_vol)
+            if not patient_id:
+                st.caption("患者IDが未入力のため、時刻付き記録はこのセッションにだけ残ります（保存されません）。")
+            if blocked:
+                st.warning("このセッションのメモリ上限に達したため、時刻付き記録を追加できません。"
+                           "記録を保存してから新しいセッションで続けてください。")
+
+            # 直近7日分の時間別集計（記録が増えたときだけ再計算）
+            chart_key = (events.version, record_day, metabolic, insensible_calc, st.session_state.s_vol, s_type)
+            if st.session_state.get("event_chart_key") != chart_key:
+                start = day_start(record_day) - datetime.timedelta(days=6)
+                hourly = events.hourly_balance(
+                    start, 7 * 24,
+                    insensible_per_hour=insensible_calc / 24,
+                    metabolic_per_hour=metabolic / 24,
+                    stool_per_hour=stool_water(st.session_state.s_vol, s_type).item() / 24,
+                )
+                index = pd.date_range(start, periods=7 * 24, freq="h")
+                st.session_state.event_chart = pd.DataFrame(
+                    {"IN": hourly["in"], "OUT": -hourly["out"], "累積バランス": hourly["cumulative"]}, index=index
+                )
+                st.session_state.event_chart_key = chart_key
+            chart = st.session_state.event_chart
+
+            g1, g2 = st.columns(2)
+            g1.caption(f"時間別 IN / OUT（直近7日・{len(events)}件）")
+            g1.bar_chart(chart[["IN", "OUT"]], height=220)
+            g2.caption("累積バランス (mL)")
+            g2.line_chart(chart["累積バランス"], height=220)
+
+            # 記録日の時刻付き記録で日量を置き換える
+            day_totals = events.totals_between(day_start(record_day), day_start(record_day + datetime.timedelta(days=1)))
+            oral, iv, blood, bleeding = (day_totals[k][0] for k in ("oral", "iv", "blood", "bleeding"))
+            urine_times, urine_volume = 1, day_totals["urine"][0]
+            st.info(
+                f"記録日の時刻付き記録から集計しています：経口 {oral:.0f} / 輸液 {iv:.0f} / 輸血 {blood:.0f} / "
+                f"尿 {urine_volume:.0f}（{day_totals['urine'][1]}回） / 出血等 {bleeding:.0f} mL"
+            )
+
+            # 尿量の移動窓（体重あたりの日量）と無尿・少尿・多尿の判定（記録日の終わりか現在時刻の時点）
+            # 最初の記録（区分を問わない）から観察を始め、尿量の記録が 1 件もなくても無尿を判定する
+            until = min(now_jst(), day_start(record_day + datetime.timedelta(days=1)))
+            urine_key = (events.version, weight, until.replace(second=0, microsecond=0))
+            if st.session_state.get("urine_monitor_key") != urine_key:
+                t, kind, vol = events.columns()
+                is_urine = kind == KIND_CODES["urine"]
+                st.session_state.urine_monitor = replay(
+                    t[is_urine].tolist(), vol[is_urine].tolist(), weight, until,
+                    start=int(t.min()) if len(t) else None,
+                )
+                st.session_state.urine_monitor_key = urine_key
+            urine_status, urine_alerts = st.session_state.urine_monitor
+            if urine_status:
+                cols = st.columns(len(urine_status))
+                for col, (name, (total, rate, state)) in zip(cols, urine_status.items()):
+                    col.metric(f"尿量 直近{name}", f"{rate:.1f} mL/kg/day", state or "判定前", delta_color="off")
+                for a in urine_alerts[-3:]:
+                    at = datetime.datetime.fromtimestamp(a["time"], JST)
+                    st.warning(f"{at:%m/%d %H:%M} 直近{a['window']}の尿量が{a['state']}になりました（{a['rate']:.1f} mL/kg/day）")
         else:
-            tbw_ratio = 0.55
-            
-    tbw_val = weight * tbw_ratio * 1000  # mL換算
+            urine_times, urine_volume = st.session_state.u_times, st.session_state.u_vol
+
+        # =========================================================
+        # 【完結】これより下は計算と表示。重複コードはすべて消去してください
+        # =========================================================
     
-    # 損失量の計算（マイナスバランスの場合のみ）
-    loss_ml = abs(net_balance) if net_balance < 0 else 0
-    loss_rate = (loss_ml / tbw_val) * 100 if tbw_val > 0 else 0
+        # 1. 確定計算（balance_engine でバッチ計算と同じ式を使用）
+        inputs = dict(
+            age=age, gender=gender, weight=weight, temp=temp, room_temp=r_temp,
+            kcal=kcal, meta_coef=meta_coef, oral=oral, iv=iv, blood=blood,
+            urine_times=urine_times, urine_volume=urine_volume,
+            bleeding=bleeding, stool_weight=st.session_state.s_vol, stool_type=s_type,
+        )
+        with stage("calc.compute"):
+            result = compute_one(**inputs)
+        urine_total = result["urine"]
+        stool_total = result["stool"]
+        insensible_total = result["insensible"]
+        total_in = result["total_in"]
+        total_out = result["total_out"]
+        net_balance = result["net"]
+
+        # 2. 結果表示（1回のみ実行）
+        st.divider()
+        m1, m2, m3 = st.columns(3)
+        m1.metric("総流入 (IN)", f"{total_in:.0f} mL")
+        m2.metric("総流出 (OUT)", f"{total_out:.0f} mL")
+        m3.metric("バランス", f"{net_balance:+.0f} mL")
+
+        # 3. 判定メッセージ
+        judg = result["judgment"]
+        if judg == JUDGMENT_OVERLOAD:
+            st.error(f"判定：{judg}")
+        elif judg == JUDGMENT_DEHYDRATION:
+            st.warning(f"判定：{judg}")
+        else:
+            st.success(f"判定：{judg}")
+
+        # --- 追加: 体内全水分量と損失率 ---
+        tbw_ratio = result["tbw_ratio"]
+        tbw_val = result["tbw"]
+        loss_rate = result["loss_rate"]
     
-    st.markdown("### 💧 水分状態の詳細分析")
-    c_res1, c_res2 = st.columns(2)
-    c_res1.metric("推算体内全水分量 (TBW)", f"{tbw_val:,.0f} mL", help=f"年齢・性別・体重から推算（係数: {tbw_ratio*100:.0f}%）")
+        st.markdown("### 💧 水分状態の詳細分析")
+        c_res1, c_res2 = st.columns(2)
+        c_res1.metric("推算体内全水分量 (TBW)", f"{tbw_val:,.0f} mL", help=f"年齢・性別・体重から推算（係数: {tbw_ratio*100:.0f}%）")
     
-    # 損失率の表示（色分け）
-    loss_color = "normal"
-    if loss_rate >= 2.0:
-        loss_color = "off" # inverse logic usually, but here checking threshold
+        # 損失率の表示（色分け）
+        loss_color = "normal"
+        if loss_rate >= 2.0:
+            loss_color = "off" # inverse logic usually, but here checking threshold
     
-    c_res2.metric("水分損失率 (対 TBW)", f"{loss_rate:.2f} %", delta=None)
-
-    # パフォーマンス低下警告
-    if loss_rate >= 3.0:
-        st.error(f"⚠️ 水分損失率が {loss_rate:.1f}% です。運動パフォーマンスの著しい低下や熱中症のリスクがあります。直ちに水分補給を行ってください。")
-    elif loss_rate >= 2.0:
-        st.warning(f"⚠️ 水分損失率が {loss_rate:.1f}% です。運動パフォーマンスの低下（2〜3%）が懸念されます。早めの水分補給を推奨します。")
-    elif loss_rate > 0:
-        st.info(f"水分損失率は {loss_rate:.1f}% です。こまめな水分補給を心がけましょう。")
+        c_res2.metric("水分損失率 (対 TBW)", f"{loss_rate:.2f} %", delta=None)
+
+        # パフォーマンス低下警告
+        if loss_rate >= 3.0:
+            st.error(f"⚠️ 水分損失率が {loss_rate:.1f}% です。運動パフォーマンスの著しい低下や熱中症のリスクがあります。直ちに水分補給を行ってください。")
+        elif loss_rate >= 2.0:
+            st.warning(f"⚠️ 水分損失率が {loss_rate:.1f}% です。運動パフォーマンスの低下（2〜3%）が懸念されます。早めの水分補給を推奨します。")
+        elif loss_rate > 0:
+            st.info(f"水分損失率は {loss_rate:.1f}% です。こまめな水分補給を心がけましょう。")
+
+        # --- 推算値の不確かさ（不感蒸泄・便中水分・尿量の推算幅からの区間） ---
+        if st.toggle("🎲 推算値の不確かさを表示（モンテカルロ）", key="mc_mode"):
+            from uncertainty import DEFAULT_LEVEL, DEFAULT_SAMPLES, simulate
+
+            # 入力が同じなら区間も同じ（入力値から乱数の種を決める）なので、変わったときだけ計算する
+            mc_key = (tuple(inputs.items()), event_mode)
+            if st.session_state.get("mc_key") != mc_key:
+                with stage("calc.uncertainty"):
+                    # 時間記録モードの尿量は実測の合計なのでばらつかせない
+                    st.session_state.mc_result = simulate(inputs, urine_measured=event_mode)
+                st.session_state.mc_key = mc_key
+            mc, net_samples = st.session_state.mc_result
+            u1, u2, u3 = st.columns(3)
+            u1.metric(f"バランス {DEFAULT_LEVEL:.0%} 区間", f"{mc['net_low']:+.0f} 〜 {mc['net_high']:+.0f} mL",
+                      help=f"{DEFAULT_SAMPLES:,} 回のサンプリングによる（中央値 {mc['net_median']:+.0f} mL）")
+            u2.metric(f"損失率 {DEFAULT_LEVEL:.0%} 区間", f"{mc['loss_rate_low']:.2f} 〜 {mc['loss_rate_high']:.2f} %")
+            u3.metric("脱水リスク / 体液過剰 の確率", f"{mc['p_dehydration']:.0%} / {mc['p_overload']:.0%}")
+            counts, edges = np.histogram(net_samples, bins=40)
+            st.bar_chart(pd.DataFrame({"サンプル数": counts}, index=((edges[:-1] + edges[1:]) / 2).round(0)),
+                         x_label="ネットバランス (mL)", height=200)
+            if event_mode:
+                st.caption("不感蒸泄の係数・便中水分率・代謝水係数を推算幅の中でばらつかせた分布です。"
+                           "経口・輸液・輸血・出血と時刻付きで記録した尿量は実測値として固定しています。")
+            else:
+                st.caption("不感蒸泄の係数・便中水分率・1 回尿量・代謝水係数を推算幅の中でばらつかせた分布です。"
+                           "経口・輸液・輸血・出血は実測値として固定しています。")
+
+        st.session_state.latest.update(inputs=inputs, result=result, urine_measured=event_mode)
+        if SERVER_MODE:
+            enforce_session_budget(st.session_state)
+
+    # --- 4. 記録パネル（保存と履歴） ---
+    @st.fragment
+    @timed("fragment.records")
+    def records_panel(patient_id, ward, record_day, recorder):
+        inputs = st.session_state.latest["inputs"]
+        result = st.session_state.latest["result"]
+        tbw_val = result["tbw"]
+
+        # 患者ごとの集計は患者・記録日が変わったときだけ保存済みの記録から作り、以降は差分を加える
+        balance_key = (patient_id, record_day)
+        if patient_id and st.session_state.get("patient_balance_key") != balance_key:
+            balance = PatientBalance(get_store().patient_history(patient_id, days=30, until=record_day), tbw_val)
+            if st.session_state.get("events_key") == balance_key:
+                # 保存前の日の時刻付き記録（別のセッションで入力した分を含む）も加える
+                t, kind, vol = st.session_state.events.columns()
+                for ts, k, v in zip(t.tolist(), kind.tolist(), vol.tolist()):
+                    day = datetime.datetime.fromtimestamp(ts, JST).date()
+                    if str(day) not in balance.records:
+                        balance.add_event(day, ts, EVENT_KINDS[k][0], v)
+            st.session_state.patient_balance = balance
+            st.session_state.patient_balance_key = balance_key
+
+        st.markdown("---")
+        if st.button("💾 記録を保存", use_container_width=True, key="btn_save_record", disabled=not patient_id):
+            row = get_store().make_row(
+                patient_id, record_day, inputs, result, ward=ward, recorder=recorder,
+                urine_measured=st.session_state.latest["urine_measured"],
+            )
+            get_writer().submit(row).result()
+            st.session_state.patient_balance.save(row)
+            st.success(f"{patient_id} の {record_day:%Y/%m/%d} の記録を保存しました。")
+        if patient_id:
+            with st.expander(f"📈 {patient_id} の直近30日の記録"):
+                balance = st.session_state.patient_balance
+                balance.tbw = tbw_val
+                history = balance.history()
+                agg = balance.agg
+                if agg.count:
+                    a1, a2, a3, a4 = st.columns(4)
+                    a1.metric("24時間バランス", f"{agg.rolling_net('24h'):+.0f} mL")
+                    a2.metric("3日間累積", f"{agg.rolling_net('3d'):+.0f} mL")
+                    a3.metric("7日間累積", f"{agg.rolling_net('7d'):+.0f} mL")
+                    a4.metric("累積損失率 (対 TBW)", f"{agg.loss_rate:.2f} %", help=f"{len(history)}日分の保存済み記録と保存前の時刻付き記録から算出")
+                if history:
+                    st.dataframe(
+                        [{"日付": r["day"], "IN": round(r["total_in"]), "OUT": round(r["total_out"]),
+                          "バランス": round(r["net"]), "判定": r["judgment"], "損失率(%)": round(r["loss_rate"], 2)}
+                         for r in history],
+                        hide_index=True, use_container_width=True,
+                    )
+                else:
+                    st.caption("保存された記録はありません。")
+
+    # --- 5. PDF パネル ---
+    # 記録日時とファイル名を分単位で進めるため、このパネルだけを 1 分ごとに描き直す
+    @st.fragment(run_every=60)
+    @timed("fragment.pdf")
+    def pdf_panel(patient_id, recorder):
+        # クリック時点の最新の計算結果から PDF を生成する（再実行は発生しない）
+        from medical_report import build_report_data, report_file_name
+
+        latest = st.session_state.latest
+        # PDF に印字する記録日時とファイル名は同じ時刻から作る
+        created = now_jst().replace(second=0, microsecond=0)
+
+        def render_pdf():
+            report_data = build_report_data(
+                latest["inputs"], latest["result"], recorder,
+                recorded_at=created.strftime("%Y/%m/%d %H:%M"),
+            )
+            return get_report_cache().get_or_render(report_data)
 
-    # 4. PDF生成ボタン（一つに集約）
-    st.markdown("---")
-    if st.button("📄 PDFレポートを生成・保存", use_container_width=True, key="btn_final_unified"):
-        report_data = {
-            "age": age, "gender": gender, "weight": weight, "temp": temp, "room_temp": r_temp,
-            "kcal": kcal,
-            "oral": oral, "iv": iv, "blood": blood, "metabolic": metabolic,
-            "urine": urine_total, "bleeding": bleeding, "stool": stool_total,
-            "insensible": insensible_total, "net": net_balance, "judgment": judg,
-            "tbw": tbw_val, "loss_rate": loss_rate,
-            "recorder": recorder
-        }
-        pdf_buf = generate_medical_report(report_data)
         st.download_button(
-            label="📥 PDFをダウンロード",
-            data=pdf_buf,
-            file_name=f"FluidBalance_20260109.pdf",
+            label="📄 PDFレポートをダウンロード",
+            data=render_pdf,
+            file_name=report_file_name(patient_id, created),
             mime="application/pdf",
-            key="btn_download_unified"
+            on_click="ignore",
+            use_container_width=True,
+            key="btn_final_unified"
         )
 
+    calc_panel(age, gender, weight, temp, r_temp, record_day, patient_id, ward, recorder)
+    records_panel(patient_id, ward, record_day, recorder)
+    pdf_panel(patient_id, recorder)
+
 
 
 
@@ -638,305 +663,193 @@ if st.session_state.page == "main":
 # ================================
 # ダークモード対応CSS
 # ================================
-    st.markdown("""
-    <style>
-    /* 共通 */
-    .report-header-box {
-        padding: 0.5em 1em;
-        border-left: 6px solid;
-        margin: 1.5em 0 0.5em 0;
-        border-radius: 4px;
-    }
-    
-    /* ライトモード */
-    @media (prefers-color-scheme: light) {
-        .report-header-box {
-            background-color: #f2f2f2;
-            border-color: #2c7be5;
-            color: #000000;
-        }
-    }
-    
-    /* ダークモード */
-    @media (prefers-color-scheme: dark) {
-        .report-header-box {
-            background-color: #2b2b2b;
-            border-color: #6ea8fe;
-            color: #ffffff;
-        }
-    }
-    </style>
-    """, unsafe_allow_html=True)
+    st.markdown(MAIN_PAGE_CSS, unsafe_allow_html=True)
 
 # ================================
-# 推算根拠ページ
+# 病棟一覧ページ
 # ================================
-elif st.session_state.page == "theory":
-    st.title("📖 水分出納の推算根拠と判定基準")
-    
-    st.info(
-        "本プログラムで使用している各種推算式は以下の通りです。"
-        "これらは臨床現場で一般的に用いられる指標に基づいています。"
-    )
-
-    # 1. 入出量合計の算出式
-    st.markdown(
-        '<h4 class="report-header">1. 入出量合計の算出式</h4>',
-        unsafe_allow_html=True
-    )
-
-    st.write("**■ 総 Intake (総流入量)**")
-    st.latex(r"\text{総IN} = \text{経口摂取(経管)} + \text{静脈輸液} + \text{輸血製剤} + \text{代謝水}")
-    
-    st.write("**■ 総 Output (総流出量)**")
-    st.latex(r"\text{総OUT} = \text{尿量} + \text{出血・ドレーン等} + \text{便中水分} + \text{不感蒸泄}")
-    
-    st.write("**■ ネットバランス (Net Balance)**")
-    st.latex(r"\text{バランス} = \text{総IN} - \text{総OUT}")
-
-    # 2. 各項目の推算根拠
-    st.markdown(
-        '<h4 class="report-header">2. 各項目の推算根拠</h4>',
-        unsafe_allow_html=True
-    )
-    
-    st.markdown("##### ① 代謝水 (Metabolic Water)")
-    st.write("栄養素が体内で燃焼（酸化）される際に生成される水分です。")
-    st.latex(r"\text{算出式: } \text{摂取エネルギー(kcal)} \times 0.12 \sim 0.15")
-    st.caption(
-        "根拠: 一般的に摂取エネルギー 1kcal あたり 0.12mL 〜 0.15mL の代謝水が生成されると推定されています。"
-    )
+elif st.session_state.page == "ward":
+    st.title("🛏 病棟一覧（全ベッド）")
+
+    w1, w2, w3 = st.columns([2, 2, 2])
+    board_ward = w1.text_input("病棟", value=st.session_state.get("main_ward", ""), key="board_ward")
+    board_day = w2.date_input("記録日", value=today_jst(), key="board_day")
+    refresh_sec = w3.selectbox("自動更新", [10, 30, 60], index=1, format_func=lambda s: f"{s} 秒ごと", key="board_refresh")
+    show_intervals = st.toggle("🎲 推算値の不確かさ区間を表示（モンテカルロ）", key="board_mc")
+
+    @st.fragment(run_every=refresh_sec)
+    @timed("fragment.ward")
+    def ward_table():
+        # 一覧部分だけを定期的に再実行し、保存し直された（rev が変わった）患者だけを評価し直す
+        board_key = (board_ward, board_day)
+        if st.session_state.get("board_key") != board_key:
+            st.session_state.board = WardBoard(get_rules())
+            st.session_state.board_key = board_key
+        board = st.session_state.board
+        changed = board.update(get_store().ward_day(board_ward, board_day))
+        frame = board.frame
+
+        if frame.empty:
+            st.caption("この病棟・記録日の保存済み記録はありません。")
+            return
+
+        risk = frame["risk"]
+        k1, k2, k3, k4 = st.columns(4)
+        k1.metric("ベッド数", f"{len(frame)}")
+        k2.metric("損失率 警告", f"{int((risk >= RISK_CAUTION).sum())}")
+        k3.metric("体液過剰", f"{int((risk == RISK_OVERLOAD).sum())}")
+        k4.metric("脱水リスク", f"{int((risk == RISK_DEHYDRATION).sum())}")
+
+        table = pd.DataFrame({
+            "リスク": frame["alert"],
+            "患者ID": frame.index,
+            "IN (mL)": frame["total_in"].round(0),
+            "OUT (mL)": frame["total_out"].round(0),
+            "バランス (mL)": frame["net"].round(0),
+            "損失率 (%)": frame["loss_rate"].round(2),
+            "判定": frame["judgment"],
+            "記録者": frame["recorder"],
+            "更新": ["🆕" if pid in changed else "" for pid in frame.index],
+        })
+        if show_intervals:
+            # 全ベッドをまとめて 1 回の一括計算で評価する
+            from uncertainty import DEFAULT_LEVEL, simulate_ward
+
+            with stage("ward.uncertainty"):
+                mc = simulate_ward(frame.reset_index().to_dict(orient="records"))
+            table.insert(5, f"バランス {DEFAULT_LEVEL:.0%} 区間",
+                         [f"{lo:+.0f} 〜 {hi:+.0f}" for lo, hi in zip(mc["net_low"], mc["net_high"])])
+            table.insert(6, "脱水確率", [f"{p:.0%}" for p in mc["p_dehydration"]])
+        st.dataframe(table, hide_index=True, use_container_width=True)
+        st.caption(f"最終更新: {now_jst():%H:%M:%S}（{len(changed)} 件を更新）")
+
+    ward_table()
+
+    # --- 報告書の一括出力（バックグラウンドで実行し、進捗を定期的に表示する） ---
+    st.markdown("---")
+    st.subheader("📦 報告書の一括出力（ZIP）")
+    queue = get_job_queue()
+    if "report_jobs" not in st.session_state:
+        st.session_state.report_jobs = []
+
+    x1, x2, x3, x4 = st.columns([2, 2, 3, 2])
+    export_target = x1.radio("対象", ["病棟（この記録日の全員）", "患者（期間指定）"], key="export_target")
+    if export_target.startswith("病棟"):
+        if x4.button("📦 出力を開始", use_container_width=True, key="btn_export_ward"):
+            rows = get_store().ward_day(board_ward, board_day)
+            if rows:
+                st.session_state.report_jobs.append(queue.submit(f"病棟 {board_ward or '（未設定）'} {board_day}", rows))
+            else:
+                st.warning("この病棟・記録日の保存済み記録はありません。")
+    else:
+        export_pid = x2.text_input("患者ID", value=st.session_state.get("main_patient_id", ""), key="export_pid")
+        export_range = x3.date_input(
+            "期間", value=(board_day - datetime.timedelta(days=29), board_day), key="export_range",
+        )
+        if x4.button("📦 出力を開始", use_container_width=True, key="btn_export_patient"):
+            if len(export_range) == 2 and export_pid:
+                since, until = export_range
+                rows = get_store().patient_history(export_pid, days=(until - since).days + 1, until=until)
+                if rows:
+                    st.session_state.report_jobs.append(queue.submit(f"患者 {export_pid} {since}〜{until}", rows))
+                else:
+                    st.warning("この患者・期間の保存済み記録はありません。")
+            else:
+                st.warning("患者IDと期間（開始日と終了日）を指定してください。")
+
+    polling = any(job.active for job in map(queue.get, st.session_state.report_jobs) if job)
+
+    @st.fragment(run_every=2 if polling else None)
+    def job_panel():
+        from report_jobs import JOB_DONE, JOB_FAILED
+
+        jobs = [job for job in map(queue.get, reversed(st.session_state.report_jobs)) if job]
+        for job in jobs:
+            label = f"{job.title}：{job.status}（{job.done}/{job.total} ページ）"
+            if job.status == JOB_DONE:
+                st.download_button(
+                    f"⬇ {label}", data=lambda job_id=job.id: queue.read_zip(job_id),
+                    file_name=f"FluidBalance_reports_{job.id}.zip", mime="application/zip",
+                    on_click="ignore", key=f"btn_job_{job.id}",
+                )
+            elif job.status == JOB_FAILED:
+                st.error(f"{label}：{job.error}")
+            else:
+                st.progress(job.progress, text=label)
+        # 全ジョブが終わったら定期更新を止めるため、ページ全体を再実行する
+        if polling and not any(job.active for job in jobs):
+            st.rerun()
+
+    job_panel()
 
-    st.markdown("##### ② 不感蒸泄 (Insensible Water Loss)")
-    st.write(
-        "呼気や皮膚から自覚なしに失われる水分です。"
-        "体温や周囲の温度によって変動します。"
-    )
-    st.latex(r"\text{基本式: } 15\,\text{mL} \times \text{体重(kg)}")
-    
-    st.write("**・発熱補正:** 体温が37℃を超える場合、1℃上昇につき15%増加させます。")
-    st.latex(r"\text{補正係数} = 1.0 + 0.15 \times (\text{体温} - 37)")
-    
-    st.write("**・室温補正:** 室温が30℃を超える場合、1℃上昇につき17.5%増加させます。")
-    st.latex(r"\text{補正係数} = 1.0 + 0.175 \times (\text{室温} - 30)")
-
-    st.markdown("##### ③ 便中水分")
-    st.write("便の性状（水分含有率）に基づき、重量から水分量を推定します。")
-    st.write("- **普通便:** $重量(g) \\times 0.75$")
-    st.write("- **軟便:** $重量(g) \\times 0.85$")
-    st.write("- **下痢:** $重量(g) \\times 0.95$")
-
-    st.markdown("##### ④ 推定体水分率 (Total Body Water %)")
-    st.write("加齢に伴う細胞内液の減少を考慮した推算式です。")
-    st.write("- **乳児(0-1歳):** 80%から月齢に応じて減少")
-    st.write("- **幼児・学童(1-13歳):** 70%から年齢に応じて減少")
-    st.write("- **成人(14-65歳):** 60%から年齢に応じて減少")
-    st.write("- **高齢者(65歳以上):** 一律 50%")
-
-    # 3. 判定基準
-    st.markdown(
-        '<h4 class="report-header">3. 2026年現在の臨床的判定基準</h4>',
-        unsafe_allow_html=True
-    )
+# ================================
+# 感度分析ページ（メイン計算ページの最新の入力値を基準にする）
+# ================================
+elif st.session_state.page == "sensitivity":
+    from views import sensitivity
+    sensitivity.render(st.session_state.get("latest", {}).get("inputs"))
 
+# ================================
+# 診断ページ（非表示：?page=diag）
+# ================================
+elif st.session_state.page == "diag":
+    st.title("🩺 診断（処理時間の計測）")
+    if not METRICS_ENABLED:
+        st.info("計測は無効です。環境変数 WATER_BALANCE_METRICS=1 を設定して起動すると記録されます。")
+
+    cache = get_report_cache().stats()
+    for key in ("entries", "bytes", "hits", "misses"):
+        REGISTRY.set_value(f"pdf_cache_{key}", cache[key])
+
+    snap = REGISTRY.snapshot()
+    st.caption(f"プロセス稼働時間: {snap['uptime_seconds']:.0f} 秒")
+    if snap["values"]:
+        st.table([{"項目": k, "値": v} for k, v in snap["values"].items()])
+    if snap["stages"]:
+        st.dataframe(
+            [{"段階": name, "回数": s["count"], "平均 (ms)": round(s["mean_seconds"] * 1000, 2),
+              "最大 (ms)": round(s["max_seconds"] * 1000, 2), "直近 (ms)": round(s["last_seconds"] * 1000, 2),
+              "合計 (s)": round(s["total_seconds"], 3)}
+             for name, s in snap["stages"].items()],
+            hide_index=True, use_container_width=True,
+        )
 
-    st.write(
-        "本システムでは、24時間あたりのネットバランスに基づき以下の判定を行っています。"
-    )
-    
-    st.table([
-        {
-            "バランス結果": "+500 mL 超",
-            "判定": "体液過剰 (Overhydration)",
-            "臨床的リスク": "心不全増悪、浮腫、肺水腫のリスク"
-        },
-        {
-            "バランス結果": "-200 ～ +500 mL",
-            "判定": "維持範囲 (Maintenance)",
-            "臨床的リスク": "生理的許容範囲"
-        },
-        {
-            "バランス結果": "-200 mL 未満",
-            "判定": "脱水リスク (Dehydration)",
-            "臨床的リスク": "腎不全（乏尿）、循環不全、血圧低下のリスク"
-        }
-    ])
-
-    st.warning("""
-**※これらの数値はあくまで目安です。**  
-2026年1月9日現在の臨床ガイドラインに則り、実際の診断には
-血清ナトリウム値、心エコー、皮膚緊張度（ツルゴール）等の
-身体所見を併せて評価する必要があります。
-""")
+    d1, d2, d3 = st.columns(3)
+    d1.download_button("⬇ JSON", REGISTRY.to_json, file_name="water_balance_metrics.json",
+                       mime="application/json", on_click="ignore", use_container_width=True)
+    d2.download_button("⬇ Prometheus", REGISTRY.to_prometheus, file_name="water_balance_metrics.prom",
+                       mime="text/plain", on_click="ignore", use_container_width=True)
+    if d3.button("🔄 リセット", use_container_width=True):
+        REGISTRY.reset()
+        st.rerun()
 
+# ================================
+# 推算根拠ページ
+# ================================
+elif st.session_state.page == "theory":
+    from views import theory
+    theory.render()
 
+# ================================
+# 使い方ページ
+# ================================
 elif st.session_state.page == "usage":
-    st.title("🧭 使い方（シーン別）")
-    st.info("本アプリは医療・看護・生活・学校など、複数の現場で共通に利用できる水分出納整理ツールです。")
-
-    st.subheader("① 水分出納とは その重要性")
-    st.write("""
-    **水分出納（Water Balance）**とは、体に入ってくる水分（IN）と体から出ていく水分（OUT）のバランスのことです。
-    私たちの体は成人で約60%が水分で構成されており、このバランスが崩れると生命維持に支障をきたします。
-    
-    - **脱水（IN < OUT）**: 循環不全、腎機能低下、意識障害などのリスク
-    - **体液過剰（IN > OUT）**: 浮腫（むくみ）、心不全、呼吸困難などのリスク
-    
-    このバランスを日々把握し、適切に管理・補正することが健康維持の第一歩です。
-    """)
-
-    st.subheader("② IN（摂取・流入）の項目")
-    st.markdown("""
-    水分出納において、体内に水分が入ってくるルートは主に以下の通りです。
-    
-    - **経口摂取水 (Oral Intake)**  
-      飲み物や食事に含まれる水分です。食事にも多くの水分が含まれているため、これらも重要な水分源となります。
-    
-    - **代謝水 (Metabolic Water)**  
-      体内で栄養素（糖質・脂質・タンパク質）がエネルギーとして燃焼される際に化学反応で生成される水分です。
-      飲まなくても体内で自然に作られる「見えない水分」です。
-    
-    - **静脈輸液 (Intravenous Fluids)**  
-      点滴によって血管内に直接水分や電解質、薬剤を投与することです。医療現場で最も確実な水分補給手段です。
-    
-    - **輸血 (Transfusion)**  
-      血液製剤の投与です。これも水分量としてカウントされますが、循環血液量の増加という点で輸液とは異なる慎重な管理が必要です。
-    """)
-
-    st.subheader("③ OUT（排出・喪失）の項目")
-    st.markdown("""
-    体から水分が出ていくルートは、生理的なものと病的なものに分けられます。
-    
-    - **排尿 (Urine Output)**  
-      腎臓で血液が濾過され、不要な老廃物とともに水分が排出される生理現象です。
-      体内の水分量調節・電解質バランスの維持に最も重要な役割を果たします。
-    
-    - **便中水分 (Stool Water)**  
-      便として排出される水分です。通常は少量ですが、下痢の場合は大量の水分喪失となり得ます。
-    
-    - **出血・ドレーン排液 (Bleeding / Drainage)**  
-      手術や怪我による出血、または体内に溜まった液体を管（ドレーン）で外に出す場合の水分です。
-      これらは「異常な喪失」として、INを増やして補う必要があります。
-      
-    - **不感蒸泄 (Insensible Water Loss)**  
-      発汗とは別に、皮膚や呼気から自然に蒸発して失われる水分です。発熱時などは増加します。
-    """)
-
-    st.divider()
-
-
-    usage_table = [
-        {
-            "利用シーン": "医療（病棟・外来）",
-            "主な対象": "入院患者・発熱患者",
-            "入力のポイント": "輸液量・尿量・発熱の有無を正確に",
-            "判定の見方": "体液過剰／脱水リスクの傾向把握",
-            "活用例": "回診前サマリー、PDF記録"
-        },
-        {
-            "利用シーン": "看護",
-            "主な対象": "水分管理が必要な患者",
-            "入力のポイント": "概算入力でも可、傾向重視",
-            "判定の見方": "前日との差・IN/OUT対照",
-            "活用例": "申し送り、患者説明"
-        },
-        {
-            "利用シーン": "生活・家庭",
-            "主な対象": "高齢者・体調不良時",
-            "入力のポイント": "飲水量・排尿回数を簡易入力",
-            "判定の見方": "不足・過剰の気づき",
-            "活用例": "受診判断の参考"
-        },
-        {
-            "利用シーン": "学校（保健・授業）",
-            "主な対象": "児童・生徒",
-            "入力のポイント": "体重・室温・活動量",
-            "判定の見方": "熱中症リスクの可視化",
-            "活用例": "保健指導、教材"
-        },
-        {
-            "利用シーン": "運動・部活動",
-            "主な対象": "競技者・部活動生徒",
-            "入力のポイント": "運動前後の水分量",
-            "判定の見方": "補給不足の確認",
-            "活用例": "飲水計画の立案"
-        },
-    ]
-
-    st.subheader("📋 利用シーン別一覧")
-    st.table(usage_table)
-
-
+    from views import usage
+    usage.render()
 
 # ================================
 # 引用・参考文献ページ
 # ================================
 elif st.session_state.page == "refs":
-    st.title("📚 引用・参考文献")
-    
-    st.info(
-        "本システムの計算式および判定基準は、以下の公的機関・学会等の資料に基づき作成されています。"
-    )
-
-    # 1. 公的ガイドライン・基準
-    st.markdown(
-        '<h4 class="report-header">1. 公的ガイドライン・基準</h4>',
-        unsafe_allow_html=True
-    )
-
-    
-    st.markdown("""
-- **[厚生労働省：日本人の食事摂取基準（2025年版）](https://www.mhlw.go.jp)**  
-  *水分の必要量や代謝水の生成根拠となる栄養素の酸化プロセスに関する標準的な数値が記載されています。*
-
-- **[環境省：熱中症環境保健マニュアル](https://www.wbgt.env.go.jp)**  
-  *室温・外気温上昇に伴う不感蒸泄および発汗量の増加に関する知見がまとめられています。*
-    """)
-
-    # 2. 臨床医学的エビデンス
-    st.markdown(
-        '<h4 class="report-header">2. 臨床医学的エビデンス</h4>',
-        unsafe_allow_html=True
-    )
-
-    
-    st.markdown("""
-- **[MSDマニュアル プロフェッショナル版：水分平衡](https://www.msdmanuals.com)**  
-  *世界共通の臨床基準として、不感蒸泄（10〜15mL/kg/day）や、体温上昇に伴う損失増（1℃につき10〜15%）の根拠となります。*
-
-- **[一般社団法人 日本臨床栄養代謝学会（JSPEN）：ガイドライン](https://www.jspen.or.jp)**  
-  *臨床現場における水・電解質管理の最新の国内ガイドラインを確認できます。*
-    """)
-
-    # 3. 文献検索（最新知見）
-    st.markdown(
-        '<h4 class="report-header">3. 文献検索（最新知見）</h4>',
-        unsafe_allow_html=True
-    )
-
-    
-    st.markdown("""
-- **[CiNii Research（日本の論文検索：水分出納）](https://cinii.clear.ndl.go.jp)**  
-  *本システムで採用している各係数（15mL/kg/day 等）の妥当性を検証した最新の論文を検索可能です。*
-    """)
-
-    st.warning("""
-**臨床現場での利用にあたって**  
-2026年現在の医学的知見に基づき構成されていますが、臨床的な最終判断は  
-患者個別の身体所見（血圧、浮腫、血清Na値等）に基づき、医師が行ってください。
-""")
-
-
-
-
-
-
-
-
-
-
-
-
-
+    from views import refs
+    refs.render()
 
+# ================================
+# サーバー運用モード：セッション当たりのメモリ上限
+# ================================
+if SERVER_MODE:
+    enforce_session_budget(st.session_state)
 
+_stop_rerun_timer()
+# プロセス起動後の初回実行（読み込みと最初の描画）にかかった時間
+REGISTRY.set_value_once("cold_start_seconds", round(time.perf_counter() - _script_started, 4))